@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+
+"""
+性能基准脚本，在仓库根目录下运行，如 python -m benchmarks.bench_package_config
+"""
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+"""
+area_cut耗时：0.125度全球场(纬度降序、经度0~360)裁剪中国区域，
+比较按索引切片与原xr.where(..., drop=True)的耗时，并检查两者结果一致
+
+运行(仓库根目录下): python -m benchmarks.bench_area_cut [--levels 4] [--number 5]
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+import xarray as xr
+
+from metdig.io.lib import utility as utl
+
+
+def _old_area_cut(data, extent):
+    # 原实现
+    return data.where((data['lon'] >= extent[0]) &
+                      (data['lon'] <= extent[1]) &
+                      (data['lat'] >= extent[2]) &
+                      (data['lat'] <= extent[3]), drop=True)
+
+
+def _make_data(n_levels):
+    lat = np.linspace(90, -90, 1441)
+    lon = np.arange(2880) * 0.125
+    values = np.random.rand(1, n_levels, lat.size, lon.size).astype('float32')
+    return xr.Dataset({'data': (['time', 'level', 'lat', 'lon'], values)},
+                      coords={'time': [np.datetime64('2020-01-01T00')], 'level': np.arange(n_levels) * 100. + 500,
+                              'lat': lat, 'lon': lon})
+
+
+def main(n_levels=4, number=5):
+    data = _make_data(n_levels)
+    print('area_cut 0.125 deg global field {} ({} levels)'.format(dict(data['data'].sizes), n_levels))
+    for extent in [(70, 140, 10, 60), (110, 120, 35, 42)]:
+        xr.testing.assert_identical(utl.area_cut(data, extent), _old_area_cut(data, extent))
+        t_old = min(timeit.repeat(lambda: _old_area_cut(data, extent), number=number, repeat=3)) / number
+        t_new = min(timeit.repeat(lambda: utl.area_cut(data, extent), number=number, repeat=3)) / number
+        print('  extent {}'.format(extent))
+        print('    where: {:10.2f} ms'.format(t_old * 1e3))
+        print('    isel : {:10.2f} ms  ({:.0f}x)'.format(t_new * 1e3, t_old / t_new))
+
+    # 跨0度经线的区域，原实现只能取到0度以东的部分
+    extent = (-30, 30, 30, 60)
+    cut = utl.area_cut(data, extent)
+    t_new = min(timeit.repeat(lambda: utl.area_cut(data, extent), number=number, repeat=3)) / number
+    print('  extent {} (wraps 0 deg, lon {} ~ {})'.format(extent, float(cut['lon'][0]), float(cut['lon'][-1])))
+    print('    isel : {:10.2f} ms'.format(t_new * 1e3))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--levels', type=int, default=4)
+    parser.add_argument('--number', type=int, default=5)
+    args = parser.parse_args()
+    main(args.levels, args.number)
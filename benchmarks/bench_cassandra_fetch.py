@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+"""
+cassandra多层多时次读取吞吐：本地起一个模拟GDS服务(每个请求固定延迟)，
+用cassandra.get_model_3D_grids读取12层 x 17个时效，比较不同max_workers下的耗时
+
+运行(仓库根目录下): python -m benchmarks.bench_cassandra_fetch [--latency 0.02] [--workers 1 4 8 16]
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from nmc_met_io import DataBlock_pb2
+
+from metdig.io import cassandra
+
+LEVELS = [1000, 925, 850, 700, 600, 500, 400, 300, 250, 200, 150, 100]
+FHOURS = list(range(0, 49, 3))
+
+_HEAD_DTYPE = [('discriminator', 'S4'), ('type', 'i2'),
+               ('modelName', 'S20'), ('element', 'S50'),
+               ('description', 'S30'), ('level', 'f4'),
+               ('year', 'i4'), ('month', 'i4'), ('day', 'i4'),
+               ('hour', 'i4'), ('timezone', 'i4'),
+               ('period', 'i4'), ('startLongitude', 'f4'),
+               ('endLongitude', 'f4'), ('longitudeGridSpace', 'f4'),
+               ('longitudeGridNumber', 'i4'),
+               ('startLatitude', 'f4'), ('endLatitude', 'f4'),
+               ('latitudeGridSpace', 'f4'),
+               ('latitudeGridNumber', 'i4'),
+               ('isolineStartValue', 'f4'),
+               ('isolineEndValue', 'f4'),
+               ('isolineSpace', 'f4'),
+               ('perturbationNumber', 'i2'),
+               ('ensembleTotalNumber', 'i2'),
+               ('minute', 'i2'), ('second', 'i2'),
+               ('Extent', 'S92')]
+
+
+def _grid_bytes(level, init_time, fhour, nlat=161, nlon=281):
+    # 按micaps第4类格点的二进制格式生成数据块(70-140E, 10-50N, 0.25度)
+    head = np.zeros(1, dtype=_HEAD_DTYPE)
+    head['discriminator'] = b'mdfs'
+    head['type'] = 4
+    head['level'] = level
+    head['year'], head['month'], head['day'], head['hour'] = init_time.year, init_time.month, init_time.day, init_time.hour
+    head['period'] = fhour
+    head['startLongitude'], head['endLongitude'], head['longitudeGridSpace'], head['longitudeGridNumber'] = 70, 140, 0.25, nlon
+    head['startLatitude'], head['endLatitude'], head['latitudeGridSpace'], head['latitudeGridNumber'] = 10, 50, 0.25, nlat
+    data = np.random.rand(nlat, nlon).astype('f4')
+    return head.tobytes() + data.tobytes()
+
+
+class _FakeGDSHandler(BaseHTTPRequestHandler):
+    latency = 0.02
+
+    def do_GET(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        directory = query['directory'][0].rstrip('/')
+        filename = query['fileName'][0]
+        time.sleep(self.latency)  # 模拟一次往返的网络及服务端延迟
+        init_time = datetime.datetime.strptime(filename[:8], '%y%m%d%H')
+        result = DataBlock_pb2.ByteArrayResult()
+        result.errorCode = 0
+        result.byteArray = _grid_bytes(int(directory.split('/')[-1]), init_time, int(filename.split('.')[-1]))
+        body = result.SerializeToString()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def fake_gds(latency):
+    _FakeGDSHandler.latency = latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _FakeGDSHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _fetch(address, max_workers):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return cassandra.get_model_3D_grids(init_time=datetime.datetime(2020, 1, 1, 8), fhours=FHOURS,
+                                            data_name='ecmwf', var_name='hgt', levels=LEVELS, max_workers=max_workers,
+                                            cache=False, check_file_first=False, gdsIP=address[0], gdsPort=address[1])
+
+
+def main(latency=0.02, workers=(1, 4, 8, 16)):
+    with fake_gds(latency) as address:
+        print('cassandra get_model_3D_grids {} levels x {} fhours, {:.0f} ms per request'.format(len(LEVELS), len(FHOURS), latency * 1e3))
+        t_serial = None
+        for max_workers in workers:
+            t0 = time.perf_counter()
+            data = _fetch(address, max_workers)
+            t = time.perf_counter() - t0
+            assert data is not None and data.sizes['level'] == len(LEVELS) and data.sizes['dtime'] == len(FHOURS)
+            t_serial = t if t_serial is None else t_serial
+            print('  max_workers={:3d}: {:6.2f} s  {:6.1f} fields/s  ({:.1f}x)'.format(
+                max_workers, t, len(LEVELS) * len(FHOURS) / t, t_serial / t))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8, 16])
+    args = parser.parse_args()
+    main(args.latency, args.workers)
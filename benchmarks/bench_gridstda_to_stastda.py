@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+"""
+gridstda_to_stastda耗时：2400站 x 41个预报时效 x 51个成员的网格插值到站点，
+比较按列构造DataFrame与原逐站逐时效循环构造行的耗时，并检查两者结果一致
+
+运行(仓库根目录下): python -m benchmarks.bench_gridstda_to_stastda [--stations 2400] [--dtimes 41] [--members 51]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from metdig.utl.utl_stda_grid import numpy_to_gridstda
+from metdig.utl.utl_stda_station import gridstda_to_stastda
+
+
+def _old_gridstda_to_stastda(grid_stda_data, points, method='linear'):
+    # 原实现：逐level、time、dtime、站点循环构造行
+    points_xr = grid_stda_data.interp(lon=('points', points['lon']), lat=('points', points['lat']), method=method)
+    columns = ['level', 'time', 'dtime', 'id', 'lon', 'lat'] + list(grid_stda_data['member'].values)
+    values = points_xr.values
+    lines = []
+    for i_lv, _lv in enumerate(points_xr['level'].values):
+        for i_t, _t in enumerate(points_xr['time'].values):
+            for i_d, _d in enumerate(points_xr['dtime'].values):
+                _d = int(_d)
+                for i_id, _id in enumerate(points['id']):
+                    _lon = points['lon'][i_id]
+                    _lat = points['lat'][i_id]
+                    _data = values[:, i_lv, i_t, i_d, i_id]
+                    lines.append([_lv, _t, _d, _id, _lon, _lat] + list(_data))
+    return pd.DataFrame(lines, columns=columns)
+
+
+def _make_data(n_stations, n_dtimes, n_members):
+    rs = np.random.RandomState(0)
+    lons = np.arange(70, 140.1, 0.5)
+    lats = np.arange(10, 60.1, 0.5)
+    members = ['m{}'.format(_m) for _m in range(n_members)]
+    dtimes = np.arange(0, n_dtimes * 6, 6)
+    grid = numpy_to_gridstda(rs.rand(n_members, 1, 1, n_dtimes, lats.size, lons.size).astype('float32'),
+                             members, [500], [pd.Timestamp('2020-01-01 08:00')], dtimes, lats, lons,
+                             var_name='tmp', np_input_units='degC')
+    points = {'id': np.arange(1, n_stations + 1),
+              'lon': rs.uniform(75, 135, n_stations),
+              'lat': rs.uniform(15, 55, n_stations)}
+    return grid, points
+
+
+def _timeit(func):
+    t0 = time.perf_counter()
+    ret = func()
+    return time.perf_counter() - t0, ret
+
+
+def main(n_stations=2400, n_dtimes=41, n_members=51):
+    grid, points = _make_data(n_stations, n_dtimes, n_members)
+    t_old, df_old = _timeit(lambda: _old_gridstda_to_stastda(grid, dict(points)))
+    t_new, df_new = _timeit(lambda: gridstda_to_stastda(grid, points=dict(points)))
+    pd.testing.assert_frame_equal(df_new, df_old, check_dtype=False)
+    print('gridstda_to_stastda {} stations x {} dtimes x {} members ({} rows)'.format(n_stations, n_dtimes, n_members, len(df_new)))
+    print('  loop  : {:8.2f} s'.format(t_old))
+    print('  column: {:8.2f} s  ({:.1f}x)'.format(t_new, t_old / t_new))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stations', type=int, default=2400)
+    parser.add_argument('--dtimes', type=int, default=41)
+    parser.add_argument('--members', type=int, default=51)
+    args = parser.parse_args()
+    main(args.stations, args.dtimes, args.members)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+"""
+hub多进程绘图延迟：连续多次调用hub.lib.utility.mult_process(每次若干张带省界底图的图)，
+比较reuse_pool=False(每次新建进程池)与reuse_pool=True(常驻进程池)的每次调用耗时
+
+运行(仓库根目录下): python -m benchmarks.bench_hub_pool [--calls 5] [--frames 4] [--workers 2]
+"""
+
+import argparse
+import time
+
+from metdig.hub.lib import utility as hub_utl
+
+
+def draw_frame(i=0):
+    # 模拟一张hub绘图：中国区域省界底图，返回图像数组
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import cartopy.crs as ccrs
+    from metdig.graphics.lib import utl_plotmap
+    from metdig.graphics.lib.utility import get_imgbuf_from_fig
+
+    fig = plt.figure(figsize=(8, 6))
+    ax = fig.add_axes([0.05, 0.05, 0.9, 0.9], projection=ccrs.PlateCarree())
+    ax.set_extent([70 + i, 140, 10, 60], crs=ccrs.PlateCarree())
+    utl_plotmap.add_china_map_2cartopy_public(ax, name='province', edgecolor='k', lw=0.5)
+    utl_plotmap.add_china_map_2cartopy_public(ax, name='nation', edgecolor='k', lw=1)
+    return {'img_buf': get_imgbuf_from_fig(fig, dpi=72)}
+
+
+def _calls(n_calls, n_frames, max_workers, reuse_pool):
+    times = []
+    for _ in range(n_calls):
+        t0 = time.perf_counter()
+        ret = hub_utl.mult_process(func=draw_frame, func_args_all=[{'i': _i} for _i in range(n_frames)],
+                                   max_workers=max_workers, force_max_workers=True, reuse_pool=reuse_pool)
+        times.append(time.perf_counter() - t0)
+        assert len(ret) == n_frames
+    return times
+
+
+def main(n_calls=5, n_frames=4, max_workers=2):
+    print('hub mult_process {} back-to-back calls, {} frames per call, max_workers={}'.format(n_calls, n_frames, max_workers))
+    for reuse_pool in (False, True):
+        try:
+            times = _calls(n_calls, n_frames, max_workers, reuse_pool)
+        finally:
+            hub_utl.shutdown_worker_pool()
+        print('  reuse_pool={!s:5}: first {:6.2f} s, following mean {:6.2f} s'.format(
+            reuse_pool, times[0], sum(times[1:]) / max(1, len(times) - 1)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=5)
+    parser.add_argument('--frames', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+    main(args.calls, args.frames, args.workers)
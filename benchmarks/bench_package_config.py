@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+"""
+package_config查询耗时：cassandra.get_model_grid每个网格场的4次配置查询(路径、单位、层次、产品类型)，
+比较按键索引查询与原按列布尔筛选DataFrame的查询
+
+运行(仓库根目录下): python -m benchmarks.bench_package_config [--number 2000]
+"""
+
+import argparse
+import timeit
+
+from metdig.io.lib.package_config.cassandra_model_cfg import cassandra_model_cfg
+
+
+def _mask_lookup(cfg, level_type, data_name, var_name):
+    # 原实现
+    this_cfg = cfg.model_cfg[(cfg.model_cfg['data_name'] == data_name) &
+                             (cfg.model_cfg['var_name'] == var_name) &
+                             (cfg.model_cfg['level_type'] == level_type)].copy(deep=True).reset_index(drop=True)
+    return this_cfg.to_dict('index')[0]
+
+
+def _field_lookups_mask(cfg):
+    for _ in range(4):
+        _mask_lookup(cfg, 'high', 'ecmwf', 'tmp')
+
+
+def _field_lookups_index(cfg):
+    cfg.model_cassandra_dir(level_type='high', data_name='ecmwf', var_name='tmp', level=500)
+    cfg.model_cassandra_units(level_type='high', data_name='ecmwf', var_name='tmp')
+    cfg.model_cassandra_level(level_type='high', data_name='ecmwf', var_name='tmp', level=500)
+    cfg.model_cassandra_prod_type(level_type='high', data_name='ecmwf', var_name='tmp')
+
+
+def main(number=2000):
+    cfg = cassandra_model_cfg()
+    t_mask = min(timeit.repeat(lambda: _field_lookups_mask(cfg), number=max(1, number // 20), repeat=3)) / max(1, number // 20)
+    t_index = min(timeit.repeat(lambda: _field_lookups_index(cfg), number=number, repeat=3)) / number
+    print('cassandra_model_cfg {} rows, 4 lookups per field'.format(len(cfg.model_cfg)))
+    print('  mask : {:10.1f} us/field'.format(t_mask * 1e6))
+    print('  index: {:10.1f} us/field  ({:.0f}x)'.format(t_index * 1e6, t_mask / t_index))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=2000)
+    main(parser.parse_args().number)
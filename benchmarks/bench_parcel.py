@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+"""
+气块抬升参数耗时：比较cal.sounding.parcel_params(numba逐柱并行)与原逐格点.sel后调用metpy lfc的实现，
+小网格上对比两者LFC结果，0.25度区域网格上只计算numba实现，原实现按小网格单柱耗时外推
+
+运行(仓库根目录下): python -m benchmarks.bench_parcel [--small 8] [--nlat 161] [--nlon 281]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import xarray as xr
+
+import metpy.calc as mpcalc
+
+from metdig.cal import sounding
+from metdig.utl.utl_stda_grid import numpy_to_gridstda, gridstda_full_like_by_levels
+
+LEVELS = [1000, 975, 950, 925, 900, 850, 800, 700, 600, 500, 400, 300, 250, 200, 150, 100]
+
+
+def _old_lfc(pres, tmp, td):
+    # 原实现(从pres的最低层抬升)：逐格点.sel后调用metpy
+    lfc_pres = xr.zeros_like(pres.isel(level=[0])).copy()
+    for imember in pres.member.values:
+        for idtime in pres.dtime.values:
+            for itime in pres.time.values:
+                for ilon in pres.lon.values:
+                    for ilat in pres.lat.values:
+                        sel = dict(member=[imember], dtime=[idtime], time=[itime], lon=[ilon], lat=[ilat])
+                        try:
+                            lfc_pres1d_p, _ = mpcalc.lfc(pres.sel(**sel).stda.quantity.squeeze(),
+                                                         tmp.sel(**sel).stda.quantity.squeeze(),
+                                                         td.sel(**sel).stda.quantity.squeeze())
+                            lfc_pres.loc[sel] = [lfc_pres1d_p.magnitude]
+                        except Exception:
+                            lfc_pres.loc[sel] = [np.nan]
+    return lfc_pres
+
+
+def _make_data(nlat, nlon):
+    # 合成探空：地面温度、低层湿度随格点变化，部分格点存在LFC
+    rs = np.random.RandomState(0)
+    p = np.array(LEVELS, dtype=float)
+    t_sfc = 20 + 15 * rs.rand(nlat, nlon)
+    tmp = (t_sfc + 273.15)[None, :, :] * (p[:, None, None] / 1000.) ** 0.21 - 273.15
+    dep = np.where(p[:, None, None] > 800, 1 + 8 * rs.rand(nlat, nlon), 10 + 15 * rs.rand(len(LEVELS), nlat, nlon))
+    td = tmp - dep
+    lats = np.linspace(10, 10 + 0.25 * (nlat - 1), nlat)
+    lons = np.linspace(70, 70 + 0.25 * (nlon - 1), nlon)
+    kwargs = dict(members=['ecmwf'], levels=LEVELS, times=[np.datetime64('2020-07-01T08')], dtimes=[0], lats=lats, lons=lons)
+    tmp = numpy_to_gridstda(tmp.reshape((1, len(LEVELS), 1, 1, nlat, nlon)), var_name='tmp', np_input_units='degC', **kwargs)
+    td = numpy_to_gridstda(td.reshape((1, len(LEVELS), 1, 1, nlat, nlon)), var_name='td', np_input_units='degC', **kwargs)
+    pres = gridstda_full_like_by_levels(tmp, LEVELS)
+    return pres, tmp, td
+
+
+def _timeit(func):
+    t0 = time.perf_counter()
+    ret = func()
+    return time.perf_counter() - t0, ret
+
+
+def main(small=8, nlat=161, nlon=281):
+    pres, tmp, td = _make_data(small, small)
+    sounding.parcel_params(pres, tmp, td, parallel=False)  # numba编译
+    sounding.parcel_params(pres, tmp, td, parallel=True)
+    t_old, old = _timeit(lambda: _old_lfc(pres, tmp, td))
+    t_new, new = _timeit(lambda: sounding.lfc(pres, tmp, td)[0])
+    old, new = old.values.ravel(), new.values.ravel()
+    both = np.isfinite(old) & np.isfinite(new)
+    print('lfc {}x{} columns x {} levels'.format(small, small, len(LEVELS)))
+    print('  metpy per point: {:10.3f} s'.format(t_old))
+    print('  parcel_params  : {:10.3f} s  ({:.0f}x)'.format(t_new, t_old / t_new))
+    print('  lfc found by both {}/{}, by one only {}, max |diff| {:.2f} hPa'.format(
+        both.sum(), old.size, (np.isfinite(old) != np.isfinite(new)).sum(), np.abs(old - new)[both].max() if both.any() else 0))
+
+    t_col = t_old / (small * small)
+    pres, tmp, td = _make_data(nlat, nlon)
+    print('parcel_params {}x{} columns x {} levels (0.25 deg)'.format(nlat, nlon, len(LEVELS)))
+    print('  metpy per point: {:10.1f} s (estimated)'.format(t_col * nlat * nlon))
+    for parallel in (False, True):
+        t, _ = _timeit(lambda: sounding.parcel_params(pres, tmp, td, parallel=parallel))
+        print('  parallel={!s:5}  : {:10.3f} s'.format(parallel, t))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--small', type=int, default=8)
+    parser.add_argument('--nlat', type=int, default=161)
+    parser.add_argument('--nlon', type=int, default=281)
+    args = parser.parse_args()
+    main(args.small, args.nlat, args.nlon)
@@ -1,14 +1,19 @@
 __author__ = "The R & D Center for Weather Forecasting Technology in NMC, CMA"
 __version__ = '0.1.9.9.3'
 
-from . import cal
-from . import graphics
-from . import hub
-from . import io
-from . import onestep
-from . import products
-from . import utl
-from . import package_tools
+from metdig.lazy_import import lazy_submodules
+
+# 子包在首次访问时导入(如metdig.io)，import metdig本身不导入matplotlib/cartopy/metpy等依赖
+__getattr__, __dir__ = lazy_submodules(__name__, [
+    'cal',
+    'graphics',
+    'hub',
+    'io',
+    'onestep',
+    'products',
+    'utl',
+    'package_tools',
+])
 
 import logging
 _log = logging.getLogger(__name__)
@@ -1,10 +1,14 @@
-from .cross_sections_module import *
-from .dynamic import *
-from .elements import *
-from .moisture import *
-from .other import *
-from .qpf import *
-from .thermal import *
-from .sounding import *
-from .interpolate import *
+from metdig.lazy_import import lazy_star_modules
 
+# 子模块在首次访问时按如下顺序执行 from .xxx import *
+__getattr__, __dir__ = lazy_star_modules(__name__, [
+    'cross_sections_module',
+    'dynamic',
+    'elements',
+    'moisture',
+    'other',
+    'qpf',
+    'thermal',
+    'sounding',
+    'interpolate',
+])
@@ -5,6 +5,9 @@
 '''
 
 
+import collections
+import threading
+
 import numpy as np
 
 import metpy.calc as mpcalc
@@ -17,12 +20,170 @@ import metdig.utl as mdgstda
 
 
 __all__ = [
+    'CrossSectionPlan',
     'cross_section',
     'cross_section_components'
 ]
 
 
-def cross_section(data, start, end, steps=101, interp_type='linear'):
+def _interp_index(coord, x):
+    # coord上线性插值的左右索引及右侧权重，超出范围的点valid为False
+    coord = np.asarray(coord, dtype=np.float64)
+    descending = coord.size > 1 and coord[0] > coord[-1]
+    asc = coord[::-1] if descending else coord
+    i1 = np.clip(np.searchsorted(asc, x, side='right'), 1, max(asc.size - 1, 1))
+    i0 = i1 - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        w1 = np.where(asc[i1] == asc[i0], 0., (x - asc[i0]) / (asc[i1] - asc[i0]))
+    valid = (x >= asc[0]) & (x <= asc[-1])
+    if asc.size == 1:
+        i0 = i1 = np.zeros_like(i1)
+    if descending:
+        i0, i1 = coord.size - 1 - i0, coord.size - 1 - i1
+    return i0, i1, w1, valid
+
+
+class CrossSectionPlan(object):
+    '''
+    剖面插值方案：对同一网格、同一起止点及步数，预先计算测地线路径、插值格点索引及双线性权重，
+    之后可对任意多个要素直接插值，结果与cross_section一致
+    '''
+
+    def __init__(self, lons, lats, start, end, steps=101, interp_type='linear'):
+        """[初始化]
+
+        Args:
+            lons ([array_like]): [网格经度]
+            lats ([array_like]): [网格纬度]
+            start ([array_like]): [剖面起点(lat, lon)]
+            end ([array_like]): [剖面终点(lat, lon)]
+            steps (int, optional): [剖面点数（包括起止点）]. Defaults to 101.
+            interp_type (str, optional): [插值方法，'linear'或'nearest']. Defaults to 'linear'.
+        """
+        if interp_type not in ('linear', 'nearest'):
+            raise Exception('interp_type must be linear or nearest')
+        self.lons = np.asarray(lons)
+        self.lats = np.asarray(lats)
+        self.start = tuple(start)
+        self.end = tuple(end)
+        self.steps = steps
+        self.interp_type = interp_type
+
+        crs = CFProjection({'grid_mapping_name': 'latitude_longitude'}).to_pyproj()
+        points = mpinterp.geodesic(crs, start, end, steps)
+        if (self.lons > 180).any():
+            points[points[:, 0] < 0, 0] += 360.
+        self.lon_cross = points[:, 0]
+        self.lat_cross = points[:, 1]
+
+        ix0, ix1, wx, validx = _interp_index(self.lons, self.lon_cross)
+        iy0, iy1, wy, validy = _interp_index(self.lats, self.lat_cross)
+        if interp_type == 'nearest':
+            wx = np.where(wx > 0.5, 1., 0.)
+            wy = np.where(wy > 0.5, 1., 0.)
+
+        # 四个角点的索引(4, steps)及权重(4, steps)，超出网格范围的点权重为nan
+        self._iy = np.stack([iy0, iy0, iy1, iy1])
+        self._ix = np.stack([ix0, ix1, ix0, ix1])
+        weights = np.stack([(1 - wy) * (1 - wx), (1 - wy) * wx, wy * (1 - wx), wy * wx])
+        weights[:, ~(validx & validy)] = np.nan
+        self._weights = weights
+
+    @classmethod
+    def from_data(cls, data, start, end, steps=101, interp_type='linear'):
+        """[根据stda数据的经纬度生成插值方案]
+
+        Args:
+            data ([stda]): [符合stda数据格式的等经纬度数据]
+            start ([array_like]): [剖面起点(lat, lon)]
+            end ([array_like]): [剖面终点(lat, lon)]
+            steps (int, optional): [剖面点数（包括起止点）]. Defaults to 101.
+            interp_type (str, optional): [插值方法，'linear'或'nearest']. Defaults to 'linear'.
+
+        Returns:
+            [CrossSectionPlan]: [插值方案]
+        """
+        return cls(data['lon'].values, data['lat'].values, start, end, steps=steps, interp_type=interp_type)
+
+    def match(self, data):
+        """[判断stda数据的网格是否与插值方案一致]
+        """
+        return np.array_equal(data['lon'].values, self.lons) and np.array_equal(data['lat'].values, self.lats)
+
+    def interp(self, values):
+        """[对numpy数组插值]
+
+        Args:
+            values ([ndarray]): [最后两维为(lat, lon)的数组]
+
+        Returns:
+            [ndarray]: [最后两维替换为剖面点(steps)的数组]
+        """
+        corners = values[..., self._iy, self._ix]  # [..., 4, steps]
+        if self.interp_type == 'nearest':
+            # 最近邻插值只取一个角点，其余角点的缺测值不参与计算
+            corners = np.where(self._weights == 0, 0., corners)
+        ret = np.sum(corners * self._weights, axis=-2)
+        if self.interp_type == 'nearest' and (np.issubdtype(values.dtype, np.floating) or np.isfinite(ret).all()):
+            # 最近邻插值结果即为原格点值，保持原数据类型(整型数据在剖面超出网格范围时仍为浮点)
+            ret = ret.astype(values.dtype, copy=False)
+        return ret
+
+    def apply(self, data):
+        """[对stda数据做剖面插值]
+
+        Args:
+            data ([stda]): [符合stda数据格式的等经纬度数据，网格需与插值方案一致]
+
+        Returns:
+            [stda]: [剖面stda数据，lon维为剖面点，lat维为9999，lon_cross/lat_cross为剖面点经纬度]
+        """
+        if not self.match(data):
+            raise Exception('data grid does not match CrossSectionPlan')
+
+        np_cross = self.interp(data.values)  # [member, level, time, dtime, index]
+        np_cross = np_cross[:, :, :, :, np.newaxis, :]  # 增加一维lat，然后将index转换成lon
+        cross_stda = mdgstda.numpy_to_gridstda(np_cross,
+                                               data['member'].values,
+                                               data['level'].values,
+                                               data['time'].values,
+                                               data['dtime'].values,
+                                               [9999],
+                                               self.lon_cross)
+        cross_stda.attrs = data.attrs.copy()
+
+        cross_stda.coords['crs'] = CFProjection({'grid_mapping_name': 'latitude_longitude'})
+        cross_stda = cross_stda.assign_coords({"lon_cross": ("lon", self.lon_cross)})
+        cross_stda = cross_stda.assign_coords({"lat_cross": ("lon", self.lat_cross)})
+
+        return cross_stda
+
+
+# 最近使用的剖面插值方案，同一剖面的多个要素共用
+_plan_cache = collections.OrderedDict()
+_PLAN_CACHE_SIZE = 8
+_plan_cache_lock = threading.Lock()
+
+
+def _get_plan(data, start, end, steps, interp_type):
+    key = (data['lon'].values.tobytes(), data['lat'].values.tobytes(),
+           tuple(np.asarray(start, dtype=np.float64)), tuple(np.asarray(end, dtype=np.float64)), steps, interp_type)
+    with _plan_cache_lock:
+        plan = _plan_cache.get(key)
+        if plan is not None:
+            _plan_cache.move_to_end(key)
+            return plan
+    # 在锁外生成方案，多个线程同时生成同一方案时以先写入的为准
+    plan = CrossSectionPlan.from_data(data, start, end, steps=steps, interp_type=interp_type)
+    with _plan_cache_lock:
+        plan = _plan_cache.setdefault(key, plan)
+        _plan_cache.move_to_end(key)
+        while len(_plan_cache) > _PLAN_CACHE_SIZE:
+            _plan_cache.popitem(last=False)
+    return plan
+
+
+def cross_section(data, start, end, steps=101, interp_type='linear', plan=None):
     '''
 
     [Obtain an interpolated cross-sectional slice through gridded data.]
@@ -40,30 +201,13 @@ def cross_section(data, start, end, steps=101, interp_type='linear'):
             to use in the cross section. Defaults to 100.] (default: {100})
         interp_type {str} -- [The interpolation method, either ‘linear’ or ‘nearest’
             (see xarray.DataArray.interp() for details). Defaults to ‘linear’.] (default: {'linear'})
+        plan {[CrossSectionPlan]} -- [剖面插值方案，为None时按网格、起止点及步数复用最近生成的方案] (default: {None})
     '''
 
-    # data.coords['crs'] = CFProjection({'grid_mapping_name': 'latitude_longitude'})
-    data = data.metpy.assign_crs(grid_mapping_name='latitude_longitude')  # metpy 1.0
-
-    cross_data = mpinterp.cross_section(data, start, end, steps=steps, interp_type=interp_type)
-
-    # to_stda
-    np_cross = cross_data.values  # [member, level, time, dtime, index]
-    np_cross = np_cross[:, :, :, :, np.newaxis, :]  # 增加一维lat，然后将index转换成lon
-    cross_stda = mdgstda.numpy_to_gridstda(np_cross,
-                                           cross_data['member'].values,
-                                           cross_data['level'].values,
-                                           cross_data['time'].values,
-                                           cross_data['dtime'].values,
-                                           [9999],
-                                           cross_data['lon'].values)
-    cross_stda.attrs = cross_data.attrs
-
-    cross_stda.coords['crs'] = CFProjection({'grid_mapping_name': 'latitude_longitude'})
-    cross_stda = cross_stda.assign_coords({"lon_cross": ("lon", cross_data['lon'].values)})
-    cross_stda = cross_stda.assign_coords({"lat_cross": ("lon", cross_data['lat'].values)})
+    if plan is None:
+        plan = _get_plan(data, start, end, steps, interp_type)
 
-    return cross_stda
+    return plan.apply(data)
 
 
 def cross_section_components(cross_x, cross_y):
@@ -27,24 +27,27 @@ __all__ = [
 ]
 
 def geostrophic_wind(hgt):
-    ug=hgt.copy()
-    vg=hgt.copy()
-    for ilvl in hgt['level'].values:
-        for it in hgt['time'].values:
-            for idt in hgt['dtime'].values:
-                for imdl in hgt['member'].values:
-                    hgt_pp = hgt.sel(level=ilvl,time=it,dtime=idt,member=imdl).stda.quantity
-                    dx, dy = mpcalc.lat_lon_grid_deltas(hgt['lon'].values, hgt['lat'].values)
-                    x, y = np.meshgrid(hgt['lon'].values, hgt['lat'].values)
-                    y = y * units('degrees')
-                    ug2d, vg2d = mpcalc.geostrophic_wind(hgt_pp,dx, dy,y)#,dx,dy,lat_2d*units('degree'))
-                    # absv2d = mpcalc.absolute_vorticity(ug, vg, dx, dy, y)  # 绝对涡度  '1 / second'
-                    ug.loc[dict(level=ilvl, time=it, dtime=idt, member=imdl)] = np.array(ug2d)
-                    vg.loc[dict(level=ilvl, time=it, dtime=idt, member=imdl)] = np.array(vg2d)
-
-    ug = utl.quantity_to_stda_byreference('ug', ug.values * vg2d.units, ug)
-    vg = utl.quantity_to_stda_byreference('vg', vg.values *  ug2d.units, vg)
-    return ug,vg
+    '''
+
+    [Calculate the geostrophic wind given from the height or geopotential.]
+    [only for grid stda]
+    Arguments:
+        hgt {[stda]} -- [geopotential height. ]
+
+    Returns:
+        [stda, stda] -- [ug, vg]
+    '''
+    hgt_p = utl.stda_to_quantity(hgt)
+
+    dx, dy = utl.lat_lon_grid_deltas(hgt['lon'].values, hgt['lat'].values)
+    lats = hgt['lat'].values[np.newaxis, np.newaxis, np.newaxis, np.newaxis, :, np.newaxis] * units('degrees')
+
+    ug_p, vg_p = mpcalc.geostrophic_wind(hgt_p, dx, dy, lats)
+
+    # 整块计算时metpy结果为float64，与原逐层计算一致保持输入的数据类型
+    ug = utl.quantity_to_stda_byreference('ug', ug_p, hgt).astype(hgt.dtype)
+    vg = utl.quantity_to_stda_byreference('vg', vg_p, hgt).astype(hgt.dtype)
+    return ug, vg
 
 def vertical_velocity_pressure(w, tmp, mir=0):
     '''
@@ -85,30 +88,22 @@ def vertical_velocity(vvel, tmp, mir=0):
 def var_advect(var, u, v):
     '''
 
-    [Calculate the absolute vorticity of the horizontal wind.]
-
+    [Calculate the advection of a scalar field by the horizontal wind.]
+    [only for grid stda]
     Arguments:
         var {[stda]} -- [any variable.]
         u {[stda]} -- [x component of the wind.]
         v {[stda]} -- [y component of the wind. ]
     '''
+    var_p = utl.stda_to_quantity(var)
+    u_p = utl.stda_to_quantity(u)  # m/s
+    v_p = utl.stda_to_quantity(v)  # m/s
+
+    dx, dy = utl.lat_lon_grid_deltas(u['lon'].values, u['lat'].values)
+
+    adv_p = mpcalc.advection(var_p, u=u_p, v=v_p, dx=dx, dy=dy)
 
-    dx, dy = mpcalc.lat_lon_grid_deltas(u['lon'].values, u['lat'].values)
-    adv = xr.zeros_like(u).copy()
-    for ilvl in var['level'].values:
-        for it in var['time'].values:
-            for idt in var['dtime'].values:
-                for imdl in var['member'].values:
-                    u2d = u.sel(level=ilvl, time=it, dtime=idt, member=imdl).squeeze()
-                    v2d = v.sel(level=ilvl, time=it, dtime=idt, member=imdl).squeeze()
-                    var2d = var.sel(level=ilvl, time=it, dtime=idt, member=imdl).squeeze()
-                    u2d = utl.stda_to_quantity(u2d)
-                    v2d = utl.stda_to_quantity(v2d)
-                    var2d = utl.stda_to_quantity(var2d)
-                    adv2d = mpcalc.advection(var2d, u=u2d, v=v2d, dx=dx, dy=dy)
-                    adv.loc[dict(level=ilvl, time=it, dtime=idt, member=imdl)] = np.array(adv2d)
-                    adv.attrs['var_units'] = str(adv2d.units)
-    adv = utl.quantity_to_stda_byreference(var.attrs['var_name']+'adv', adv.values * units(adv.attrs['var_units']), u)
+    adv = utl.quantity_to_stda_byreference(var.attrs['var_name'] + 'adv', adv_p, u).astype(u.dtype)
     return adv
 
 
@@ -121,30 +116,14 @@ def vorticity(u, v):
         u {[stda]} -- [x component of the wind. ]
         v {[stda]} -- [y component of the wind. ]
     '''
+    u_p = utl.stda_to_quantity(u)  # m/s
+    v_p = utl.stda_to_quantity(v)  # m/s
 
-    x, y = np.meshgrid(u['lon'].values, u['lat'].values)
-    x = x * units('degrees')
-    y = y * units('degrees')
-
-    dx, dy = mpcalc.lat_lon_grid_deltas(u['lon'].values, u['lat'].values)
-
-    vort = v.copy(deep=True)
-    for ilvl in u['level'].values:
-        for it in u['time'].values:
-            for idt in u['dtime'].values:
-                for imdl in u['member'].values:
-                    u2d = u.sel(level=ilvl, time=it, dtime=idt, member=imdl).squeeze()
-                    v2d = v.sel(level=ilvl, time=it, dtime=idt, member=imdl).squeeze()
-
-                    u2d = utl.stda_to_quantity(u2d)  # m/s
-                    v2d = utl.stda_to_quantity(v2d)  # m/s
-
-                    vort2d = mpcalc.vorticity(u2d, v2d, dx=dx, dy=dy)  # 垂直涡度  '1 / second'
+    dx, dy = utl.lat_lon_grid_deltas(u['lon'].values, u['lat'].values)
 
-                    vort.loc[dict(level=ilvl, time=it, dtime=idt, member=imdl)] = np.array(vort2d)
-                    vort.attrs['var_units'] = str(vort2d.units)
+    vort_p = mpcalc.vorticity(u_p, v_p, dx=dx, dy=dy)  # 垂直涡度  '1 / second'
 
-    vort = utl.quantity_to_stda_byreference('vort', vort.values * units(vort.attrs['var_units']), u)
+    vort = utl.quantity_to_stda_byreference('vort', vort_p, u).astype(u.dtype)
 
     return vort
 
@@ -159,31 +138,15 @@ def frontogenesis(thta, u, v):
         u {[stda]} -- [x component of the wind. ]
         v {[stda]} -- [y component of the wind. ]
     '''
-    x, y = np.meshgrid(u['lon'].values, u['lat'].values)
-    x = x * units('degrees')
-    y = y * units('degrees')
-
-    dx, dy = mpcalc.lat_lon_grid_deltas(u['lon'].values, u['lat'].values)
-
-    fg = v.copy(deep=True)
-    for ilvl in u['level'].values:
-        for it in u['time'].values:
-            for idt in u['dtime'].values:
-                for imdl in u['member'].values:
-                    thta2d = thta.sel(level=ilvl, time=it, dtime=idt, member=imdl).squeeze()
-                    u2d = u.sel(level=ilvl, time=it, dtime=idt, member=imdl).squeeze()
-                    v2d = v.sel(level=ilvl, time=it, dtime=idt, member=imdl).squeeze()
-
-                    thta2d = utl.stda_to_quantity(thta2d)  # degC
-                    u2d = utl.stda_to_quantity(u2d)  # m/s
-                    v2d = utl.stda_to_quantity(v2d)  # m/s
+    thta_p = utl.stda_to_quantity(thta)  # degC
+    u_p = utl.stda_to_quantity(u)  # m/s
+    v_p = utl.stda_to_quantity(v)  # m/s
 
-                    fg2d = mpcalc.frontogenesis(thta2d, u2d, v2d, dx=dx, dy=dy)  # kelvin / meter / second
+    dx, dy = utl.lat_lon_grid_deltas(u['lon'].values, u['lat'].values)
 
-                    fg.loc[dict(level=ilvl, time=it, dtime=idt, member=imdl)] = np.array(fg2d)
-                    fg.attrs['var_units'] = str(fg2d.units)
+    fg_p = mpcalc.frontogenesis(thta_p, u_p, v_p, dx=dx, dy=dy)  # kelvin / meter / second
 
-    fg = utl.quantity_to_stda_byreference('fg', fg.values * units(fg.attrs['var_units']), u)
+    fg = utl.quantity_to_stda_byreference('fg', fg_p, u).astype(u.dtype)
 
     return fg
 
@@ -197,30 +160,15 @@ def absolute_vorticity(u, v):
         u {[stda]} -- [x component of the wind. ]
         v {[stda]} -- [y component of the wind. ]
     '''
+    u_p = utl.stda_to_quantity(u)  # m/s
+    v_p = utl.stda_to_quantity(v)  # m/s
 
-    x, y = np.meshgrid(u['lon'].values, u['lat'].values)
-    x = x * units('degrees')
-    y = y * units('degrees')
-
-    dx, dy = mpcalc.lat_lon_grid_deltas(u['lon'].values, u['lat'].values)
-
-    absv = v.copy(deep=True)
-    for ilvl in u['level'].values:
-        for it in u['time'].values:
-            for idt in u['dtime'].values:
-                for imdl in u['member'].values:
-                    u2d = u.sel(level=ilvl, time=it, dtime=idt, member=imdl).squeeze()
-                    v2d = v.sel(level=ilvl, time=it, dtime=idt, member=imdl).squeeze()
-
-                    u2d = utl.stda_to_quantity(u2d)  # m/s
-                    v2d = utl.stda_to_quantity(v2d)  # m/s
-
-                    absv2d = mpcalc.absolute_vorticity(u2d, v2d, dx, dy, y)  # 绝对涡度  '1 / second'
+    dx, dy = utl.lat_lon_grid_deltas(u['lon'].values, u['lat'].values)
+    lats = u['lat'].values[np.newaxis, np.newaxis, np.newaxis, np.newaxis, :, np.newaxis] * units('degrees')
 
-                    absv.loc[dict(level=ilvl, time=it, dtime=idt, member=imdl)] = np.array(absv2d)
-                    absv.attrs['var_units'] = str(absv2d.units)
+    absv_p = mpcalc.absolute_vorticity(u_p, v_p, dx, dy, lats)  # 绝对涡度  '1 / second'
 
-    absv = utl.quantity_to_stda_byreference('absv', absv.values * units(absv.attrs['var_units']), u)
+    absv = utl.quantity_to_stda_byreference('absv', absv_p, u).astype(u.dtype)
 
     return absv
 
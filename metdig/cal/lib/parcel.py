@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+
+"""
+气块抬升参数（LCL/LFC/EL/CAPE/CIN）的numba单柱计算引擎，所有格点柱并行计算。
+算法与metpy的lcl、lfc、el、cape_cin一致：
+1. 干绝热抬升至抬升凝结高度(LCL，迭代求解)，之后沿湿绝热线(RK4积分)抬升
+2. LFC/EL由气块与环境温度曲线在ln(p)坐标下的交点确定
+3. CAPE/CIN采用虚温，CAPE = Rd * ∫(Tv_parcel - Tv_env) dln(p)
+输入输出单位：气压hPa，温度K，能量J/kg
+"""
+
+import numpy as np
+import numba as nb
+
+Rd = 287.04749  # J/kg/K
+Cp_d = 1004.6662  # J/kg/K
+Lv = 2.50084e6  # J/kg
+epsilon = 0.6219569
+kappa = Rd / Cp_d
+
+# 每列输出参数的顺序
+OUTPUT_NAMES = ('lcl_pres', 'lcl_tmp', 'lfc_pres', 'lfc_tmp', 'el_pres', 'el_tmp', 'cape', 'cin')
+_NOUT = len(OUTPUT_NAMES)
+
+_MOIST_STEP = 5.0  # 湿绝热积分最大步长(hPa)
+
+
+@nb.njit(cache=True)
+def _saturation_vapor_pressure(t):
+    # hPa, Bolton(1980)
+    tc = t - 273.15
+    return 6.112 * np.exp(17.67 * tc / (tc + 243.5))
+
+
+@nb.njit(cache=True)
+def _dewpoint(e):
+    val = np.log(e / 6.112)
+    return 243.5 * val / (17.67 - val) + 273.15
+
+
+@nb.njit(cache=True)
+def _mixing_ratio(e, p):
+    return epsilon * e / (p - e)
+
+
+@nb.njit(cache=True)
+def _saturation_mixing_ratio(p, t):
+    return _mixing_ratio(_saturation_vapor_pressure(t), p)
+
+
+@nb.njit(cache=True)
+def _virtual_temperature(t, w):
+    return t * (w + epsilon) / (epsilon * (1. + w))
+
+
+@nb.njit(cache=True)
+def _lcl(p0, t0, td0):
+    w = _saturation_mixing_ratio(p0, td0)
+    p = p0
+    td = td0
+    for _ in range(50):
+        e = p * w / (epsilon + w)
+        td = _dewpoint(e)
+        p_new = p0 * (td / t0) ** (1. / kappa)
+        if abs(p_new - p) < 1e-5:
+            p = p_new
+            break
+        p = p_new
+    if p > p0:
+        return p0, td0
+    e = p * w / (epsilon + w)
+    return p, _dewpoint(e)
+
+
+@nb.njit(cache=True)
+def _moist_dt(p, t):
+    rs = _saturation_mixing_ratio(p, t)
+    frac = (Rd * t + Lv * rs) / (Cp_d + (Lv * Lv * rs * epsilon / (Rd * t * t)))
+    return frac / p
+
+
+@nb.njit(cache=True)
+def _moist_lapse(p_start, t_start, p_end):
+    nstep = int(np.ceil(abs(p_end - p_start) / _MOIST_STEP))
+    if nstep < 1:
+        return t_start
+    h = (p_end - p_start) / nstep
+    p = p_start
+    t = t_start
+    for _ in range(nstep):
+        k1 = _moist_dt(p, t)
+        k2 = _moist_dt(p + 0.5 * h, t + 0.5 * h * k1)
+        k3 = _moist_dt(p + 0.5 * h, t + 0.5 * h * k2)
+        k4 = _moist_dt(p + h, t + h * k3)
+        t = t + h * (k1 + 2. * k2 + 2. * k3 + k4) / 6.
+        p = p + h
+    return t
+
+
+@nb.njit(cache=True)
+def _crossing(lnp, diff, tenv, i):
+    # 第i-1与i层之间diff过零点（ln(p)线性插值）的气压及温度
+    frac = diff[i - 1] / (diff[i - 1] - diff[i])
+    return (np.exp(lnp[i - 1] + frac * (lnp[i] - lnp[i - 1])),
+            tenv[i - 1] + frac * (tenv[i] - tenv[i - 1]))
+
+
+@nb.njit(cache=True)
+def _lfc(lnp, p, diff, tenv, n, p_lcl, t_lcl, which_top):
+    # 对应metpy.calc.lfc，diff为气块与环境温度差，第0层为起始层
+    lfc_p = np.nan
+    lfc_t = np.nan
+    n_cross = 0
+    for i in range(2, n):
+        if diff[i - 1] <= 0. and diff[i] > 0.:
+            n_cross += 1
+            cp, ct = _crossing(lnp, diff, tenv, i)
+            if cp < p_lcl:
+                if which_top or np.isnan(lfc_p):
+                    lfc_p = cp
+                    lfc_t = ct
+    if n_cross == 0:
+        # 无交点时，LCL以上气块暖于环境则LFC=LCL
+        for i in range(n):
+            if p[i] < p_lcl and diff[i] > 1e-8 + 1e-5 * abs(tenv[i]):
+                return p_lcl, t_lcl
+        return np.nan, np.nan
+    if np.isnan(lfc_p):
+        # 交点均在LCL以下
+        min_el = np.inf
+        for i in range(2, n):
+            if diff[i - 1] > 0. and diff[i] <= 0.:
+                cp, ct = _crossing(lnp, diff, tenv, i)
+                min_el = min(min_el, cp)
+        if np.isfinite(min_el) and min_el > p_lcl:
+            return np.nan, np.nan
+        return p_lcl, t_lcl
+    return lfc_p, lfc_t
+
+
+@nb.njit(cache=True)
+def _el(lnp, diff, tenv, n, p_lcl, which_top):
+    # 对应metpy.calc.el
+    if diff[n - 1] > 0.:
+        return np.nan, np.nan
+    el_p = np.nan
+    el_t = np.nan
+    last_p = np.nan
+    for i in range(2, n):
+        if diff[i - 1] > 0. and diff[i] <= 0.:
+            cp, ct = _crossing(lnp, diff, tenv, i)
+            last_p = cp
+            if cp < p_lcl:
+                if which_top or np.isnan(el_p):
+                    el_p = cp
+                    el_t = ct
+    if np.isnan(last_p) or last_p >= p_lcl:
+        return np.nan, np.nan
+    return el_p, el_t
+
+
+@nb.njit(cache=True)
+def _integrate(p, diff, n, p_bottom, p_top):
+    # Rd * ∫diff dln(p)，积分区间[p_top, p_bottom]，在区间端点及diff过零点处插值
+    total = 0.
+    for i in range(1, n):
+        pa = p[i - 1]
+        pb = p[i]
+        da = diff[i - 1]
+        db = diff[i]
+        lo = max(pb, p_top)
+        hi = min(pa, p_bottom)
+        if lo >= hi:
+            continue
+        lna = np.log(pa)
+        lnb = np.log(pb)
+        x0 = np.log(hi)
+        x1 = np.log(lo)
+        d0 = da + (db - da) * (x0 - lna) / (lnb - lna)
+        d1 = da + (db - da) * (x1 - lna) / (lnb - lna)
+        if d0 * d1 < 0.:
+            xm = x0 + (x1 - x0) * d0 / (d0 - d1)
+            total += 0.5 * d0 * (x0 - xm) + 0.5 * d1 * (xm - x1)
+        else:
+            total += 0.5 * (d0 + d1) * (x0 - x1)
+    return Rd * total
+
+
+@nb.njit(cache=True)
+def _column(pres, tmp, td, which_top, out):
+    nlev = pres.shape[0]
+    for k in range(out.shape[0]):
+        out[k] = np.nan
+
+    # 去除缺测层，保证气压单调递减
+    p = np.empty(nlev)
+    t = np.empty(nlev)
+    d = np.empty(nlev)
+    n = 0
+    for i in range(nlev):
+        if np.isfinite(pres[i]) and np.isfinite(tmp[i]) and np.isfinite(td[i]) and pres[i] > 0.:
+            if n > 0 and pres[i] >= p[n - 1]:
+                continue
+            p[n] = pres[i]
+            t[n] = tmp[i]
+            d[n] = min(td[i], tmp[i])
+            n += 1
+    if n < 2:
+        return
+
+    p_lcl, t_lcl = _lcl(p[0], t[0], d[0])
+    out[0] = p_lcl
+    out[1] = t_lcl
+
+    # 气块温度廓线
+    lnp = np.empty(n)
+    tp = np.empty(n)
+    diff = np.empty(n)
+    p_last = p_lcl
+    t_last = t_lcl
+    for i in range(n):
+        lnp[i] = np.log(p[i])
+        if p[i] >= p_lcl:
+            tp[i] = t[0] * (p[i] / p[0]) ** kappa
+        else:
+            t_last = _moist_lapse(p_last, t_last, p[i])
+            p_last = p[i]
+            tp[i] = t_last
+        diff[i] = tp[i] - t[i]
+
+    out[2], out[3] = _lfc(lnp, p, diff, t, n, p_lcl, t_lcl, which_top)
+    out[4], out[5] = _el(lnp, diff, t, n, p_lcl, which_top)
+
+    # CAPE/CIN，采用虚温，LFC取最低、EL取最高
+    w0 = _saturation_mixing_ratio(p[0], d[0])
+    tv = np.empty(n)
+    diff_v = np.empty(n)
+    for i in range(n):
+        tv[i] = _virtual_temperature(t[i], _saturation_mixing_ratio(p[i], d[i]))
+        if p[i] > p_lcl:
+            tpv = _virtual_temperature(tp[i], w0)
+        else:
+            tpv = _virtual_temperature(tp[i], _saturation_mixing_ratio(p[i], tp[i]))
+        diff_v[i] = tpv - tv[i]
+    tv_lcl_p, tv_lcl_t = _lcl(p[0], tv[0], d[0])
+    lfc_p, _ = _lfc(lnp, p, diff_v, tv, n, tv_lcl_p, tv_lcl_t, False)
+    if np.isnan(lfc_p):
+        out[6] = 0.
+        out[7] = 0.
+        return
+    el_p, _ = _el(lnp, diff_v, tv, n, tv_lcl_p, True)
+    if np.isnan(el_p):
+        el_p = p[n - 1]
+    out[6] = _integrate(p, diff_v, n, lfc_p, el_p)
+    out[7] = min(_integrate(p, diff_v, n, p[0], lfc_p), 0.)
+
+
+# 串行、并行各自定义一个函数：numba的磁盘缓存按函数名及源码行区分，同一函数的两个jit版本会共用一个缓存项
+@nb.njit(cache=True)
+def _columns_serial(pres, tmp, td, which_top):
+    out = np.empty((pres.shape[0], _NOUT))
+    for icol in range(pres.shape[0]):
+        _column(pres[icol], tmp[icol], td[icol], which_top, out[icol])
+    return out
+
+
+@nb.njit(cache=True, parallel=True)
+def _columns_parallel(pres, tmp, td, which_top):
+    out = np.empty((pres.shape[0], _NOUT))
+    for icol in nb.prange(pres.shape[0]):
+        _column(pres[icol], tmp[icol], td[icol], which_top, out[icol])
+    return out
+
+
+def parcel_columns(pres, tmp, td, which='top', parallel=True, threads=None):
+    """[逐柱计算气块抬升参数]
+
+    Args:
+        pres ([np.ndarray]): [气压(hPa)，shape为(ncol, nlev)，每列第0层为气块起始层，缺测为nan]
+        tmp ([np.ndarray]): [温度(K)，shape同pres]
+        td ([np.ndarray]): [露点温度(K)，shape同pres]
+        which (str, optional): [存在多个LFC/EL时的取值，'top'取最高，'bottom'取最低]. Defaults to 'top'.
+        parallel (bool, optional): [是否多线程并行计算]. Defaults to True.
+        threads ([int], optional): [并行线程数，默认为numba默认线程数]. Defaults to None.
+
+    Returns:
+        [np.ndarray]: [shape为(ncol, 8)，各列依次为OUTPUT_NAMES]
+    """
+    if which not in ('top', 'bottom'):
+        raise Exception('which must be top or bottom')
+    pres = np.ascontiguousarray(pres, dtype=np.float64)
+    tmp = np.ascontiguousarray(tmp, dtype=np.float64)
+    td = np.ascontiguousarray(td, dtype=np.float64)
+    which_top = which == 'top'
+    if not parallel:
+        return _columns_serial(pres, tmp, td, which_top)
+    if threads is None:
+        return _columns_parallel(pres, tmp, td, which_top)
+    old_threads = nb.get_num_threads()
+    nb.set_num_threads(min(int(threads), nb.config.NUMBA_NUM_THREADS))
+    try:
+        return _columns_parallel(pres, tmp, td, which_top)
+    finally:
+        nb.set_num_threads(old_threads)
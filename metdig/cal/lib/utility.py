@@ -3,6 +3,7 @@
 import xarray as xr
 import pandas as pd
 import numpy as np
+import threading
 
 from metpy.units import units 
 
@@ -81,3 +82,37 @@ def quantity_to_stda_byreference(var_name, data, reference_variables,
     else:
         raise Exception('stda_to_Quantity Failed! type(reference_variables) must be pd.DataFrame or xr.DataArray!')
 
+
+
+_grid_deltas_cache = {}
+_grid_deltas_lock = threading.Lock()
+
+
+def lat_lon_grid_deltas(lons, lats):
+    '''
+
+    [获取经纬度网格的dx, dy（同mpcalc.lat_lon_grid_deltas），同一网格只计算一次，返回扩展到stda六维(member, level, time, dtime, lat, lon)的dx, dy]
+
+    Arguments:
+        lons {[ndarray]} -- [一维经度]
+        lats {[ndarray]} -- [一维纬度]
+
+    Returns:
+        [quantity, quantity] -- [dx, dy]
+    '''
+    import metpy.calc as mpcalc
+
+    lons = np.asarray(lons)
+    lats = np.asarray(lats)
+    key = (lons.dtype.str, lons.tobytes(), lats.dtype.str, lats.tobytes())
+    with _grid_deltas_lock:
+        deltas = _grid_deltas_cache.get(key)
+    if deltas is None:
+        dx, dy = mpcalc.lat_lon_grid_deltas(lons, lats)
+        deltas = (dx[np.newaxis, np.newaxis, np.newaxis, np.newaxis, :, :],
+                  dy[np.newaxis, np.newaxis, np.newaxis, np.newaxis, :, :])
+        with _grid_deltas_lock:
+            if key not in _grid_deltas_cache and len(_grid_deltas_cache) >= 16:
+                _grid_deltas_cache.pop(next(iter(_grid_deltas_cache)))
+            _grid_deltas_cache[key] = deltas
+    return deltas
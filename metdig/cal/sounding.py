@@ -9,9 +9,11 @@ import metpy.calc as mpcalc
 from metpy.units import units
 
 from metdig.cal.lib import utility as utl
+from metdig.cal.lib import parcel
 import metdig.utl as mdgstda
 
 __all__ = [
+    'parcel_params',
     'lfc',
     'lcl',
     'parcel_profile',
@@ -30,53 +32,75 @@ __all__ = [
 
 #     return lcl_pres, lcl_tmp
 
-def lfc(pres,tmp,td,psfc=None,t2m=None,td2m=None,parcel_temperature_profile=None,dewpoint_start=None, which='top'):
-    #如果psfc=None,t2m=None,td2m=None，则默认从pres的最低层抬升
-    #如果psfc、t2m、td2m都不为None 则默认从模式地面开始抬升
-    lfc_pres=xr.zeros_like(pres.isel(level=[0])).copy()
-    lfc_pres.level.values[0]=0
-    lfc_pres.attrs['var_cn_name']='自由对流气压'
-    lfc_tmp=xr.zeros_like(tmp.isel(level=[0])).copy()
-    lfc_tmp.level.values[0]=0
-    lfc_tmp.attrs['var_cn_name']='自由对流温度'
+def _parcel_columns(pres, tmp, td, psfc=None, t2m=None, td2m=None):
+    # stda转为(ncol, nlev)的气压(hPa)、温度(K)、露点(K)数组，每列按气压由大到小排列，第0层为气块起始层
+    nlev = pres.level.size
+    pres_np = np.moveaxis(utl.stda_to_quantity(pres).to('hPa').magnitude, 1, -1).reshape(-1, nlev)
+    tmp_np = np.moveaxis(utl.stda_to_quantity(tmp).to('K').magnitude, 1, -1).reshape(-1, nlev)
+    td_np = np.moveaxis(utl.stda_to_quantity(td).to('K').magnitude, 1, -1).reshape(-1, nlev)
+
+    idx = np.argsort(np.where(np.isfinite(pres_np), -pres_np, np.inf), axis=1, kind='stable')
+    pres_np = np.take_along_axis(pres_np, idx, axis=1)
+    tmp_np = np.take_along_axis(tmp_np, idx, axis=1)
+    td_np = np.take_along_axis(td_np, idx, axis=1)
 
     if((psfc is not None) and (t2m is not None) and (td2m is not None)):
-        psfc['level']=('level',[9999])
-        t2m['level']=('level',[9999])
-        td2m['level']=('level',[9999])
-
-    for imember in pres.member.values:
-        for idtime in pres.dtime.values:
-            for itime in pres.time.values:
-                for ilon in pres.lon.values:
-                    for ilat in pres.lat.values:
-                        pres1d=pres.sel(member=[imember],dtime=[idtime],time=[itime],lon=[ilon],lat=[ilat])
-                        tmp1d=tmp.sel(member=[imember],dtime=[idtime],time=[itime],lon=[ilon],lat=[ilat])
-                        td1d=td.sel(member=[imember],dtime=[idtime],time=[itime],lon=[ilon],lat=[ilat])
-                        try:
-                            if((psfc is not None) and (t2m is not None) and (td2m is not None)):
-                                psfc1d=psfc.sel(member=[imember],dtime=[idtime],time=[itime],lon=[ilon],lat=[ilat]).copy()
-                                t2m1d=t2m.sel(member=[imember],dtime=[idtime],time=[itime],lon=[ilon],lat=[ilat]).copy()
-                                td2m1d=td2m.sel(member=[imember],dtime=[idtime],time=[itime],lon=[ilon],lat=[ilat]).copy()
-
-                                pres1d=pres1d.where(pres1d<psfc1d.values,drop=True)
-                                tmp1d=tmp1d.where(pres1d<psfc1d.values,drop=True)
-                                td1d=td1d.where(pres1d<psfc1d.values,drop=True)
-
-                                pres1d_p=xr.concat([pres1d,psfc1d],dim='level').sortby('level',ascending=False).stda.quantity.squeeze()
-                                tmp1d_p=xr.concat([tmp1d,t2m1d],dim='level').sortby('level',ascending=False).stda.quantity.squeeze()
-                                td1d_p=xr.concat([td1d,td2m1d],dim='level').sortby('level',ascending=False).stda.quantity.squeeze()
-                                lfc_pres1d_p,lfc_tmp1d_p=mpcalc.lfc(pres1d_p,tmp1d_p,td1d_p)
-                            else:
-                                pres1d_p=pres1d.stda.quantity.squeeze()
-                                tmp1d_p=tmp1d.stda.quantity.squeeze()
-                                td1d_p=td1d.stda.quantity.squeeze()
-                                lfc_pres1d_p,lfc_tmp1d_p=mpcalc.lfc(pres1d_p,tmp1d_p,td1d_p)
-                            lfc_pres.loc[dict(member=[imember],dtime=[idtime],time=[itime],lon=[ilon],lat=[ilat])]=[lfc_pres1d_p.magnitude]
-                            lfc_tmp.loc[dict(member=[imember],dtime=[idtime],time=[itime],lon=[ilon],lat=[ilat])]=[lfc_tmp1d_p.magnitude]
-                        except:
-                            lfc_pres.loc[dict(member=[imember],dtime=[idtime],time=[itime],lon=[ilon],lat=[ilat])]=[np.nan]
-                            lfc_tmp.loc[dict(member=[imember],dtime=[idtime],time=[itime],lon=[ilon],lat=[ilat])]=[np.nan]
+        # 从模式地面开始抬升，去除地面以下的层次
+        psfc_np = np.moveaxis(utl.stda_to_quantity(psfc).to('hPa').magnitude, 1, -1).reshape(-1, 1)
+        t2m_np = np.moveaxis(utl.stda_to_quantity(t2m).to('K').magnitude, 1, -1).reshape(-1, 1)
+        td2m_np = np.moveaxis(utl.stda_to_quantity(td2m).to('K').magnitude, 1, -1).reshape(-1, 1)
+        pres_np = np.where(pres_np < psfc_np, pres_np, np.nan)
+        pres_np = np.concatenate([psfc_np, pres_np], axis=1)
+        tmp_np = np.concatenate([t2m_np, tmp_np], axis=1)
+        td_np = np.concatenate([td2m_np, td_np], axis=1)
+
+    return pres_np, tmp_np, td_np
+
+
+def parcel_params(pres, tmp, td, psfc=None, t2m=None, td2m=None, which='top', parallel=True, threads=None):
+    """[计算气块抬升参数(LCL/LFC/EL/CAPE/CIN)，所有格点柱由numba并行计算]
+
+    Args:
+        pres ([stda]): [气压(hPa)，可由gridstda_full_like_by_levels生成]
+        tmp ([stda]): [温度]
+        td ([stda]): [露点温度]
+        psfc ([stda], optional): [地面气压，psfc、t2m、td2m均不为None时从模式地面开始抬升，否则从pres的最低层抬升]. Defaults to None.
+        t2m ([stda], optional): [2米温度]. Defaults to None.
+        td2m ([stda], optional): [2米露点温度]. Defaults to None.
+        which (str, optional): [存在多个LFC/EL时的取值，'top'取最高，'bottom'取最低]. Defaults to 'top'.
+        parallel (bool, optional): [是否多线程并行计算]. Defaults to True.
+        threads ([int], optional): [并行线程数，默认为numba默认线程数]. Defaults to None.
+
+    Returns:
+        [stda]: [lcl_pres, lcl_tmp, lfc_pres, lfc_tmp, el_pres, el_tmp, cape, cin，层次为0。
+                 CAPE/CIN采用虚温订正，无LFC时为0；无EL时CAPE积分至最高层]
+    """
+    pres_np, tmp_np, td_np = _parcel_columns(pres, tmp, td, psfc=psfc, t2m=t2m, td2m=td2m)
+    out = parcel.parcel_columns(pres_np, tmp_np, td_np, which=which, parallel=parallel, threads=threads)
+
+    ref = pres.isel(level=[0]).assign_coords(level=[0])
+    shape = ref.shape[:1] + ref.shape[2:]
+    out = out.reshape(shape + (out.shape[-1],))
+    out = np.expand_dims(np.moveaxis(out, -1, 0), 2)  # (8, member, level, time, dtime, lat, lon)
+
+    lcl_pres = utl.quantity_to_stda_byreference('pres', out[0] * units('hPa'), ref, var_cn_name='抬升凝结气压')
+    lcl_tmp = utl.quantity_to_stda_byreference('tmp', out[1] * units('K'), ref, var_cn_name='抬升凝结温度')
+    lfc_pres = utl.quantity_to_stda_byreference('pres', out[2] * units('hPa'), ref, var_cn_name='自由对流气压')
+    lfc_tmp = utl.quantity_to_stda_byreference('tmp', out[3] * units('K'), ref, var_cn_name='自由对流温度')
+    el_pres = utl.quantity_to_stda_byreference('pres', out[4] * units('hPa'), ref, var_cn_name='平衡高度气压')
+    el_tmp = utl.quantity_to_stda_byreference('tmp', out[5] * units('K'), ref, var_cn_name='平衡高度温度')
+    cape = utl.quantity_to_stda_byreference('cape', out[6] * units('J/kg'), ref)
+    cin = utl.quantity_to_stda_byreference('cin', out[7] * units('J/kg'), ref)
+
+    return lcl_pres, lcl_tmp, lfc_pres, lfc_tmp, el_pres, el_tmp, cape, cin
+
+
+def lfc(pres,tmp,td,psfc=None,t2m=None,td2m=None,parcel_temperature_profile=None,dewpoint_start=None, which='top', parallel=True, threads=None):
+    #如果psfc=None,t2m=None,td2m=None，则默认从pres的最低层抬升
+    #如果psfc、t2m、td2m都不为None 则默认从模式地面开始抬升
+    #由parcel_params逐柱并行计算，parcel_temperature_profile、dewpoint_start暂不支持
+    _, _, lfc_pres, lfc_tmp, _, _, _, _ = parcel_params(pres, tmp, td, psfc=psfc, t2m=t2m, td2m=td2m,
+                                                        which=which, parallel=parallel, threads=threads)
     return lfc_pres,lfc_tmp
 if __name__=='__main__':
     import metdig
@@ -1,15 +1,19 @@
-from . import boxplot_method
-from . import barbs_method
-from . import scatter_method
-from . import streamplot_method
-from . import contour_method
-from . import contourf_method
-from . import draw_compose
-from . import other_method
-from . import pallete_set
-from . import pcolormesh_method
-from . import quiver_method
-from . import text_method
+from metdig.lazy_import import lazy_submodules
 
-from . import lib
-from . import cmap
\ No newline at end of file
+# 子模块在首次访问时导入
+__getattr__, __dir__ = lazy_submodules(__name__, [
+    'boxplot_method',
+    'barbs_method',
+    'scatter_method',
+    'streamplot_method',
+    'contour_method',
+    'contourf_method',
+    'draw_compose',
+    'other_method',
+    'pallete_set',
+    'pcolormesh_method',
+    'quiver_method',
+    'text_method',
+    'lib',
+    'cmap',
+])
@@ -10,6 +10,8 @@
 import os
 import sys
 import re
+import copy
+import threading
 import glob
 import pathlib
 import pkg_resources
@@ -23,6 +25,146 @@ from metdig.graphics.cmap.cpt import gmtColormap_openfile
 pkg_name = 'metdig.graphics'
 
 
+def _parse_palette(cmap_file):
+    # 解析.rgb/.txt颜色表文件，返回(n, 3)的rgb数组(0-1)
+    pattern = re.compile(r'(\d\.?\d*)\s+(\d\.?\d*)\s+(\d\.?\d*).*')
+    with open(cmap_file) as cmap:
+        cmap_buff = cmap.read()
+    cmap_buff = re.compile('ncolors.*\n').sub('', cmap_buff)
+    if re.search(r'\s*\d\.\d*', cmap_buff):
+        rgb = np.asarray(pattern.findall(cmap_buff), 'f4')
+    else:
+        rgb = np.asarray(pattern.findall(cmap_buff), 'u1') / 255.
+    return rgb
+
+
+def _levels_key(levels):
+    if levels is None:
+        return None
+    return tuple(np.asarray(levels, dtype=np.float64).ravel().tolist())
+
+
+class ColormapRegistry(object):
+    '''
+    进程内颜色表缓存：
+    1. 颜色表文件仅解析一次，rgb数组保存在内存中，可选保存至二进制缓存文件(npz)
+    2. 按(name, extend, levels, isLinear)缓存get_cmap生成的cmap及norm，每次返回其拷贝
+    '''
+
+    # 颜色表类别对应的资源目录及文件后缀
+    _kinds = {
+        'met': ('resources/colormaps_met/', '.rgb'),
+        'ncl': ('resources/colormaps_ncl/', '.rgb'),
+        'guide': ('resources/colormaps_guide/', '.txt'),
+    }
+
+    def __init__(self, cache_file=None):
+        """[初始化]
+
+        Args:
+            cache_file ([str], optional): [颜色表rgb数组的二进制缓存文件(npz)，为None时仅缓存在内存中]. Defaults to None.
+        """
+        self.cache_file = cache_file
+        self._palettes = {}
+        self._cmaps = {}
+        self._cache_loaded = False
+        self._lock = threading.RLock()
+
+    def _load_cache_file(self):
+        self._cache_loaded = True
+        if self.cache_file is None or not os.path.isfile(self.cache_file):
+            return
+        try:
+            with np.load(self.cache_file, allow_pickle=False) as f:
+                for key in f.files:
+                    self._palettes.setdefault(key, f[key])
+        except Exception:
+            pass
+
+    def palette(self, kind, name):
+        """[获取颜色表文件中的rgb数组]
+
+        Args:
+            kind ([str]): [颜色表类别，met/ncl/guide]
+            name ([str]): [颜色表名称]
+
+        Returns:
+            [ndarray]: [(n, 3)的rgb数组，颜色表不存在时返回None]
+        """
+        key = kind + '/' + name
+        with self._lock:
+            if not self._cache_loaded:
+                self._load_cache_file()
+            rgb = self._palettes.get(key)
+            if rgb is not None:
+                return rgb
+            subdir, suffix = self._kinds[kind]
+            cmap_file = pkg_resources.resource_filename(pkg_name, subdir + name + suffix)
+            if not os.path.isfile(cmap_file):
+                return None
+            rgb = _parse_palette(cmap_file)
+            rgb.flags.writeable = False
+            self._palettes[key] = rgb
+            if self.cache_file is not None:
+                self.save()
+            return rgb
+
+    def get_cmap(self, name, extend='neither', levels=None, isLinear=False):
+        """[同get_cmap，结果按(name, extend, levels, isLinear)缓存]
+        """
+        if isinstance(name, str):
+            name_key = name
+        elif isinstance(name, list) and all(isinstance(x, str) for x in name):
+            name_key = tuple(name)
+        else:
+            # cmap对象或数值颜色列表不缓存
+            return _get_cmap(name, extend=extend, levels=levels, isLinear=isLinear)
+
+        key = (name_key, extend, _levels_key(levels), bool(isLinear))
+        with self._lock:
+            ret = self._cmaps.get(key)
+            if ret is None:
+                ret = _get_cmap(name, extend=extend, levels=levels, isLinear=isLinear)
+                self._cmaps[key] = ret
+        if levels is None:
+            return copy.copy(ret)
+        # norm的浅拷贝与缓存共用callbacks及boundaries，每次调用新建
+        norm = ret[1]
+        return copy.copy(ret[0]), mpl.colors.BoundaryNorm(norm.boundaries.copy(), norm.Ncmap, clip=norm.clip, extend=norm.extend)
+
+    def save(self, cache_file=None):
+        """[将已解析的颜色表rgb数组保存至二进制缓存文件]
+
+        Args:
+            cache_file ([str], optional): [缓存文件，默认为self.cache_file]. Defaults to None.
+        """
+        cache_file = cache_file or self.cache_file
+        if cache_file is None:
+            return
+        with self._lock:
+            palettes = dict(self._palettes)
+        try:
+            dirname = os.path.dirname(os.path.abspath(cache_file))
+            os.makedirs(dirname, exist_ok=True)
+            tmp_file = '{}.{}.tmp.npz'.format(cache_file, os.getpid())
+            np.savez(tmp_file, **palettes)
+            os.replace(tmp_file, cache_file)
+        except Exception:
+            pass
+
+    def clear(self):
+        """[清空内存中的缓存]
+        """
+        with self._lock:
+            self._palettes.clear()
+            self._cmaps.clear()
+            self._cache_loaded = False
+
+
+# 进程内默认的颜色表缓存
+cmap_registry = ColormapRegistry()
+
+
 def make_cmap(incolors, position=None, rgb=False, hex=False):
     """
     Takes a list of tuples which contain RGB values. The RGB
@@ -129,6 +271,10 @@ def get_cmap(name, extend='neither', levels=None, isLinear=False):
     Returns:
         [type]: [cmap [norm]]
     """
+    return cmap_registry.get_cmap(name, extend=extend, levels=levels, isLinear=isLinear)
+
+
+def _get_cmap(name, extend='neither', levels=None, isLinear=False):
     if isinstance(name,str) == False and isinstance(name,list) == False:  
         # 应对可能用户喂进来的本身就是cmap
         try:
@@ -187,7 +333,7 @@ def get_cmap(name, extend='neither', levels=None, isLinear=False):
     # 确定对应levels和extend的颜色列表
     # 如果颜色少于N则会拉伸颜色列表和N等长
     # 如果颜色大于N则会等会自动跳跃
-    idx = np.linspace(0, colors.shape[0] - 1, N, dtype=np.int)
+    idx = np.linspace(0, colors.shape[0] - 1, N, dtype=int)
     colors = colors[idx]
     # print(N, idx, colors)
 
@@ -222,22 +368,11 @@ def met_cmaps(name):
     :return: matlibplot color map.
     """
 
-    # color map file directory
-    cmap_file = pkg_resources.resource_filename(
-        pkg_name, "resources/colormaps_met/" + name + '.rgb')
-    if not os.path.isfile(cmap_file):
+    # read color data (颜色表文件仅解析一次)
+    rgb = cmap_registry.palette('met', name)
+    if rgb is None:
         return None
 
-    # read color data
-    pattern = re.compile(r'(\d\.?\d*)\s+(\d\.?\d*)\s+(\d\.?\d*).*')
-    with open(cmap_file) as cmap:
-        cmap_buff = cmap.read()
-    cmap_buff = re.compile('ncolors.*\n').sub('', cmap_buff)
-    if re.search(r'\s*\d\.\d*', cmap_buff):
-        rgb = np.asarray(pattern.findall(cmap_buff), 'f4')
-    else:
-        rgb = np.asarray(pattern.findall(cmap_buff), 'u1') / 255.
-
     # construct color map
     return ListedColormap(rgb, name=name)
 
@@ -250,22 +385,11 @@ def ncl_cmaps(name):
     :return: matlibplot color map.
     """
 
-    # color map file directory
-    cmap_file = pkg_resources.resource_filename(
-        pkg_name, "resources/colormaps_ncl/" + name + '.rgb')
-    if not os.path.isfile(cmap_file):
+    # read color data (颜色表文件仅解析一次)
+    rgb = cmap_registry.palette('ncl', name)
+    if rgb is None:
         return None
 
-    # read color data
-    pattern = re.compile(r'(\d\.?\d*)\s+(\d\.?\d*)\s+(\d\.?\d*).*')
-    with open(cmap_file) as cmap:
-        cmap_buff = cmap.read()
-    cmap_buff = re.compile('ncolors.*\n').sub('', cmap_buff)
-    if re.search(r'\s*\d\.\d*', cmap_buff):
-        rgb = np.asarray(pattern.findall(cmap_buff), 'f4')
-    else:
-        rgb = np.asarray(pattern.findall(cmap_buff), 'u1') / 255.
-
     # construct color map
     return ListedColormap(rgb, name=name)
 
@@ -278,27 +402,11 @@ def guide_cmaps(name):
     :return: matplotlib color map.
     """
 
-    # color map file directory
-    cmap_file = pkg_resources.resource_filename(
-        pkg_name, "resources/colormaps_guide/" + name + '.txt')
-    if not os.path.isfile(cmap_file):
+    # read color data (颜色表文件仅解析一次)
+    rgb = cmap_registry.palette('guide', name)
+    if rgb is None:
         return None
 
-    # # read color data
-    # rgb = np.loadtxt(cmap_file)
-
-    # # construct color map
-    # return ListedColormap(rgb / 255, name=name)
-    # read color data
-    pattern = re.compile(r'(\d\.?\d*)\s+(\d\.?\d*)\s+(\d\.?\d*).*')
-    with open(cmap_file) as cmap:
-        cmap_buff = cmap.read()
-    cmap_buff = re.compile('ncolors.*\n').sub('', cmap_buff)
-    if re.search(r'\s*\d\.\d*', cmap_buff):
-        rgb = np.asarray(pattern.findall(cmap_buff), 'f4')
-    else:
-        rgb = np.asarray(pattern.findall(cmap_buff), 'u1') / 255.
-
     # construct color map
     return ListedColormap(rgb, name=name)
 
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+"""
+底图shapefile几何缓存：
+1. 首次使用时解析shapefile，按缩放级别抽稀，以WKB格式保存至缓存目录(get_cache_dir()/MAP_GEOMETRY)
+2. 进程内保留已解码的几何对象，绘图时仅返回与当前地图范围相交的几何对象
+shapefile修改(文件大小或修改时间变化)后自动重新生成缓存。
+"""
+
+import os
+import pickle
+import hashlib
+import threading
+
+import numpy as np
+import shapely.wkb
+from cartopy.io.shapereader import Reader
+
+import logging
+_log = logging.getLogger(__name__)
+
+# 各缩放级别的抽稀容差(度)，0为原始几何
+ZOOM_TOLERANCES = (0., 0.005, 0.02, 0.08)
+
+
+def _select_tolerance(extent):
+    # 按地图范围选择抽稀容差，约为2000像素宽度下单个像素的经纬度跨度
+    if extent is None:
+        return ZOOM_TOLERANCES[0]
+    span = max(extent[1] - extent[0], extent[3] - extent[2])
+    tolerance = ZOOM_TOLERANCES[0]
+    for tol in ZOOM_TOLERANCES:
+        if tol <= span / 2000.:
+            tolerance = tol
+    return tolerance
+
+
+class MapGeometryCache(object):
+    '''
+    底图shapefile几何缓存
+    '''
+
+    def __init__(self, cache_dir=None):
+        """[初始化]
+
+        Args:
+            cache_dir ([str], optional): [缓存目录，默认为get_cache_dir()/MAP_GEOMETRY]. Defaults to None.
+        """
+        self._cache_dir = cache_dir
+        self._items = {}
+        self._lock = threading.Lock()
+
+    @property
+    def cache_dir(self):
+        if self._cache_dir is None:
+            from metdig.io.lib import config as CONFIG
+            return os.path.join(CONFIG.get_cache_dir(), 'MAP_GEOMETRY')
+        return self._cache_dir
+
+    def _cache_file(self, shpfile):
+        stat = os.stat(shpfile)
+        key = hashlib.md5('{}|{}|{}|{}'.format(os.path.realpath(shpfile), stat.st_size, stat.st_mtime,
+                                               ZOOM_TOLERANCES).encode('utf-8')).hexdigest()
+        name = os.path.splitext(os.path.basename(shpfile))[0]
+        return os.path.join(self.cache_dir, '{}_{}.pkl'.format(name, key))
+
+    def _build(self, shpfile):
+        geoms = [g for g in Reader(shpfile).geometries() if g is not None and not g.is_empty]
+        bounds = np.array([g.bounds for g in geoms], dtype=np.float64).reshape(-1, 4)
+        wkbs = {}
+        for tol in ZOOM_TOLERANCES:
+            if tol == 0:
+                wkbs[tol] = [g.wkb for g in geoms]
+            else:
+                wkbs[tol] = [g.simplify(tol, preserve_topology=True).wkb for g in geoms]
+        return {'bounds': bounds, 'wkb': wkbs}
+
+    def _load(self, shpfile):
+        cache_file = self._cache_file(shpfile)
+        content = None
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'rb') as f:
+                    content = pickle.load(f)
+            except Exception as e:
+                _log.info('map geometry cache {} broken: {}'.format(cache_file, e))
+                content = None
+        if content is None:
+            content = self._build(shpfile)
+            tmp_file = '{}.{}.{}.tmp'.format(cache_file, os.getpid(), threading.get_ident())
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(tmp_file, 'wb') as f:
+                    pickle.dump(content, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_file, cache_file)
+            except Exception as e:
+                _log.info('map geometry cache write {} failed: {}'.format(cache_file, e))
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+        # 各缩放级别的几何对象在首次使用时再解码
+        return {'bounds': content['bounds'], 'wkb': content['wkb'], 'geoms': {}}
+
+    def geometries(self, shpfile, extent=None):
+        """[获取shapefile中与地图范围相交的几何对象]
+
+        Args:
+            shpfile ([str]): [shapefile文件路径]
+            extent ([list], optional): [地图范围[lon0, lon1, lat0, lat1]，为None时返回全部几何对象]. Defaults to None.
+
+        Returns:
+            [list]: [shapely几何对象列表]
+        """
+        with self._lock:
+            item = self._items.get(shpfile)
+            if item is None:
+                item = self._load(shpfile)
+                self._items[shpfile] = item
+            tolerance = _select_tolerance(extent)
+            geoms = item['geoms'].get(tolerance)
+            if geoms is None:
+                geoms = [shapely.wkb.loads(w) for w in item['wkb'][tolerance]]
+                item['geoms'][tolerance] = geoms
+
+        if extent is None:
+            return list(geoms)
+
+        bounds = item['bounds']
+        mask = (bounds[:, 3] >= extent[2]) & (bounds[:, 1] <= extent[3])
+        if extent[0] > -180 and extent[1] < 180:
+            mask &= (bounds[:, 2] >= extent[0]) & (bounds[:, 0] <= extent[1])
+        return [geoms[i] for i in np.flatnonzero(mask)]
+
+    def clear(self):
+        """[清空进程内缓存及缓存目录]
+        """
+        with self._lock:
+            self._items.clear()
+            if os.path.exists(self.cache_dir):
+                for f in os.listdir(self.cache_dir):
+                    os.remove(os.path.join(self.cache_dir, f))
+
+
+# 进程内默认的缓存实例
+map_geometry_cache = MapGeometryCache()
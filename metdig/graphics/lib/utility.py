@@ -10,6 +10,7 @@ import pkg_resources
 import matplotlib.pyplot as plt
 import matplotlib.image as image
 import matplotlib.patches as patches
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import PIL
 from functools import wraps
 
@@ -215,20 +216,41 @@ def img_trim(img):
     return new_img
 
 
-def get_imgbuf_from_fig(fig, dpi=200):
+def get_imgbuf_from_fig(fig, dpi=200, raw=True):
     # define a function which returns an image as numpy array from figure
-    # raw to image array
-    io_buf = io.BytesIO()
-    fig.savefig(io_buf, format='png', dpi=dpi)  # save raw
-    io_buf.seek(0)
+    # raw=True时直接读取Agg画布的RGBA数据，省去png编码及解码；非Agg画布时仍通过png获取
+    if raw and isinstance(fig.canvas, FigureCanvasAgg):
+        img_arr = _get_rgba_from_agg(fig, dpi=dpi)
+    else:
+        # raw to image array
+        io_buf = io.BytesIO()
+        fig.savefig(io_buf, format='png', dpi=dpi)  # save raw
+        io_buf.seek(0)
 
-    pil_img = PIL.Image.open(io_buf)
-    img_arr = np.array(pil_img)
+        pil_img = PIL.Image.open(io_buf)
+        img_arr = np.array(pil_img)
 
     # 去除周围空白
     # print(img_arr.shape)
     img_arr = img_trim(img_arr)
 
+    return np.ascontiguousarray(img_arr)
+
+
+def _get_rgba_from_agg(fig, dpi=200):
+    # 按savefig的方式(dpi及背景色)重绘Agg画布，返回RGBA数组的拷贝
+    orig_dpi = fig.dpi
+    orig_facecolor = fig.get_facecolor()
+    facecolor = plt.rcParams['savefig.facecolor']
+    if not (isinstance(facecolor, str) and facecolor == 'auto'):
+        fig.set_facecolor(facecolor)
+    fig.dpi = dpi
+    try:
+        fig.canvas.draw()
+        img_arr = np.array(fig.canvas.buffer_rgba())
+    finally:
+        fig.dpi = orig_dpi
+        fig.set_facecolor(orig_facecolor)
     return img_arr
 
 
@@ -24,6 +24,7 @@ from matplotlib.patches import PathPatch
 from shapely.geometry import Polygon as ShapelyPolygon
 from shapely.geometry import Point as ShapelyPoint
 from  metdig.graphics.lib.utility import kwargs_wrapper
+from metdig.graphics.lib.geometry_cache import map_geometry_cache
 
 pkg_name = 'metdig.graphics'
 
@@ -163,6 +164,29 @@ def add_ticks(ax, xticks=None, yticks=None, labelsize=14, crs=ccrs.PlateCarree()
         ax.gridlines(crs=crs, xlocs=xticks, ylocs=yticks, linewidth=1, color='gray', alpha=0.5, linestyle='--', zorder=100)
     
 
+# map name
+china_map_names = {
+    'world': 'worldmap',
+    'nation': "NationalBorder",
+    'province': "Province",
+    #  'county': "County",  # 无资源，暂时注释
+    'river': "hyd1_4l",
+    'river_high': "hyd2_4l",
+    'coastline': 'ne_10m_coastline'}
+
+
+def preload_china_map(names=('world', 'nation', 'province', 'river')):
+    """
+    Load china boundary geometries into map_geometry_cache in advance (used by hub worker processes).
+    :param names: map names.
+    :return: None
+    """
+    for name in names:
+        shpfile = pkg_resources.resource_filename(pkg_name, "resources/shapefile/" + china_map_names[name] + ".shp")
+        if os.path.isfile(shpfile):
+            map_geometry_cache.geometries(shpfile)
+
+
 def add_china_map_2cartopy_public(ax, name='province', facecolor='none',
                                   edgecolor='c', lw=2,crs=ccrs.PlateCarree(), **kwargs):
     """
@@ -175,22 +199,19 @@ def add_china_map_2cartopy_public(ax, name='province', facecolor='none',
     :return: None
     """
 
-    # map name
-    names = {
-            'world':'worldmap',
-            'nation': "NationalBorder", 
-             'province': "Province",
-            #  'county': "County",  # 无资源，暂时注释
-             'river': "hyd1_4l",
-             'river_high': "hyd2_4l",
-             'coastline': 'ne_10m_coastline'}
-
     # get shape filename
-    shpfile = pkg_resources.resource_filename(pkg_name, "resources/shapefile/" + names[name] + ".shp")
+    shpfile = pkg_resources.resource_filename(pkg_name, "resources/shapefile/" + china_map_names[name] + ".shp")
+
+    # 当前地图范围(经纬度)，仅绘制与之相交的几何对象
+    try:
+        x0, x1, y0, y1 = ax.get_extent(crs=ccrs.PlateCarree())
+        extent = [x0 - 1, x1 + 1, y0 - 1, y1 + 1]
+    except Exception:
+        extent = None
 
     # add map
     ax.add_geometries(
-        Reader(shpfile).geometries(), 
+        map_geometry_cache.geometries(shpfile, extent=extent),
         facecolor=facecolor, edgecolor=edgecolor, lw=lw,crs=crs, **kwargs)
 
 
@@ -1,5 +1,10 @@
-from .basic_anl import *
-from .compare import *
-from .evolution import *
-from .ver_vs_anl import *
-from .stability import *
\ No newline at end of file
+from metdig.lazy_import import lazy_star_modules
+
+# 子模块在首次访问时按如下顺序执行 from .xxx import *
+__getattr__, __dir__ = lazy_star_modules(__name__, [
+    'basic_anl',
+    'compare',
+    'evolution',
+    'ver_vs_anl',
+    'stability',
+])
@@ -66,30 +66,16 @@ def model_basic_anl(func=None, func_other_args=None, max_workers=6,fps=2,
         _['is_return_imgbuf'] = True
 
     # 多进程绘图
-    use_sys_cpu = max(1, os.cpu_count() - 2)  # 可使用的cpu核心数为cpu核心数-2
-    max_workers = min(max_workers, use_sys_cpu)  # 最大进程数
-    with futures.ProcessPoolExecutor(max_workers=max_workers) as executer:
-        if len(func) == 1:
-            all_task = [executer.submit(func[0], **b) for b in func_other_args]
-
-        elif len(func_other_args) == 1:
-            all_task = [executer.submit(a, **func_other_args[0])for a in func]
-
-        else:
-            all_task = [executer.submit(a, **b) for (a, b) in zip(func, func_other_args)]
-
-        # 等待
-        futures.wait(all_task, return_when=futures.ALL_COMPLETED)
-
-        # 取返回值
-        all_ret = []
-        for task in all_task:
-            exp = task.exception()
-            if exp is None:
-                all_ret.append(task.result())
-            else:
-                _log.debug(exp)
-                pass
+    if len(func) == 1:
+        all_func = [func[0]] * len(func_other_args)
+        all_args = func_other_args
+    elif len(func_other_args) == 1:
+        all_func = func
+        all_args = [func_other_args[0]] * len(func)
+    else:
+        all_func = func
+        all_args = func_other_args
+    all_ret = mult_process(func=all_func, func_args_all=all_args, max_workers=max_workers, force_max_workers=False)
 
     all_img_bufs = get_onestep_ret_imgbufs(all_ret)
     all_png_names = get_onestep_ret_pngnames(all_ret)
@@ -6,6 +6,8 @@ import sys
 import os
 import datetime
 import copy
+import threading
+import contextlib
 
 import imageio
 import numpy as np
@@ -13,6 +15,10 @@ import numba as nb
 import matplotlib.pyplot as plt
 
 from concurrent import futures
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:
+    shared_memory = None
 
 from IPython.display import Image, display
 from io import BytesIO
@@ -42,29 +48,47 @@ def get_labels_dist(num):
         return (5, 5)
 
 
-def get_nearest_init_time(fhour, data_source='', data_name='', func=None, func_other_args={}):
+def get_nearest_init_time(fhour, data_source='', data_name='', func=None, func_other_args={}, var_name='hgt', level=500):
     '''
     以系统时间为起点， 获取最近fhour时预报的起报时间
+    优先通过数据可用性索引(metdig.io.get_latest_init_time，按var_name/level的0时效文件)一次查询得到，
+    数据源不支持索引或索引中无数据时，逐时次调用func试读
     '''
 
+    try:
+        import metdig.io
+        init_time = metdig.io.get_latest_init_time(data_source, data_name=data_name, var_name=var_name, level=level,
+                                                   fhour=0, max_age_hours=24)
+        if init_time is not None:
+            _log.info(f'''{init_time} 0 {data_name} find success by init time index. end.''')
+            return init_time
+    except Exception as e:
+        _log.info(f'''init time index of {data_source} {data_name} unavailable: {e}''')
+
     # 以系统时间为起点，固定fhour=0，逐1小时往前推，直至取到第一对init_time fhour=0，目的是获得最近的一次000时效预报数据
     sys_time = datetime.datetime.now().strftime('%Y%m%d%H')  # 系统时间
     sys_time = datetime.datetime.strptime(sys_time, '%Y%m%d%H')
     tag = False
-    for i in range(24):  # 逐个往前推
-        func_args = copy.deepcopy(func_other_args)
-        func_args['init_time'] = sys_time - datetime.timedelta(hours=i)
-        func_args['fhour'] = 0
-        func_args['data_name'] = data_source
-        func_args['data_name'] = data_name
-        func_args['is_return_imgbuf'] = True
-        func_args['is_draw'] = False # 由于one_step增加is_draw参数，此处仅读取数据不绘图增加效率
-        ret = mult_process(func=func, func_args_all=[func_args], max_workers=1, force_max_workers=True)
-        if len(ret) > 0:
-            tag = True
-            break
-        else:
-            _log.info(f'''{func_args['init_time']} {func_args['fhour']} {data_name} find failed. next.''')
+    # 试读只需单进程：已有常驻进程池时直接复用，否则使用单独的进程池，避免常驻进程池以1个进程建立后又被下次hub调用重建
+    probe_pool = worker_pool if worker_pool.max_workers > 0 else WorkerPool()
+    try:
+        for i in range(24):  # 逐个往前推
+            func_args = copy.deepcopy(func_other_args)
+            func_args['init_time'] = sys_time - datetime.timedelta(hours=i)
+            func_args['fhour'] = 0
+            func_args['data_name'] = data_source
+            func_args['data_name'] = data_name
+            func_args['is_return_imgbuf'] = True
+            func_args['is_draw'] = False # 由于one_step增加is_draw参数，此处仅读取数据不绘图增加效率
+            ret = mult_process(func=func, func_args_all=[func_args], max_workers=1, force_max_workers=True, pool=probe_pool)
+            if len(ret) > 0:
+                tag = True
+                break
+            else:
+                _log.info(f'''{func_args['init_time']} {func_args['fhour']} {data_name} find failed. next.''')
+    finally:
+        if probe_pool is not worker_pool:
+            probe_pool.shutdown(wait=False)
     if tag == True:
         # 取到第一对init_time fhour
         _log.info(f'''{func_args['init_time']} {func_args['fhour']} {data_name} find success. end.''')
@@ -76,7 +100,260 @@ def get_nearest_init_time(fhour, data_source='', data_name='', func=None, func_o
     return None
 
 
-def mult_process(func=None, func_args_all=[], max_workers=6, force_max_workers=True):
+def _worker_init():
+    # 进程池中每个进程启动时执行一次：导入metdig、matplotlib及cartopy，预加载底图几何数据
+    try:
+        # 常驻进程看不到主进程对进程内缓存的清空(如custom.split_stda_to_cache_*写入新数据后)，子进程中不使用进程内缓存
+        from metdig.io.lib import grid_cache
+        grid_cache.memory_cache.enabled = False
+    except Exception as e:
+        _log.debug('worker init failed: {}'.format(e))
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import cartopy.crs
+        import metdig
+        from metdig.graphics.lib import utl_plotmap
+        utl_plotmap.preload_china_map()
+    except Exception as e:
+        _log.debug('worker init failed: {}'.format(e))
+
+
+def _worker_state():
+    # 子进程沿用启动时的配置，主进程配置(进程内CONFIG或配置文件)变化后需重建进程池
+    from metdig.io.lib import config as CONFIG
+    state = [tuple((_s, tuple(CONFIG.CONFIG.items(_s, raw=True))) for _s in CONFIG.CONFIG.sections())]
+    for cfg_file in (CONFIG.CONFIG_DIR / 'config.ini', CONFIG.Path.home() / '.cdsapirc'):
+        try:
+            state.append(os.stat(cfg_file).st_mtime_ns)
+        except OSError:
+            state.append(None)
+    return tuple(state)
+
+
+def _worker_ping():
+    return os.getpid()
+
+
+class SharedArray(object):
+    '''
+    共享内存中的numpy数组描述(名称, shape, dtype)，由子进程写入，主进程读取后释放
+    '''
+
+    def __init__(self, name, shape, dtype):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+    @classmethod
+    def from_array(cls, arr):
+        """[将数组写入新建的共享内存块]
+
+        Args:
+            arr ([ndarray]): [数组]
+
+        Returns:
+            [SharedArray]: [共享内存描述]
+        """
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        # 共享内存块由主进程读取后释放，子进程不再跟踪，以免子进程退出时被重复清理
+        try:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        try:
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+            return cls(shm.name, arr.shape, arr.dtype.str)
+        finally:
+            shm.close()
+
+    def load(self):
+        """[从共享内存读取数组并释放共享内存块]
+
+        Returns:
+            [ndarray]: [数组]
+        """
+        shm = shared_memory.SharedMemory(name=self.name)
+        try:
+            return np.ndarray(self.shape, dtype=np.dtype(self.dtype), buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+# 大于该字节数的返回数组通过共享内存传回主进程
+_SHM_MIN_BYTES = 64 * 1024
+
+
+def _to_shared(ret):
+    # 将返回值(dict)中的大数组(如img_buf)写入共享内存，仅返回描述
+    if shared_memory is None or not isinstance(ret, dict):
+        return ret
+    ret = dict(ret)
+    for key, value in ret.items():
+        if isinstance(value, np.ndarray) and value.dtype != object and value.nbytes >= _SHM_MIN_BYTES:
+            try:
+                ret[key] = SharedArray.from_array(value)
+            except Exception as e:
+                _log.debug('shared memory failed: {}'.format(e))
+    return ret
+
+
+def _from_shared(ret):
+    if not isinstance(ret, dict):
+        return ret
+    for key, value in ret.items():
+        if isinstance(value, SharedArray):
+            ret[key] = value.load()
+    return ret
+
+
+def _worker_run(func, kwargs, use_shared_memory=True):
+    # 进程常驻复用，任务结束后关闭所有图像，避免内存累积
+    try:
+        ret = func(**kwargs)
+    finally:
+        plt.close('all')
+    if use_shared_memory:
+        ret = _to_shared(ret)
+    return ret
+
+
+class WorkerPool(object):
+    '''
+    常驻复用的绘图进程池，进程启动时完成重量级导入及底图预加载，多次hub调用共用同一进程池
+    '''
+
+    def __init__(self):
+        self._executor = None
+        self._max_workers = 0
+        self._active = 0  # 正在通过use()提交任务的调用数
+        self._state = None  # 进程池启动时的配置
+        self._lock = threading.Lock()
+
+    @property
+    def max_workers(self):
+        return self._max_workers
+
+    def _get_executor(self, max_workers):
+        # 已有进程池的进程数小于max_workers或配置已变化时重建；仍有调用正在使用时不关闭，继续返回已有进程池
+        state = _worker_state()
+        if (self._executor is not None and self._active == 0 and
+                (self._max_workers < max_workers or self._state != state)):
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._executor is None:
+            self._executor = futures.ProcessPoolExecutor(max_workers=max_workers, initializer=_worker_init)
+            self._max_workers = max_workers
+            self._state = state
+        return self._executor
+
+    def get_executor(self, max_workers):
+        """[获取进程池，已有进程池的进程数小于max_workers或配置已变化，且无其它调用正在使用时重建，
+            否则返回已有进程池(进程数可能大于或小于max_workers)]
+
+        Args:
+            max_workers ([int]): [进程数]
+
+        Returns:
+            [futures.ProcessPoolExecutor]: [进程池]
+        """
+        with self._lock:
+            return self._get_executor(max_workers)
+
+    @contextlib.contextmanager
+    def use(self, max_workers):
+        """[获取进程池并登记为使用中，退出前进程池不会因其它调用要求更多进程而被关闭重建]
+
+        Args:
+            max_workers ([int]): [进程数]
+
+        Yields:
+            [futures.ProcessPoolExecutor]: [进程池]
+        """
+        with self._lock:
+            executor = self._get_executor(max_workers)
+            self._active += 1
+        try:
+            yield executor
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def warmup(self, max_workers=6):
+        """[预先启动全部进程并完成初始化]
+
+        Args:
+            max_workers (int, optional): [进程数]. Defaults to 6.
+        """
+        with self.use(max_workers) as executor:
+            futures.wait([executor.submit(_worker_ping) for _ in range(self._max_workers)])
+
+    def reset(self):
+        # 进程池损坏(如子进程异常退出)时丢弃，下次使用时重建
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = None
+            self._max_workers = 0
+
+    def shutdown(self, wait=True):
+        """[关闭进程池]
+
+        Args:
+            wait (bool, optional): [是否等待进程退出]. Defaults to True.
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+            self._executor = None
+            self._max_workers = 0
+
+
+# 进程内默认的绘图进程池
+worker_pool = WorkerPool()
+
+
+def init_worker_pool(max_workers=6, warmup=True):
+    '''
+
+    [启动常驻绘图进程池]
+
+    Keyword Arguments:
+        max_workers {number} -- [进程池大小] (default: {6})
+        warmup {bool} -- [是否立即启动全部进程并完成初始化] (default: {True})
+    '''
+    if warmup:
+        worker_pool.warmup(max_workers)
+    else:
+        worker_pool.get_executor(max_workers)
+
+
+def shutdown_worker_pool(wait=True):
+    '''
+
+    [关闭常驻绘图进程池]
+    '''
+    worker_pool.shutdown(wait=wait)
+
+
+def _submit_all(executor, all_func, func_args_all, max_workers, use_shared_memory):
+    # 复用的进程池进程数可能大于max_workers，此时限制同时执行的任务数不超过max_workers
+    sem = threading.BoundedSemaphore(max_workers)
+    all_task = []
+    for _func, _ in zip(all_func, func_args_all):
+        sem.acquire()
+        try:
+            task = executor.submit(_worker_run, _func, _, use_shared_memory)
+        except BaseException:
+            sem.release()
+            raise
+        task.add_done_callback(lambda _task: sem.release())
+        all_task.append(task)
+    return all_task
+
+
+def mult_process(func=None, func_args_all=[], max_workers=6, force_max_workers=True, reuse_pool=True, use_shared_memory=True, pool=None):
     '''
 
     [多进程绘图]
@@ -86,6 +363,10 @@ def mult_process(func=None, func_args_all=[], max_workers=6, force_max_workers=T
         func_args_all {list} -- [函数参数] (default: {[]})
         max_workers {number} -- [进程池大小] (default: {6})
         force_max_workers {bool} -- [是否强制使用max_workers参数，默认关闭] (default: {False})
+        reuse_pool {bool} -- [是否使用常驻复用的进程池worker_pool，已有进程池的进程数不小于max_workers时直接复用，
+                              同时执行的任务数仍不超过max_workers，为False时每次调用新建并关闭进程池] (default: {True})
+        use_shared_memory {bool} -- [返回值(dict)中的大数组(如img_buf)是否通过共享内存传回主进程，避免pickle序列化] (default: {True})
+        pool {WorkerPool} -- [reuse_pool为True时使用的进程池，默认为worker_pool] (default: {None})
 
     Returns:
         [list] -- [有效的返回结果]
@@ -99,25 +380,41 @@ def mult_process(func=None, func_args_all=[], max_workers=6, force_max_workers=T
         max_workers = min(max_workers, use_sys_cpu)  # 最大进程数
     _log.debug('cpu_count={}, use max_workers={}'.format(os.cpu_count(), max_workers))
 
-    all_ret = []
-    with futures.ProcessPoolExecutor(max_workers=max_workers) as executer:
-        # 提交所有绘图任务
-        if(isinstance(func,list)):
-            all_task = [executer.submit(func[_ifunc], **_) for _ifunc,_ in enumerate(func_args_all)]
-        else:
-            all_task = [executer.submit(func, **_) for _ in func_args_all]
+    if(isinstance(func,list)):
+        all_func = func
+    else:
+        all_func = [func] * len(func_args_all)
+
+    if pool is None:
+        pool = worker_pool
+    if reuse_pool:
+        try:
+            with pool.use(max_workers) as executer:
+                all_task = _submit_all(executer, all_func, func_args_all, max_workers, use_shared_memory)
+                futures.wait(all_task, return_when=futures.ALL_COMPLETED)
+        except futures.process.BrokenProcessPool:
+            pool.reset()
+            with pool.use(max_workers) as executer:
+                all_task = _submit_all(executer, all_func, func_args_all, max_workers, use_shared_memory)
+                futures.wait(all_task, return_when=futures.ALL_COMPLETED)
+    else:
+        with futures.ProcessPoolExecutor(max_workers=max_workers) as executer:
+            # 提交所有绘图任务
+            all_task = [executer.submit(_worker_run, _func, _, use_shared_memory) for _func, _ in zip(all_func, func_args_all)]
 
-        # 等待
-        futures.wait(all_task, return_when=futures.ALL_COMPLETED)
+            # 等待
+            futures.wait(all_task, return_when=futures.ALL_COMPLETED)
 
-        # 取返回值
-        for task in all_task:
-            exp = task.exception()
-            if exp is None:
-                all_ret.append(task.result())
-            else:
-                _log.debug(exp)
-                pass
+    # 取返回值
+    all_ret = []
+    for task in all_task:
+        exp = task.exception()
+        if exp is None:
+            all_ret.append(_from_shared(task.result()))
+        else:
+            _log.debug(exp)
+            if isinstance(exp, futures.process.BrokenProcessPool):
+                pool.reset()
     return all_ret
 
 
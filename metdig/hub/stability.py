@@ -58,7 +58,8 @@ def model_stability(target_time=None, latest_init_time=None, ninit=4, init_inter
 
     if latest_init_time is None:
         # 获得最近的一次模式起报时间
-        latest_init_time = get_nearest_init_time(24, data_name, func, func_other_args)
+        latest_init_time = get_nearest_init_time(24, data_source=func_other_args.get('data_source', 'cassandra'), data_name=data_name,
+                                                 func=func, func_other_args=func_other_args)
     else:
         latest_init_time = datetime.datetime(latest_init_time.year, latest_init_time.month, latest_init_time.day, latest_init_time.hour)
 
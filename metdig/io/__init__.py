@@ -1,23 +1,49 @@
 # -*- coding: utf-8 -*
 
-from . import cassandra
-from . import cimiss
-from . import cmadaas
-from . import era5_manual_download
-from . import cmadass_manual_download
-from . import era5
-from . import nmc_micaps_helper
-from . import nmc_cmadass_helper
-from . import thredds
-from . import custom
+import datetime
+import importlib
+
+from metdig.lazy_import import lazy_submodules
+
+# 各数据源模块在首次访问或首次读取该数据源时导入
+__getattr__, __dir__ = lazy_submodules(__name__, [
+    'cassandra',
+    'cimiss',
+    'cmadaas',
+    'era5_manual_download',
+    'cmadass_manual_download',
+    'era5',
+    'nmc_micaps_helper',
+    'nmc_cmadass_helper',
+    'thredds',
+    'custom',
+])
+
+# data_source对应的读取模块
+_SOURCE_MODULES = {
+    'cassandra': 'cassandra',
+    'cds': 'era5',
+    'cmadaas': 'cmadaas',
+    'thredds': 'thredds',
+    'custom': 'custom',
+}
 
 
 from metdig.io.lib import config
+from metdig.io.lib import grid_cache
+from metdig.io.lib import utility as utl
+from metdig.io.lib.availability import init_time_index
 
 import logging
 _log = logging.getLogger(__name__)
 
 
+def _import_source(data_source):
+    # 导入data_source对应的读取模块，导入后模块名绑定为本包全局变量，未知数据源由调用方抛出异常
+    if data_source in _SOURCE_MODULES:
+        importlib.import_module('.' + _SOURCE_MODULES[data_source], __name__)
+
+
 def config_init(CMADaaS_DNS=None, CMADaaS_PORT=None, CMADaaS_USER_ID=None, CMADaaS_PASSWORD=None, CMADaaS_serviceNodeId=None,
                 MICAPS_GDS_IP=None, MICAPS_GDS_PORT=None,
                 THREDDS_IP=None, THREDDS_PORT=None,
@@ -48,7 +74,7 @@ def config_init(CMADaaS_DNS=None, CMADaaS_PORT=None, CMADaaS_USER_ID=None, CMADa
     pass
 
 
-def get_model_grid(data_source,  throwexp=True, **kwargs):
+def get_model_grid(data_source,  throwexp=True, use_cache=True, readonly=False, **kwargs):
     '''
 
     [读取单层单时次模式网格数据]
@@ -57,26 +83,48 @@ def get_model_grid(data_source,  throwexp=True, **kwargs):
         data_source {[str]} -- [可选择填写如下数据源: cassandra, cmadaas, era5, thredds)]
         **kwargs {[type]} -- [调用读取函数的kwargs]
         throwexp {bool} -- [是否抛出异常，（注意谨慎设置为False，不会抛出任何异常，无法定位为何出错）] (default: {True})
+        use_cache {bool} -- [是否使用进程内缓存及本地已解码数据缓存(get_cache_dir()/GRID_DATA)，custom数据源不使用本地缓存] (default: {True})
+        readonly {bool} -- [use_cache时是否返回与缓存共享内存的只读数据(不复制，原地修改将抛出ValueError)，默认返回可写的副本] (default: {False})
 
     Returns:
         [stda] -- [description]
     '''
     try:
+        cache_key = None
+        disk_key = None
+        if use_cache:
+            cache_key = 'get_model_grid/' + grid_cache.make_key(data_source, **kwargs)
+            stda_data = grid_cache.memory_cache.get(cache_key, readonly=readonly)
+            if stda_data is not None:
+                return stda_data
+            if data_source in ('cassandra', 'cds', 'cmadaas', 'thredds'):
+                disk_key = grid_cache.make_key(data_source, **kwargs)
+                stda_data = grid_cache.disk_cache.get(disk_key)
+                if stda_data is not None:
+                    return grid_cache.memory_cache.put(cache_key, stda_data, readonly=readonly)
+
+        _import_source(data_source)
         if data_source == 'cassandra':
-            return cassandra.get_model_grid(**kwargs)
+            stda_data = cassandra.get_model_grid(**kwargs)
         elif data_source == 'cds':
             # era5 不存在fhour和data_name参数
             kwargs.pop('fhour')
             kwargs.pop('data_name')
-            return era5.get_model_grid(**kwargs)
+            stda_data = era5.get_model_grid(**kwargs)
         elif data_source == 'cmadaas':
-            return cmadaas.get_model_grid(**kwargs)
+            stda_data = cmadaas.get_model_grid(**kwargs)
         elif data_source == 'thredds':
-            return thredds.get_model_grid(**kwargs)
+            stda_data = thredds.get_model_grid(**kwargs)
         elif data_source == 'custom':
-            return custom.get_model_grid(**kwargs)
+            stda_data = custom.get_model_grid(**kwargs)
         else:
             raise Exception('data_source={} error!'.format(data_source))
+
+        if disk_key is not None:
+            grid_cache.disk_cache.put(disk_key, stda_data)
+        if cache_key is not None:
+            stda_data = grid_cache.memory_cache.put(cache_key, stda_data, readonly=readonly)
+        return stda_data
     except Exception as e:
         if throwexp == True:
             raise e
@@ -100,6 +148,7 @@ def get_model_grids(data_source, throwexp=True, **kwargs):
         [stda] -- [description]
     '''
     try:
+        _import_source(data_source)
         if data_source == 'cassandra':
             return cassandra.get_model_grids(**kwargs)
         elif data_source == 'cds':
@@ -126,7 +175,7 @@ def get_model_grids(data_source, throwexp=True, **kwargs):
     return None
 
 
-def get_model_3D_grid(data_source, throwexp=True, **kwargs):
+def get_model_3D_grid(data_source, throwexp=True, use_cache=True, readonly=False, **kwargs):
     '''
 
     [读取多层单时次模式网格数据]
@@ -135,26 +184,40 @@ def get_model_3D_grid(data_source, throwexp=True, **kwargs):
         data_source {[str]} -- [可选择填写如下数据源: cassandra, cmadaas, era5, thredds)]
         **kwargs {[type]} -- [调用读取函数的kwargs]
         throwexp {bool} -- [是否抛出异常，（注意谨慎设置为False，不会抛出任何异常，无法定位为何出错）] (default: {True})
+        use_cache {bool} -- [是否使用进程内缓存] (default: {True})
+        readonly {bool} -- [use_cache时是否返回与缓存共享内存的只读数据(不复制，原地修改将抛出ValueError)，默认返回可写的副本] (default: {False})
 
     Returns:
         [stda] -- [description]
     '''
     try:
+        cache_key = None
+        if use_cache:
+            cache_key = 'get_model_3D_grid/' + grid_cache.make_key(data_source, **kwargs)
+            stda_data = grid_cache.memory_cache.get(cache_key, readonly=readonly)
+            if stda_data is not None:
+                return stda_data
+
+        _import_source(data_source)
         if data_source == 'cassandra':
-            return cassandra.get_model_3D_grid(**kwargs)
+            stda_data = cassandra.get_model_3D_grid(**kwargs)
         elif data_source == 'cds':
             # era5 不存在fhour和data_name参数
             kwargs.pop('fhour')
             kwargs.pop('data_name')
-            return era5.get_model_3D_grid(**kwargs)
+            stda_data = era5.get_model_3D_grid(**kwargs)
         elif data_source == 'cmadaas':
-            return cmadaas.get_model_3D_grid(**kwargs)
+            stda_data = cmadaas.get_model_3D_grid(**kwargs)
         elif data_source == 'thredds':
-            return thredds.get_model_3D_grid(**kwargs)
+            stda_data = thredds.get_model_3D_grid(**kwargs)
         elif data_source == 'custom':
-            return custom.get_model_3D_grid(**kwargs)
+            stda_data = custom.get_model_3D_grid(**kwargs)
         else:
             raise Exception('data_source={} error!'.format(data_source))
+
+        if cache_key is not None:
+            stda_data = grid_cache.memory_cache.put(cache_key, stda_data, readonly=readonly)
+        return stda_data
     except Exception as e:
         if throwexp == True:
             raise e
@@ -178,6 +241,7 @@ def get_model_3D_grids(data_source, throwexp=True, **kwargs):
         [stda] -- [description]
     '''
     try:
+        _import_source(data_source)
         if data_source == 'cassandra':
             return cassandra.get_model_3D_grids(**kwargs)
         elif data_source == 'cds':
@@ -206,7 +270,144 @@ def get_model_3D_grids(data_source, throwexp=True, **kwargs):
     return None
 
 
-def get_model_points(data_source, throwexp=True, **kwargs):
+def _bundle_task(item, fhour):
+    # 将get_model_bundle的单项需求整理为(结果名, 读取任务)，读取任务为(读取函数名, 要素名, 层次, 时效)，
+    # 多层、多时效的层次及时效为tuple，可直接作为去重的键
+    item = dict(item)
+    var_name = item['var_name']
+    name = item.get('name', var_name)
+    if 'levels' in item:
+        levels = tuple(utl.parm_tolist(item['levels']))
+    else:
+        levels = item.get('level')
+    if 'fhours' in item:
+        fhours = tuple(utl.parm_tolist(item['fhours']))
+    else:
+        fhours = item.get('fhour', fhour)
+    if isinstance(levels, tuple):
+        func_name = 'get_model_3D_grids' if isinstance(fhours, tuple) else 'get_model_3D_grid'
+    else:
+        func_name = 'get_model_grids' if isinstance(fhours, tuple) else 'get_model_grid'
+    return name, (func_name, var_name, levels, fhours)
+
+
+def _bundle_merge(tasks):
+    # 同一要素、相同时效的高空层次需求合并为一次多层读取，返回{读取任务: 合并后的读取任务}；
+    # 地面要素(层次为None)不合并
+    groups = {}
+    for task in tasks:
+        func_name, var_name, levels, fhours = task
+        task_levels = levels if isinstance(levels, tuple) else (levels,)
+        if any(_l is None for _l in task_levels):
+            continue
+        groups.setdefault((var_name, fhours), []).append(task)
+    merged = {}
+    for (var_name, fhours), group in groups.items():
+        if len(group) < 2:
+            continue
+        levels = tuple(dict.fromkeys(_l for _task in group for _l in (_task[2] if isinstance(_task[2], tuple) else (_task[2],))))
+        func_name = 'get_model_3D_grids' if isinstance(fhours, tuple) else 'get_model_3D_grid'
+        for task in group:
+            merged[task] = (func_name, var_name, levels, fhours)
+    return merged
+
+
+def _bundle_select(stda_data, task):
+    # 从合并读取的多层数据中选取task所需的层次
+    levels = task[2]
+    return stda_data.sel(level=list(levels) if isinstance(levels, tuple) else [levels])
+
+
+def _bundle_run(task, data_source, use_cache, **kwargs):
+    # 执行get_model_bundle的单个读取任务，各数据源的多层、多时效读取(如era5一次下载全部层次、zarr缓存一次读取多条记录)由对应接口完成
+    func_name, var_name, levels, fhours = task
+    if func_name in ('get_model_3D_grid', 'get_model_3D_grids'):
+        kwargs['levels'] = list(levels)
+    else:
+        kwargs['level'] = levels
+    if func_name in ('get_model_grids', 'get_model_3D_grids'):
+        kwargs['fhours'] = list(fhours)
+    else:
+        kwargs['fhour'] = fhours
+        kwargs['use_cache'] = use_cache
+    stda_data = globals()[func_name](data_source, throwexp=True, var_name=var_name, **kwargs)
+    if stda_data is None:
+        raise Exception('Can not get data from {}! {} {} {} {}'.format(data_source, kwargs.get('data_name'), var_name, levels, fhours))
+    return stda_data
+
+
+def get_model_bundle(data_source, items, init_time=None, fhour=None, data_name=None,
+                     extent=None, x_percent=0, y_percent=0, max_workers=8, throwexp=True, use_cache=True, **kwargs):
+    '''
+
+    [一次读取多个要素的模式网格数据，各需求并发读取。重复的需求只读取一次，
+     同一要素、相同时效的多个高空层次需求(如dict(var_name='hgt', level=500)与dict(var_name='hgt', levels=[500, 850]))
+     合并为一次多层读取后按层次选取，合并读取失败时再逐项读取]
+
+    Arguments:
+        data_source {[str]} -- [可选择填写如下数据源: cassandra, cmadaas, era5, thredds)]
+        items {[list]} -- [需求列表，每项为字典，如dict(var_name='hgt', level=500)、dict(var_name='u', levels=[500, 850])、
+                           dict(var_name='psfc', fhours=[0, 3, 6])，可选name为结果字典的键(默认为var_name)，
+                           level/levels、fhour/fhours分别对应get_model_grid、get_model_3D_grid、get_model_grids、get_model_3D_grids，
+                           未指定fhour/fhours时使用参数fhour]
+
+    Keyword Arguments:
+        init_time {[datetime]} -- [起报时间] (default: {None})
+        fhour {[int32]} -- [默认预报时效] (default: {None})
+        data_name {[str]} -- [模式名] (default: {None})
+        extent {[tuple]} -- [裁剪区域，如(50, 150, 0, 65)] (default: {None})
+        x_percent {number} -- [根据裁剪区域经度方向扩充百分比] (default: {0})
+        y_percent {number} -- [根据裁剪区域纬度方向扩充百分比] (default: {0})
+        max_workers {number} -- [并发读取的最大线程数，1为串行读取] (default: {8})
+        throwexp {bool} -- [是否抛出异常，为False时读取失败的项为None] (default: {True})
+        use_cache {bool} -- [是否使用进程内缓存及本地已解码数据缓存，同get_model_grid] (default: {True})
+        **kwargs {[type]} -- [调用读取函数的其它kwargs]
+
+    Returns:
+        [dict] -- [{name: stda}]
+    '''
+    items = [_bundle_task(_item, fhour) for _item in items]
+
+    def _run_all(tasks):
+        kwargs_all = [dict(task=_task, data_source=data_source, use_cache=use_cache, init_time=init_time, data_name=data_name,
+                           extent=extent, x_percent=x_percent, y_percent=y_percent, **kwargs)
+                      for _task in tasks]
+        return dict(zip(tasks, utl.mult_thread_run(_bundle_run, kwargs_all, max_workers=max_workers)))
+
+    # 相同的需求只读取一次，层次有重叠的需求合并读取
+    tasks = list(dict.fromkeys(_task for _, _task in items))
+    merged = _bundle_merge(tasks)
+    merged_rets = _run_all(list(dict.fromkeys(merged[_task] if _task in merged else _task for _task in tasks)))
+    rets = {}
+    retry = []
+    for task in tasks:
+        if task not in merged:
+            rets[task] = merged_rets[task]
+            continue
+        stda_data, exp = merged_rets[merged[task]]
+        if exp is None:
+            try:
+                rets[task] = (_bundle_select(stda_data, task), None)
+                continue
+            except Exception as e:
+                exp = e
+        _log.info('bundle merged read {} failed, read separately: {}'.format(merged[task], exp))
+        retry.append(task)
+    if retry:
+        rets.update(_run_all(retry))
+
+    bundle = {}
+    for name, task in items:
+        stda_data, exp = rets[task]
+        if exp is not None:
+            if throwexp == True:
+                raise exp
+            _log.info(str(exp))
+        bundle[name] = stda_data
+    return bundle
+
+
+def get_model_points(data_source, throwexp=True, use_cache=True, readonly=False, **kwargs):
     '''
 
     [获取单层/多层，单时效/多时效观测站点数据]
@@ -215,27 +416,90 @@ def get_model_points(data_source, throwexp=True, **kwargs):
         data_source {[str]} -- [可选择填写如下数据源: cassandra, cmadaas, era5, thredds)]
         **kwargs {[type]} -- [调用读取函数的kwargs]
         throwexp {bool} -- [是否抛出异常，（注意谨慎设置为False，不会抛出任何异常，无法定位为何出错）] (default: {True})
+        use_cache {bool} -- [是否使用进程内缓存] (default: {True})
+        readonly {bool} -- [use_cache时是否返回与缓存共享内存的只读数据(不复制，原地修改将抛出ValueError)，默认返回可写的副本] (default: {False})
 
     Returns:
         [stda] -- [description]
     '''
     try:
+        cache_key = None
+        if use_cache:
+            cache_key = 'get_model_points/' + grid_cache.make_key(data_source, **kwargs)
+            stda_data = grid_cache.memory_cache.get(cache_key, readonly=readonly)
+            if stda_data is not None:
+                return stda_data
+
+        _import_source(data_source)
         if data_source == 'cassandra':
-            return cassandra.get_model_points(**kwargs)
+            stda_data = cassandra.get_model_points(**kwargs)
         elif data_source == 'cmadaas':
-            return cmadaas.get_model_points(**kwargs)
+            stda_data = cmadaas.get_model_points(**kwargs)
         elif data_source == 'cds':
             # era5 不存在fhour和data_name参数
             kwargs.pop('fhours')
             kwargs.pop('data_name')
-            return era5.get_model_points(**kwargs)
+            stda_data = era5.get_model_points(**kwargs)
         elif data_source == 'thredds':
             kwargs.pop('fhours')
-            return thredds.get_model_points(**kwargs)
+            stda_data = thredds.get_model_points(**kwargs)
         elif data_source == 'custom':
-            return custom.get_model_points(**kwargs)
+            stda_data = custom.get_model_points(**kwargs)
         else:
             raise Exception('data_source={} error!'.format(data_source))
+
+        if cache_key is not None:
+            stda_data = grid_cache.memory_cache.put(cache_key, stda_data, readonly=readonly)
+        return stda_data
+    except Exception as e:
+        if throwexp == True:
+            raise e
+        else:
+            _log.info(str(e))
+            return None
+    return None
+
+
+def get_model_3D_points(data_source, throwexp=True, use_cache=True, readonly=False, **kwargs):
+    '''
+
+    [获取多层单时效模式数据，插值到站点上]
+
+    Arguments:
+        data_source {[str]} -- [可选择填写如下数据源: cassandra, cmadaas, era5, thredds)]
+        **kwargs {[type]} -- [调用读取函数的kwargs]
+        throwexp {bool} -- [是否抛出异常，（注意谨慎设置为False，不会抛出任何异常，无法定位为何出错）] (default: {True})
+        use_cache {bool} -- [是否使用进程内缓存] (default: {True})
+        readonly {bool} -- [use_cache时是否返回与缓存共享内存的只读数据(不复制，原地修改将抛出ValueError)，默认返回可写的副本] (default: {False})
+
+    Returns:
+        [stda] -- [description]
+    '''
+    try:
+        cache_key = None
+        if use_cache:
+            cache_key = 'get_model_3D_points/' + grid_cache.make_key(data_source, **kwargs)
+            stda_data = grid_cache.memory_cache.get(cache_key, readonly=readonly)
+            if stda_data is not None:
+                return stda_data
+
+        _import_source(data_source)
+        if data_source == 'cassandra':
+            stda_data = cassandra.get_model_3D_points(**kwargs)
+        elif data_source == 'cmadaas':
+            stda_data = cmadaas.get_model_3D_points(**kwargs)
+        else:
+            # 其它数据源读取网格后插值到站点
+            import metdig.utl as mdgstda
+            points = kwargs.pop('points')
+            # 网格数据仅用于插值，使用只读数据避免复制
+            stda_data = get_model_3D_grid(data_source, use_cache=use_cache, readonly=True, **kwargs)
+            if stda_data is not None:
+                stda_data = mdgstda.gridstda_to_stastda(stda_data, points)
+
+        if cache_key is not None:
+            stda_data = grid_cache.memory_cache.put(cache_key, stda_data, readonly=readonly)
+        return stda_data
     except Exception as e:
         if throwexp == True:
             raise e
@@ -245,6 +509,61 @@ def get_model_points(data_source, throwexp=True, **kwargs):
     return None
 
 
+def get_model_init_times(data_source, data_name=None, var_name='hgt', level=500, fhour=0, use_cache=True):
+    '''
+
+    [获取可用的模式起报时间列表，结果按init_time_index的ttl缓存]
+
+    Arguments:
+        data_source {[str]} -- [可选择填写如下数据源: cassandra, cmadaas]
+        data_name {[str]} -- [模式名]
+        var_name {[str]} -- [数据要素名] (default: {'hgt'})
+        level {[int32]} -- [层次，None代表地面层] (default: {500})
+        fhour {[int32]} -- [预报时效] (default: {0})
+        use_cache {bool} -- [是否使用缓存的索引] (default: {True})
+
+    Returns:
+        [list] -- [按时间升序排列的起报时间(datetime)列表]
+    '''
+    _import_source(data_source)
+    if data_source == 'cassandra':
+        list_func = lambda: cassandra.get_model_init_times(data_name=data_name, var_name=var_name, level=level, fhour=fhour)
+    elif data_source == 'cmadaas':
+        list_func = lambda: cmadaas.get_model_init_times(data_name=data_name, var_name=var_name, level=level, fhour=fhour)
+    else:
+        raise Exception('data_source={} does not support listing init times!'.format(data_source))
+
+    if not use_cache:
+        return list(list_func())
+    return init_time_index.get((data_source, data_name, var_name, level, fhour), list_func)
+
+
+def get_latest_init_time(data_source, data_name=None, var_name='hgt', level=500, fhour=0, max_age_hours=None, use_cache=True):
+    '''
+
+    [获取最新的可用模式起报时间]
+
+    Arguments:
+        data_source {[str]} -- [可选择填写如下数据源: cassandra, cmadaas]
+        data_name {[str]} -- [模式名]
+        var_name {[str]} -- [数据要素名] (default: {'hgt'})
+        level {[int32]} -- [层次，None代表地面层] (default: {500})
+        fhour {[int32]} -- [预报时效] (default: {0})
+        max_age_hours {[number]} -- [起报时间距当前时间的最大小时数，超过时视为不可用，None代表不限制] (default: {None})
+        use_cache {bool} -- [是否使用缓存的索引] (default: {True})
+
+    Returns:
+        [datetime] -- [最新起报时间，不存在返回None]
+    '''
+    init_times = get_model_init_times(data_source, data_name=data_name, var_name=var_name, level=level, fhour=fhour, use_cache=use_cache)
+    if len(init_times) == 0:
+        return None
+    latest = init_times[-1]
+    if max_age_hours is not None and datetime.datetime.now() - latest > datetime.timedelta(hours=max_age_hours):
+        return None
+    return latest
+
+
 def get_obs_stations(data_source, throwexp=True, **kwargs):
     '''
 
@@ -259,6 +578,7 @@ def get_obs_stations(data_source, throwexp=True, **kwargs):
         [stda] -- [description]
     '''
     try:
+        _import_source(data_source)
         if data_source == 'cassandra':
             return cassandra.get_obs_stations(**kwargs)
         elif data_source == 'cmadaas':
@@ -289,6 +609,7 @@ def get_obs_stations_multitime(data_source, throwexp=True, **kwargs):
         [stda] -- [description]
     '''
     try:
+        _import_source(data_source)
         if data_source == 'cassandra':
             return cassandra.get_obs_stations_multitime(**kwargs)
         elif data_source == 'cmadaas':
@@ -39,6 +39,14 @@ def get_model_grid(init_time=None, fhour=None, data_name=None, var_name=None, le
     Returns:
         [stda] -- [stda格式数据]
     '''
+    return _get_model_grid(init_time, fhour, data_name, var_name, level, extent=extent, x_percent=x_percent, y_percent=y_percent, **kwargs)
+
+
+def _get_model_grid(init_time=None, fhour=None, data_name=None, var_name=None, level=None,
+                    extent=None, x_percent=0, y_percent=0, points=None, **kwargs):
+    '''
+    读取单层单时次模式网格数据，points非空时解码后仅保留站点插值所需的相邻格点，不生成全场stda
+    '''
     # 从配置中获取相关信息
     try:
         if level:
@@ -68,6 +76,7 @@ def get_model_grid(init_time=None, fhour=None, data_name=None, var_name=None, le
         member = [data_name]
     # 数据裁剪
     data = utl.area_cut(data, extent, x_percent, y_percent)
+    data = utl.points_cut(data, points)
 
     # 经纬度从小到大排序好
     data = data.sortby('lat')
@@ -78,18 +87,18 @@ def get_model_grid(init_time=None, fhour=None, data_name=None, var_name=None, le
         stda_data = mdgstda.xrda_to_gridstda(data['data'],
                                              member_dim='number', level_dim='level', time_dim='time', lat_dim='lat', lon_dim='lon',
                                              member=member, level=[cassandra_level], time=[init_time], dtime=[fhour],
-                                             var_name=var_name, np_input_units=cassandra_units,
+                                             var_name=var_name, np_input_units=cassandra_units, copy=False,
                                              data_source='cassandra', level_type=level_type)
     else:
         speed_stda = mdgstda.xrda_to_gridstda(data['speed'],
                                               member_dim='number', level_dim='level', time_dim='time', lat_dim='lat', lon_dim='lon',
                                               member=member, level=[cassandra_level], time=[init_time], dtime=[fhour],
-                                              var_name=var_name, np_input_units=cassandra_units,
+                                              var_name=var_name, np_input_units=cassandra_units, copy=False,
                                               data_source='cassandra', level_type=level_type)
         angle_stda = mdgstda.xrda_to_gridstda(data['angle'],
                                               member_dim='number', level_dim='level', time_dim='time', lat_dim='lat', lon_dim='lon',
                                               member=member, level=[cassandra_level], time=[init_time], dtime=[fhour],
-                                              var_name=var_name, np_input_units=cassandra_units,
+                                              var_name=var_name, np_input_units=cassandra_units, copy=False,
                                               data_source='cassandra', level_type=level_type)
         if var_name == 'wsp':
             stda_data = speed_stda
@@ -101,8 +110,36 @@ def get_model_grid(init_time=None, fhour=None, data_name=None, var_name=None, le
     return stda_data
 
 
+def _get_model_grid_items(init_time, fhours, data_name, var_name, levels, extent, x_percent, y_percent, max_workers, points=None, **kwargs):
+    '''
+    并发读取fhours*levels个单层单时次数据，返回按(fhour, level)顺序排列的二维列表，读取失败的项为None，并逐项记录失败原因
+    '''
+    kwargs_all = []
+    for fhour in fhours:
+        for level in levels:
+            kwargs_all.append(dict(init_time=init_time, fhour=fhour, data_name=data_name, var_name=var_name, level=level,
+                                   extent=extent, x_percent=x_percent, y_percent=y_percent, points=points, **kwargs))
+
+    rets = utl.mult_thread_run(_get_model_grid, kwargs_all, max_workers=max_workers)
+
+    items = []
+    for i, fhour in enumerate(fhours):
+        temp_data = []
+        for j, level in enumerate(levels):
+            data, exp = rets[i * len(levels) + j]
+            if exp is not None:
+                _log.warning('cassandra get_model_grid failed! data_name={} var_name={} init_time={} fhour={} level={}: {}'.format(
+                    data_name, var_name, init_time, fhour, level, exp))
+                data = None
+            elif data is None or data.size == 0:
+                data = None
+            temp_data.append(data)
+        items.append(temp_data)
+    return items
+
+
 def get_model_grids(init_time=None, fhours=None, data_name=None, var_name=None, level=None,
-                    extent=None, x_percent=0, y_percent=0,**kwargs):
+                    extent=None, x_percent=0, y_percent=0, max_workers=8, **kwargs):
     '''
 
     [读取单层多时次模式网格数据]
@@ -116,20 +153,16 @@ def get_model_grids(init_time=None, fhours=None, data_name=None, var_name=None,
         extent {[tuple]} -- [裁剪区域，如(50, 150, 0, 65)] (default: {None})
         x_percent {number} -- [根据裁剪区域经度方向扩充百分比] (default: {0})
         y_percent {number} -- [根据裁剪区域纬度方向扩充百分比] (default: {0})
+        max_workers {number} -- [并发读取的最大线程数，1为串行读取] (default: {8})
 
     Returns:
         [stda] -- [stda格式数据]
     '''
     fhours = utl.parm_tolist(fhours)
 
-    stda_data = []
-    for fhour in fhours:
-        try:  # 待斟酌
-            data = get_model_grid(init_time, fhour, data_name, var_name, level, extent=extent, x_percent=x_percent, y_percent=y_percent,**kwargs)
-        except:  # 待斟酌
-            continue
-        if data is not None and data.size > 0:
-            stda_data.append(data)
+    items = _get_model_grid_items(init_time, fhours, data_name, var_name, [level], extent, x_percent, y_percent, max_workers, **kwargs)
+
+    stda_data = [_[0] for _ in items if _[0] is not None]
     if stda_data:
         return xr.concat(stda_data, dim='dtime')
     else:
@@ -137,7 +170,7 @@ def get_model_grids(init_time=None, fhours=None, data_name=None, var_name=None,
 
 
 def get_model_3D_grid(init_time=None, fhour=None, data_name=None, var_name=None, levels=None,
-                      extent=None, x_percent=0, y_percent=0,**kwargs):
+                      extent=None, x_percent=0, y_percent=0, max_workers=8, **kwargs):
     '''
 
     [读取多层单时次模式网格数据]
@@ -151,27 +184,23 @@ def get_model_3D_grid(init_time=None, fhour=None, data_name=None, var_name=None,
         extent {[tuple]} -- [裁剪区域，如(50, 150, 0, 65)] (default: {None})
         x_percent {number} -- [根据裁剪区域经度方向扩充百分比] (default: {0})
         y_percent {number} -- [根据裁剪区域纬度方向扩充百分比] (default: {0})
+        max_workers {number} -- [并发读取的最大线程数，1为串行读取] (default: {8})
 
     Returns:
         [stda] -- [stda格式数据]
     '''
     levels = utl.parm_tolist(levels)
 
-    stda_data = []
-    for level in levels:
-        try:
-            data = get_model_grid(init_time, fhour, data_name, var_name, level, extent=extent, x_percent=x_percent, y_percent=y_percent,**kwargs)
-            if data is not None and data.size > 0:
-                stda_data.append(data)
-        except Exception as e:
-            _log.info(str(e))
+    items = _get_model_grid_items(init_time, [fhour], data_name, var_name, levels, extent, x_percent, y_percent, max_workers, **kwargs)
+
+    stda_data = [_ for _ in items[0] if _ is not None]
     if stda_data:
         return xr.concat(stda_data, dim='level')
     return None
 
 
 def get_model_3D_grids(init_time=None, fhours=None, data_name=None, var_name=None, levels=None,
-                       extent=None, x_percent=0, y_percent=0,**kwargs):
+                       extent=None, x_percent=0, y_percent=0, max_workers=8, **kwargs):
     '''
 
     [读取多层多时次模式网格数据]
@@ -185,6 +214,7 @@ def get_model_3D_grids(init_time=None, fhours=None, data_name=None, var_name=Non
         extent {[tuple]} -- [裁剪区域，如(50, 150, 0, 65)] (default: {None})
         x_percent {number} -- [根据裁剪区域经度方向扩充百分比] (default: {0})
         y_percent {number} -- [根据裁剪区域纬度方向扩充百分比] (default: {0})
+        max_workers {number} -- [并发读取的最大线程数，1为串行读取] (default: {8})
 
     Returns:
         [stda] -- [stda格式数据]
@@ -192,27 +222,20 @@ def get_model_3D_grids(init_time=None, fhours=None, data_name=None, var_name=Non
     fhours = utl.parm_tolist(fhours)
     levels = utl.parm_tolist(levels)
 
+    items = _get_model_grid_items(init_time, fhours, data_name, var_name, levels, extent, x_percent, y_percent, max_workers, **kwargs)
+
     stda_data = []
-    for fhour in fhours:
-        temp_data = []
-        for level in levels:
-            try:
-                data = get_model_grid(init_time, fhour, data_name, var_name, level, extent=extent, x_percent=x_percent, y_percent=y_percent,**kwargs)
-                if data is not None and data.size > 0:
-                    temp_data.append(data)
-            except Exception as e:
-                # 若需要,请修改为warning
-                _log.info(str(e))
-                continue
+    for temp_data in items:
+        temp_data = [_ for _ in temp_data if _ is not None]
         if temp_data:
-            temp_data = xr.concat(temp_data, dim='level')
-            stda_data.append(temp_data)
+            stda_data.append(xr.concat(temp_data, dim='level'))
     if stda_data:
         return xr.concat(stda_data, dim='dtime')
     return None
 
 
-def get_model_points(init_time=None, fhours=None, data_name=None, var_name=None, levels=None, points={},**kwargs):
+def get_model_points(init_time=None, fhours=None, data_name=None, var_name=None, levels=None, points={},
+                     extent=None, x_percent=0, y_percent=0, max_workers=8, **kwargs):
     '''
 
     [读取单层/多层，单时效/多时效 模式网格数据，插值到站点上]
@@ -224,6 +247,7 @@ def get_model_points(init_time=None, fhours=None, data_name=None, var_name=None,
         var_name {[str]} -- [要素名]
         levels {[list or number]} -- [层次，不传代表地面层] (default: {None})
         points {[dict]} -- [站点信息，字典中必须包含经纬度{'lon':[], 'lat':[]}]
+        max_workers {number} -- [并发读取的最大线程数，1为串行读取] (default: {8})
 
     Returns:
         [stda] -- [stda格式数据]
@@ -231,14 +255,82 @@ def get_model_points(init_time=None, fhours=None, data_name=None, var_name=None,
     fhours = utl.parm_tolist(fhours)
     levels = utl.parm_tolist(levels)
 
-    # get grids data
-    stda_data = get_model_3D_grids(init_time, fhours, data_name, var_name, levels,**kwargs)
+    # 每个网格场解码后仅保留站点相邻格点
+    items = _get_model_grid_items(init_time, fhours, data_name, var_name, levels, extent, x_percent, y_percent, max_workers, points=points, **kwargs)
 
-    if stda_data is not None and stda_data.size > 0:
-        return mdgstda.gridstda_to_stastda(stda_data, points)
+    stda_data = []
+    for temp_data in items:
+        temp_data = [_ for _ in temp_data if _ is not None]
+        if temp_data:
+            stda_data.append(xr.concat(temp_data, dim='level'))
+    if stda_data:
+        return mdgstda.gridstda_to_stastda(xr.concat(stda_data, dim='dtime'), points)
     return None
 
 
+def get_model_3D_points(init_time=None, fhour=None, data_name=None, var_name=None, levels=None, points={},
+                        extent=None, x_percent=0, y_percent=0, max_workers=8, **kwargs):
+    '''
+
+    [读取多层单时次模式网格数据，插值到站点上]
+
+    Keyword Arguments:
+        init_time {[datetime]} -- [起报时间]
+        fhour {[int32]} -- [预报时效]
+        data_name {[str]} -- [模式名]
+        var_name {[str]} -- [要素名]
+        levels {[list or number]} -- [层次，不传代表地面层] (default: {None})
+        points {[dict]} -- [站点信息，字典中必须包含经纬度{'lon':[], 'lat':[]}]
+        max_workers {number} -- [并发读取的最大线程数，1为串行读取] (default: {8})
+
+    Returns:
+        [stda] -- [stda格式数据]
+    '''
+    levels = utl.parm_tolist(levels)
+
+    items = _get_model_grid_items(init_time, [fhour], data_name, var_name, levels, extent, x_percent, y_percent, max_workers, points=points, **kwargs)
+
+    stda_data = [_ for _ in items[0] if _ is not None]
+    if stda_data:
+        return mdgstda.gridstda_to_stastda(xr.concat(stda_data, dim='level'), points)
+    return None
+
+
+def get_model_init_times(data_name=None, var_name=None, level=None, fhour=0):
+    '''
+
+    [列出cassandra目录下可用的模式起报时间(一次目录列表)]
+
+    Keyword Arguments:
+        data_name {[str]} -- [模式名]
+        var_name {[str]} -- [数据要素名]
+        level {[int32]} -- [层次，不传代表地面层] (default: {None})
+        fhour {[int32]} -- [预报时效，仅列出存在该时效文件的起报时间] (default: {0})
+
+    Returns:
+        [list] -- [按时间升序排列的起报时间(datetime)列表]
+    '''
+    try:
+        if level:
+            cassandra_dir = cassandra_model_cfg().model_cassandra_dir(level_type='high', data_name=data_name,
+                                                                      var_name=var_name, level=level)  # cassandra数据路径
+        else:
+            cassandra_dir = cassandra_model_cfg().model_cassandra_dir(level_type='surface', data_name=data_name, var_name=var_name)  # cassandra数据路径
+    except Exception as e:
+        raise Exception(str(e))
+
+    suffix = '.{:03d}'.format(fhour)
+    init_times = set()
+    for filename in nmc_micaps_io.get_file_list(cassandra_dir):
+        if not filename.endswith(suffix):
+            continue
+        try:
+            init_times.add(datetime.datetime.strptime(filename[:8], '%y%m%d%H'))
+        except ValueError:
+            continue
+    return sorted(init_times)
+
+
 def get_obs_stations(obs_time=None, data_name=None, var_name=None, level=None, id_selected=None,
                      extent=None, x_percent=0, y_percent=0, is_save_other_info=False):
     '''
@@ -402,7 +494,7 @@ def get_fy_awx(obs_time=None, data_name=None, var_name=None, channel=None, exten
     stda_data = mdgstda.xrda_to_gridstda(data['image'],
                                          level_dim='channel', time_dim='time', lat_dim='lat', lon_dim='lon',
                                          member=[data_name], level=[channel], time=[obs_time],
-                                         var_name=var_name, np_input_units=cassandra_units, data_source='cassandra')
+                                         var_name=var_name, np_input_units=cassandra_units, copy=False, data_source='cassandra')
 
     return stda_data
 
@@ -516,7 +608,7 @@ def get_radar_mosaic(obs_time=None, data_name=None, var_name=None, extent=None,
     stda_data = mdgstda.xrda_to_gridstda(data['data'],
                                          time_dim='time', lat_dim='lat', lon_dim='lon',
                                          member=[data_name],  time=[obs_time],
-                                         var_name=var_name, np_input_units=cassandra_units, data_source='cassandra')
+                                         var_name=var_name, np_input_units=cassandra_units, copy=False, data_source='cassandra')
 
     return stda_data
 
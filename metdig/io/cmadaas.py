@@ -39,6 +39,15 @@ def get_model_grid(init_time=None, fhour=None, data_name=None, var_name=None, le
     Returns:
         [stda] -- [stda格式数据]
     '''
+    return _get_model_grid(init_time, fhour, data_name, var_name, level, extent=extent, x_percent=x_percent, y_percent=y_percent,
+                           cache_clear=cache_clear, dim_round=dim_round, **kwargs)
+
+
+def _get_model_grid(init_time=None, fhour=None, data_name=None, var_name=None, level=None,
+                    extent=None, x_percent=0, y_percent=0, cache_clear=True, dim_round=4, points=None, **kwargs):
+    '''
+    读取单层单时次模式网格数据，points非空时解码后仅保留站点插值所需的相邻格点，不生成全场stda
+    '''
     try:
         if level:
             level_type = 'high'
@@ -105,6 +114,7 @@ def get_model_grid(init_time=None, fhour=None, data_name=None, var_name=None, le
     data['lat']=data.lat.round(dim_round)
     # 数据裁剪
     data = utl.area_cut(data, extent, x_percent, y_percent)
+    data = utl.points_cut(data, points)
 
     # 经纬度从小到大排序好
     data = data.sortby('lat')
@@ -116,7 +126,7 @@ def get_model_grid(init_time=None, fhour=None, data_name=None, var_name=None, le
     stda_data = mdgstda.xrda_to_gridstda(data[list(data.keys())[0]],
                                          member_dim='number', level_dim='level', time_dim='time', lat_dim='lat', lon_dim='lon',
                                          member=member, level=[cmadaas_level], time=[init_time], dtime=[fhour],
-                                         var_name=var_name, np_input_units=cmadaas_units,
+                                         var_name=var_name, np_input_units=cmadaas_units, copy=False,
                                          data_source='cmadaas', level_type=level_type)
     return stda_data
 
@@ -292,15 +302,89 @@ def get_model_points(init_time=None, fhours=None, data_name=None, var_name=None,
     '''
     fhours = utl.parm_tolist(fhours)
     levels = utl.parm_tolist(levels)
+    init_time = utl.parm_tolist(init_time)
+
+    # 每个网格场解码后仅保留站点相邻格点
+    stda_data = []
+    for iinit in init_time:
+        dtime_data = []
+        for fhour in fhours:
+            temp_data = []
+            for level in levels:
+                try:
+                    data = _get_model_grid(iinit, fhour, data_name, var_name, level, points=points)
+                    if data is not None and data.size > 0:
+                        temp_data.append(data)
+                except Exception as e:
+                    _log.info(str(e))
+            if temp_data:
+                dtime_data.append(xr.concat(temp_data, dim='level'))
+        if dtime_data:
+            stda_data.append(xr.concat(dtime_data, dim='dtime'))
+    if stda_data:
+        return mdgstda.gridstda_to_stastda(xr.concat(stda_data, dim='time'), points)
+    return None
+
+
+def get_model_3D_points(init_time=None, fhour=None, data_name=None, var_name=None, levels=None, points={}):
+    '''
+
+    [读取多层单时次模式网格数据，插值到站点上]
+
+    Keyword Arguments:
+        init_time {[datetime]} -- [起报时间]
+        fhour {[int32]} -- [预报时效]
+        data_name {[str]} -- [模式名]
+        var_name {[str]} -- [要素名]
+        levels {[list or number]} -- [层次，不传代表地面层] (default: {None})
+        points {[dict]} -- [站点信息，字典中必须包含经纬度{'lon':[], 'lat':[]}]
 
-    # get grids data
-    stda_data = get_model_3D_grids(init_time, fhours, data_name, var_name, levels)
+    Returns:
+        [stda] -- [stda格式数据]
+    '''
+    levels = utl.parm_tolist(levels)
 
-    if stda_data is not None and stda_data.size > 0:
-        return mdgstda.gridstda_to_stastda(stda_data, points)
+    stda_data = []
+    for level in levels:
+        try:
+            data = _get_model_grid(init_time, fhour, data_name, var_name, level, points=points)
+            if data is not None and data.size > 0:
+                stda_data.append(data)
+        except Exception as e:
+            _log.info(str(e))
+    if stda_data:
+        return mdgstda.gridstda_to_stastda(xr.concat(stda_data, dim='level'), points)
     return None
 
 
+def get_model_init_times(data_name=None, var_name=None, level=None, fhour=0, latest_hours=24):
+    '''
+
+    [获取大数据云平台最近latest_hours小时内最新的模式起报时间(北京时)，大数据云平台仅提供最新起报时间接口]
+
+    Keyword Arguments:
+        data_name {[str]} -- [模式名]
+        var_name {[str]} -- [数据要素名]
+        level {[int32]} -- [层次，不传代表地面层] (default: {None})
+        fhour {[int32]} -- [预报时效] (default: {0})
+        latest_hours {[int32]} -- [查询最近多少小时内的起报时间] (default: {24})
+
+    Returns:
+        [list] -- [起报时间(datetime)列表，不存在时为空列表]
+    '''
+    try:
+        level_type = 'high' if level else 'surface'
+        cmadaas_data_code = cmadaas_model_cfg().model_cmadaas_data_code(data_name=data_name, var_name=var_name, level_type=level_type, fhour=fhour)
+    except Exception as e:
+        raise Exception(str(e))
+
+    latest_time = nmc_cmadaas_io.cmadaas_get_model_latest_time(data_code=cmadaas_data_code, latestTime=latest_hours)
+    if latest_time is None:
+        return []
+    latest_time = pd.Timestamp(latest_time).to_pydatetime() + datetime.timedelta(hours=8)  # 数据都是世界时，需要转换为北京时
+    return [latest_time]
+
+
 def get_obs_stations(obs_time=None, data_name=None, var_name=None, id_selected=None,
                      extent=None, x_percent=0, y_percent=0):
     '''
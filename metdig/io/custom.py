@@ -10,6 +10,8 @@ import pandas as pd
 
 from metdig.io.lib import config as CONFIG
 from metdig.io.lib import utility as utl
+from metdig.io.lib import grid_cache
+from metdig.io.lib.custom_store import custom_store
 
 import metdig.utl as mdgstda
 
@@ -33,13 +35,19 @@ def split_stda_to_cache_sfc(stda, var_name, data_name='custom', var_units='', is
     if stda.level.size > 1:
         raise Exception('stda error: the length of the level dimension must be 1!')
 
+    # 缓存数据更新，清空进程内缓存，避免读取到旧数据
+    grid_cache.memory_cache.clear()
+
+    use_store = CONFIG.get_customcache_backend() == 'zarr'
+    fields = []
+
     stda.name = var_name
     for time in stda.time.values:
         for dtime in stda.dtime.values:
             cachefile = os.path.join(CONFIG.get_cache_dir(),
                                      f'CUSTOM_DATA/{data_name}/{var_name}/{pd.to_datetime(time):%Y%m%d%H%M%S}.{dtime:03d}.nc')
 
-            if os.path.exists(cachefile) and is_overwrite == False:
+            if not use_store and os.path.exists(cachefile) and is_overwrite == False:
                 _log.info(f'{cachefile} 存在，不覆盖！')
                 continue
 
@@ -55,12 +63,20 @@ def split_stda_to_cache_sfc(stda, var_name, data_name='custom', var_units='', is
                 stda_attrs['var_units'] = data_units
             data.attrs = stda_attrs
 
+            if use_store:
+                fields.append(data)
+                continue
+
             if not os.path.exists(os.path.dirname(cachefile)):
                 os.makedirs(os.path.dirname(cachefile))
 
             _log.info(f'save to {cachefile}')
             data.to_netcdf(cachefile)
 
+    if use_store:
+        # 一次写入zarr存储
+        custom_store.write(fields, data_name, var_name, 'surface', is_overwrite=is_overwrite)
+
 
 def split_stda_to_cache_psl(stda, var_name, data_name='custom', var_units='', is_overwrite=True, **attrs_kwargs):
     '''
@@ -74,6 +90,12 @@ def split_stda_to_cache_psl(stda, var_name, data_name='custom', var_units='', is
         var_units {[str]} -- [数据对应的单位。默认不给定单位即传进来的stda数据为标准格式，自动赋予stda标准单位属性。如给定单位则进行单位转换]
         is_overwrite {[bool]} -- [是否重写，默认重写覆盖]
     '''
+    # 缓存数据更新，清空进程内缓存，避免读取到旧数据
+    grid_cache.memory_cache.clear()
+
+    use_store = CONFIG.get_customcache_backend() == 'zarr'
+    fields = []
+
     stda.name = var_name
     for level in stda.level.values:
 
@@ -82,7 +104,7 @@ def split_stda_to_cache_psl(stda, var_name, data_name='custom', var_units='', is
                 cachefile = os.path.join(CONFIG.get_cache_dir(),
                                          f'CUSTOM_DATA/{data_name}/{var_name}/{level}/{pd.to_datetime(time):%Y%m%d%H%M%S}.{dtime:03d}.nc')
 
-                if os.path.exists(cachefile) and is_overwrite == False:
+                if not use_store and os.path.exists(cachefile) and is_overwrite == False:
                     _log.info(f'{cachefile} 存在，不覆盖！')
                     continue
 
@@ -98,12 +120,34 @@ def split_stda_to_cache_psl(stda, var_name, data_name='custom', var_units='', is
                     stda_attrs['var_units'] = data_units
                 data.attrs = stda_attrs
 
+                if use_store:
+                    fields.append(data)
+                    continue
+
                 if not os.path.exists(os.path.dirname(cachefile)):
                     os.makedirs(os.path.dirname(cachefile))
 
                 _log.info(f'save to {cachefile}')
                 data.to_netcdf(cachefile)
 
+    if use_store:
+        # 一次写入zarr存储
+        custom_store.write(fields, data_name, var_name, 'high', is_overwrite=is_overwrite)
+
+
+def _read_store_fields(init_time, fhours, data_name, var_name, levels, extent=None, x_percent=0, y_percent=0):
+    # zarr存储后端一次读取多个时效、层次的网格场，返回{(fhour, level): stda}，不存在的网格场不返回
+    stda_data = {}
+    for level_type in ('high', 'surface'):
+        keys = [(level, init_time, fhour) for fhour in fhours for level in levels if bool(level) == (level_type == 'high')]
+        if len(keys) == 0:
+            continue
+        fields = custom_store.read(keys, data_name, var_name, level_type, extent=extent, x_percent=x_percent, y_percent=y_percent)
+        for (level, _, fhour), data in zip(keys, fields):
+            if data is not None:
+                stda_data[(fhour, level)] = data
+    return stda_data
+
 
 def get_model_grid(init_time=None, fhour=None, data_name='custom', var_name=None, level=None,
                    extent=None, x_percent=0, y_percent=0):
@@ -124,6 +168,12 @@ def get_model_grid(init_time=None, fhour=None, data_name='custom', var_name=None
     Returns:
         [stda] -- [stda格式数据]
     '''
+    if CONFIG.get_customcache_backend() == 'zarr':
+        stda_data = _read_store_fields(init_time, [fhour], data_name, var_name, [level], extent=extent, x_percent=x_percent, y_percent=y_percent)
+        if len(stda_data) == 0:
+            raise Exception(f'Can not get data from custom zarr store! {data_name} {var_name} {level} {init_time:%Y%m%d%H%M%S}.{fhour:03d}')
+        return stda_data[(fhour, level)]
+
     if level:
         cachefile = os.path.join(CONFIG.get_cache_dir(),
                                  f'CUSTOM_DATA/{data_name}/{var_name}/{level}/{init_time:%Y%m%d%H%M%S}.{fhour:03d}.nc')
@@ -163,6 +213,13 @@ def get_model_grids(init_time=None, fhours=None, data_name='custom', var_name=No
     '''
     fhours = utl.parm_tolist(fhours)
 
+    if CONFIG.get_customcache_backend() == 'zarr':
+        fields = _read_store_fields(init_time, fhours, data_name, var_name, [level], extent=extent, x_percent=x_percent, y_percent=y_percent)
+        stda_data = [fields[(fhour, level)] for fhour in fhours if (fhour, level) in fields]
+        if stda_data:
+            return xr.concat(stda_data, dim='dtime')
+        raise Exception('Can not get data from cassandra! {}{}'.format(data_name, var_name))
+
     stda_data = []
     for fhour in fhours:
         try:  # 待斟酌
@@ -198,6 +255,13 @@ def get_model_3D_grid(init_time=None, fhour=None, data_name='custom', var_name=N
     '''
     levels = utl.parm_tolist(levels)
 
+    if CONFIG.get_customcache_backend() == 'zarr':
+        fields = _read_store_fields(init_time, [fhour], data_name, var_name, levels, extent=extent, x_percent=x_percent, y_percent=y_percent)
+        stda_data = [fields[(fhour, level)] for level in levels if (fhour, level) in fields]
+        if stda_data:
+            return xr.concat(stda_data, dim='level')
+        return None
+
     stda_data = []
     for level in levels:
         try:
@@ -233,6 +297,17 @@ def get_model_3D_grids(init_time=None, fhours=None, data_name='custom', var_name
     fhours = utl.parm_tolist(fhours)
     levels = utl.parm_tolist(levels)
 
+    if CONFIG.get_customcache_backend() == 'zarr':
+        fields = _read_store_fields(init_time, fhours, data_name, var_name, levels, extent=extent, x_percent=x_percent, y_percent=y_percent)
+        stda_data = []
+        for fhour in fhours:
+            temp_data = [fields[(fhour, level)] for level in levels if (fhour, level) in fields]
+            if temp_data:
+                stda_data.append(xr.concat(temp_data, dim='level'))
+        if stda_data:
+            return xr.concat(stda_data, dim='dtime')
+        return None
+
     stda_data = []
     for fhour in fhours:
         temp_data = []
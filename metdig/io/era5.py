@@ -7,6 +7,7 @@ import math
 
 import cdsapi
 import numpy as np
+import pandas as pd
 import xarray as xr
 
 import sys
@@ -16,6 +17,7 @@ import metdig.utl as mdgstda
 from metdig.io.lib import utility as utl
 from metdig.io.lib import era5_cfg
 from metdig.io.lib import config as CONFIG
+from metdig.io.lib.era5_store import era5_store
 
 from metdig.io import era5_manual_download
 
@@ -132,6 +134,10 @@ def era5anycache(var_name, levels, era5_utctime, extent):
     _levels = utl.parm_tolist(levels)
 
     for level in _levels:
+        if CONFIG.get_era5cache_backend() == 'zarr':
+            if not era5_store.contains(era5_utctime, var_name, extent, level=level):
+                return False
+            continue
         if level is None:
             cache_file = CONFIG.get_era5cache_file(era5_utctime, var_name, extent, level=None, find_area=True)
         else:
@@ -180,13 +186,8 @@ def era5_needdownedymdh_bytimes(era5_bjtimes, var_name, levels=None, extent=None
     return years, months, days, hours
 
 
-def _era5download(era5_bjtimes, var_name, levels, extent, x_percent, y_percent):
-    '''
-    调用手动下载部分批量下载单个要素，自动拆分到缓存目录下，参数为北京时
-    '''
-    _era5_bjtimes = utl.parm_tolist(era5_bjtimes)
-    _levels = utl.parm_tolist(levels)
-
+def _cache_extent(extent, x_percent, y_percent):
+    # 按xy percent扩大后取整的数据下载及缓存区域
     if extent:
         # 数据预先扩大xy percent
         delt_x = (extent[1] - extent[0]) * x_percent
@@ -201,6 +202,17 @@ def _era5download(era5_bjtimes, var_name, levels, extent, x_percent, y_percent):
         )
     else:
         extent = [50, 160, 0, 70]  # 数据下载默认范围
+    return extent
+
+
+def _era5download(era5_bjtimes, var_name, levels, extent, x_percent, y_percent):
+    '''
+    调用手动下载部分批量下载单个要素，自动拆分到缓存目录下，参数为北京时
+    '''
+    _era5_bjtimes = utl.parm_tolist(era5_bjtimes)
+    _levels = utl.parm_tolist(levels)
+
+    extent = _cache_extent(extent, x_percent, y_percent)
 
 
     # 获取本次需要下载的年月日参数
@@ -238,20 +250,7 @@ def get_model_grid(init_time=None, var_name=None, level=None, extent=None, x_per
     '''
 
     init_time_utc = init_time - datetime.timedelta(hours=8)  # 世界时
-    if extent:
-        # 数据预先扩大xy percent
-        delt_x = (extent[1] - extent[0]) * x_percent
-        delt_y = (extent[3] - extent[2]) * y_percent
-        extent = (extent[0] - delt_x, extent[1] + delt_x, extent[2] - delt_y, extent[3] + delt_y)
-        extent = (math.floor(extent[0]), math.ceil(extent[1]), math.floor(extent[2]), math.ceil(extent[3]))
-        extent = (
-            extent[0] if extent[0] >= -180 else -180,
-            extent[1] if extent[1] <= 180 else 180,
-            extent[2] if extent[2] >= -90 else -90,
-            extent[3] if extent[3] <= 90 else 90,
-        )
-    else:
-        extent = [50, 160, 0, 70]  # 数据下载默认范围
+    extent = _cache_extent(extent, x_percent, y_percent)
 
     # 从配置中获取相关信息
     try:
@@ -263,12 +262,19 @@ def get_model_grid(init_time=None, var_name=None, level=None, extent=None, x_per
             cache_file = CONFIG.get_era5cache_file(init_time_utc, var_name, extent, level=None, find_area=True)
 
         era5_var = era5_cfg().era5_variable(var_name=var_name, level_type=level_type)
-        era5_level = era5_cfg().era5_level(var_name=var_name, level_type=level_type, level=level)
-        era5_units = era5_cfg().era5_units(level_type=level_type, var_name=var_name)
         era5_prod_type = era5_cfg().era5_prod_type(level_type=level_type, var_name=var_name)
     except Exception as e:
         raise Exception(str(e))
 
+    if CONFIG.get_era5cache_backend() == 'zarr':
+        data = era5_store.read(init_time_utc, var_name, extent, level=level)
+        if data is None and force_local == False:
+            _era5download(init_time, var_name, level, extent, x_percent, y_percent) # 调用手动下载模块批量下载
+            data = era5_store.read(init_time_utc, var_name, extent, level=level)
+        if data is None:
+            raise Exception('era5 zarr store {} {} {:%Y%m%d%H%M} not found!'.format(var_name, level, init_time_utc))
+        return _era5_to_stda(data, [init_time], var_name, level, extent)
+
     if not os.path.exists(cache_file):
         if force_local == False:
             _era5download(init_time, var_name, level, extent, x_percent, y_percent) # 调用手动下载模块批量下载##检查是否已存在缓存数据是出现问题，需要解决
@@ -285,7 +291,20 @@ def get_model_grid(init_time=None, var_name=None, level=None, extent=None, x_per
     # 此处读到的dataset应该只有一个数据集，维度=[time=1,latitude,longitude]，因为下载的时候均是单层次下载
     data = xr.open_dataset(cache_file)
     data = data.to_array()
-    data = data.squeeze().transpose('latitude', 'longitude')
+    data = data.squeeze()
+    return _era5_to_stda(data, [init_time], var_name, level, extent)
+
+
+def _era5_to_stda(data, init_times, var_name, level, extent):
+    # data维度为(latitude, longitude)或(time, latitude, longitude)，init_times为对应的北京时
+    level_type = 'high' if level else 'surface'
+    era5_level = era5_cfg().era5_level(var_name=var_name, level_type=level_type, level=level)
+    era5_units = era5_cfg().era5_units(level_type=level_type, var_name=var_name)
+
+    if 'time' in data.dims:
+        data = data.transpose('time', 'latitude', 'longitude')
+    else:
+        data = data.transpose('latitude', 'longitude')
     data = data.rename({'latitude': 'lat', 'longitude': 'lon'})
 
     # 数据裁剪，此处不传xpercent，因为之前已经扩大范围了时候已经扩大范围了
@@ -297,10 +316,22 @@ def get_model_grid(init_time=None, var_name=None, level=None, extent=None, x_per
 
     stda_data = mdgstda.xrda_to_gridstda(data,
                                          lat_dim='lat', lon_dim='lon',
-                                         member=['era5'], level=[era5_level], time=[init_time],
-                                         var_name=var_name, np_input_units=era5_units,
+                                         member=['era5'], level=[era5_level], time=list(init_times),
+                                         var_name=var_name, np_input_units=era5_units, copy=False,
                                          data_source='cds', level_type=level_type)
     return stda_data
+
+
+def _get_model_grids_from_store(init_times, var_name, level, extent, x_percent, y_percent):
+    # zarr存储后端一次读取单层多时次数据，init_times为北京时，仅返回存在的时次
+    extent = _cache_extent(extent, x_percent, y_percent)
+    utc_times = [_t - datetime.timedelta(hours=8) for _t in init_times]
+    data = era5_store.read_times(utc_times, var_name, extent, level=level)
+    if data is None:
+        return None
+    found = set(pd.DatetimeIndex(data['time'].values))
+    init_times = [_t for _t, _utc in zip(init_times, utc_times) if pd.Timestamp(_utc) in found]
+    return _era5_to_stda(data, init_times, var_name, level, extent)
 # if __name__=='__main__':
 #     get_model_grid(data_source='cds', init_time=datetime.datetime(2020,3,14,8), fhour=0, data_name='era5', var_name='tmp', level=850, extent=[100,120,30,40])
 
@@ -325,6 +356,9 @@ def get_model_grids(init_times=None, var_name=None, level=None, extent=None, x_p
 
     init_times = utl.parm_tolist(init_times)
 
+    if CONFIG.get_era5cache_backend() == 'zarr':
+        return _get_model_grids_from_store(init_times, var_name, level, extent, x_percent, y_percent)
+
     stda_data = []
     for init_time in init_times:
         try:
@@ -400,6 +434,19 @@ def get_model_3D_grids(init_times=None, var_name=None, levels=None, extent=None,
     init_times = utl.parm_tolist(init_times)
     levels = utl.parm_tolist(levels)
 
+    if CONFIG.get_era5cache_backend() == 'zarr':
+        stda_data = []
+        for level in levels:
+            try:
+                data = _get_model_grids_from_store(init_times, var_name, level, extent, x_percent, y_percent)
+                if data is not None and data.size > 0:
+                    stda_data.append(data)
+            except Exception as e:
+                _log.info(str(e))
+        if stda_data:
+            return xr.concat(stda_data, dim='level')
+        return None
+
     stda_data = []
     for init_time in init_times:
         temp_data = []
@@ -4,6 +4,9 @@ import datetime
 import os
 import sys
 import math
+import json
+import hashlib
+import threading
 from concurrent import futures
 
 import cdsapi
@@ -19,6 +22,8 @@ import metdig.utl as mdgstda
 
 from metdig.io.lib import config as CONFIG
 from metdig.io.lib import era5_cfg
+from metdig.io.lib.era5_manifest import era5_manifest
+from metdig.io.lib.era5_store import era5_store
 
 import logging
 # logging.basicConfig(format='', level=logging.INFO)  # 此处加这一句代表忽略下属_log作用，直接将_log输出到命令行，测试用
@@ -74,7 +79,9 @@ def _era5_download_hourly_pressure_levels(
             'time': list(map(lambda x: '{:02d}:00'.format(x), hour)),
             'area': [extent[3], extent[0], extent[2], extent[1]],
         },
-        savefile)
+        savefile + '.tmp')
+    # 下载完成后再重命名，中断时不会留下不完整的文件
+    os.replace(savefile + '.tmp', savefile)
 
 
 def _era5_download_hourly_single_levels(
@@ -119,7 +126,9 @@ def _era5_download_hourly_single_levels(
             'time': list(map(lambda x: '{:02d}:00'.format(x), hour)),
             'area': [extent[3], extent[0], extent[2], extent[1]],
         },
-        savefile)
+        savefile + '.tmp')
+    # 下载完成后再重命名，中断时不会留下不完整的文件
+    os.replace(savefile + '.tmp', savefile)
 
 
 def _get_ymd(dt_start, dt_end):
@@ -148,6 +157,10 @@ def _check_cache(var_name, era5_utctime, extent, levels=None):
     else:
         _levels = levels
     for level in _levels:
+        if CONFIG.get_era5cache_backend() == 'zarr':
+            if not era5_store.contains(era5_utctime, var_name, extent, level=level):
+                return False
+            continue
         if level is None:
             cache_file = CONFIG.get_era5cache_file(era5_utctime, var_name, extent, level=None, find_area=True)
         else:
@@ -167,6 +180,12 @@ def _split_psl(savefile, var_name, extent, pressure_level):
         else:
             _level = data['level'].values
             _lvltg = True
+        if CONFIG.get_era5cache_backend() == 'zarr':
+            # 按层次追加写入zarr存储
+            for lv in _level:
+                _log.info('{} {} 写入zarr存储...'.format(var_name, lv))
+                era5_store.append(data.sel(level=lv) if _lvltg else data, var_name, extent, level=lv)
+            return
         for dt_utc in data['time'].values:
             dt_utc = pd.to_datetime(dt_utc)
             for lv in _level:
@@ -184,12 +203,18 @@ def _split_psl(savefile, var_name, extent, pressure_level):
                         data.sel(time=dt_utc, level=lv).to_netcdf(cachefile)
                     else:
                         data.sel(time=dt_utc).to_netcdf(cachefile)
+                # 登记到缓存文件清单
+                era5_manifest.add(cachefile, dt_utc, var_name, extent, level=lv)
 
 
 def _split_sfc(savefile, var_name, extent):
     # 拆分下载的sfc数据到cache目录下
     if os.path.exists(savefile):
         data = xr.open_dataarray(savefile)
+        if CONFIG.get_era5cache_backend() == 'zarr':
+            _log.info('{} 写入zarr存储...'.format(var_name))
+            era5_store.append(data, var_name, extent, level=None)
+            return
         for dt_utc in data['time'].values:
             dt_utc = pd.to_datetime(dt_utc)
             # cache目录为世界时
@@ -203,6 +228,8 @@ def _split_sfc(savefile, var_name, extent):
                 if not os.path.exists(os.path.dirname(cachefile)):
                     os.makedirs(os.path.dirname(cachefile))
                 data.sel(time=dt_utc).to_netcdf(cachefile)
+            # 登记到缓存文件清单
+            era5_manifest.add(cachefile, dt_utc, var_name, extent, level=None)
 
 
 def _era5_psl_download(dt_start=None, dt_end=None, var_names=['hgt', 'u', 'v', 'vvel', 'rh', 'tmp', 'pv', 'div','spfh'],
@@ -267,12 +294,166 @@ def _era5_sfc_download(dt_start=None, dt_end=None, var_names=['u10m','u100m', 'v
         # 将下载后的数据拆分到cache目录下
         _split_sfc(savefile, var_name, extent)
         
+def _get_month_chunks(dt_start, dt_end):
+    # 将日期区间按自然月拆分为[(chunk_start, chunk_end), ...]，每个下载请求只包含一个月，避免年月日参数组合后多下载数据
+    chunks = []
+    chunk_start = datetime.datetime(dt_start.year, dt_start.month, dt_start.day)
+    dt_end = datetime.datetime(dt_end.year, dt_end.month, dt_end.day)
+    while chunk_start <= dt_end:
+        next_month = datetime.datetime(chunk_start.year + chunk_start.month // 12, chunk_start.month % 12 + 1, 1)
+        chunk_end = min(next_month - datetime.timedelta(days=1), dt_end)
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = next_month
+    return chunks
+
+
+class _Era5Request(object):
+    '''
+    单个era5下载请求（单要素单月，参数时间均是世界时），下载后拆分到cache目录下
+    '''
+
+    def __init__(self, level_type, var_name, dt_start, dt_end, hour, extent, download_dir=None, pressure_level=None):
+        self.level_type = level_type
+        self.var_name = var_name
+        self.years, self.months, self.days = _get_ymd(dt_start, dt_end)
+        self.hour = [int(_h) for _h in hour]
+        self.extent = extent
+        self.pressure_level = [int(_l) for _l in pressure_level] if pressure_level is not None else None
+        savedir = download_dir if download_dir else os.path.join(CONFIG.get_cache_dir(), 'ERA5_DATA/manual_download')
+        self.savefile = os.path.join(savedir,
+                                     '{}_{:%Y%m%d}_{:%Y%m%d}_{}_{}_{}_{}.nc'.format(
+                                         var_name, dt_start, dt_end, extent[0], extent[1], extent[2], extent[3]))
+
+    @property
+    def info(self):
+        return {'level_type': self.level_type, 'var_name': self.var_name,
+                'year': self.years, 'month': self.months, 'day': self.days, 'hour': self.hour,
+                'pressure_level': self.pressure_level, 'extent': [float(_e) for _e in self.extent],
+                'cache_backend': CONFIG.get_era5cache_backend()}
+
+    @property
+    def key(self):
+        return hashlib.md5(json.dumps(self.info, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def download(self, is_overwrite=True):
+        era5_var = era5_cfg().era5_variable(var_name=self.var_name, level_type=self.level_type)
+        if self.level_type == 'high':
+            _era5_download_hourly_pressure_levels(savefile=self.savefile, year=self.years, month=self.months, day=self.days, hour=self.hour,
+                                                  pressure_level=self.pressure_level, variable=era5_var, extent=self.extent, is_overwrite=is_overwrite)
+        else:
+            _era5_download_hourly_single_levels(savefile=self.savefile, year=self.years, month=self.months, day=self.days, hour=self.hour,
+                                                variable=era5_var, extent=self.extent, is_overwrite=is_overwrite)
+
+    def split(self):
+        if self.level_type == 'high':
+            _split_psl(self.savefile, self.var_name, self.extent, self.pressure_level)
+        else:
+            _split_sfc(self.savefile, self.var_name, self.extent)
+
+
+class _RequestLog(object):
+    '''
+    era5下载请求完成记录（json lines，每行一个已下载并拆分完成的请求），重复运行时跳过已完成的请求
+    '''
+
+    def __init__(self, log_file):
+        self.log_file = log_file
+        self._done = set()
+        self._lock = threading.Lock()
+        if os.path.exists(log_file):
+            with open(log_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self._done.add(json.loads(line)['key'])
+                    except (ValueError, KeyError):
+                        # 写入中断的行
+                        continue
+
+    def is_done(self, request):
+        return request.key in self._done
+
+    def mark(self, request):
+        record = dict(request.info, key=request.key, savefile=request.savefile,
+                      finished='{:%Y-%m-%d %H:%M:%S}'.format(datetime.datetime.now()))
+        with self._lock:
+            os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._done.add(request.key)
+
+
+def _download_pipeline(requests, max_pool=2, max_split=1, is_overwrite=True, resume=True):
+    """下载拆分流水线：max_pool个下载线程，下载完成的文件交由max_split个拆分线程写入cache目录，拆分与后续请求的下载同时进行
+
+    Args:
+        requests (list): _Era5Request列表
+        max_pool (int, optional): 下载线程数. Defaults to 2.
+        max_split (int, optional): 拆分线程数. Defaults to 1.
+        is_overwrite (bool, optional): 下载文件已存在时是否重复下载. Defaults to True.
+        resume (bool, optional): 是否跳过下载目录下era5_requests_done.jsonl中记录已完成的请求. Defaults to True.
+
+    Returns:
+        list: 失败的请求
+    """
+    if len(requests) == 0:
+        return []
+    request_log = _RequestLog(os.path.join(os.path.dirname(requests[0].savefile), 'era5_requests_done.jsonl'))
+    if resume:
+        todo = [_r for _r in requests if not request_log.is_done(_r)]
+        if len(todo) < len(requests):
+            _log.info('跳过已完成的请求 {}/{}'.format(len(requests) - len(todo), len(requests)))
+    else:
+        todo = requests
+
+    # 已下载(含正在下载)但未拆分完成的请求数上限，避免拆分慢于下载时积压过多文件
+    slots = threading.BoundedSemaphore(max_pool + max_split)
+
+    def _split(request):
+        try:
+            request.split()
+            request_log.mark(request)
+        finally:
+            slots.release()
+
+    failed = []
+    with futures.ThreadPoolExecutor(max_workers=max_split) as split_executor:
+
+        def _download(request):
+            slots.acquire()
+            try:
+                request.download(is_overwrite=is_overwrite)
+            except Exception:
+                slots.release()
+                raise
+            return split_executor.submit(_split, request)
+
+        split_tasks = {}
+        with futures.ThreadPoolExecutor(max_workers=max_pool) as download_executor:
+            download_tasks = {download_executor.submit(_download, _r): _r for _r in todo}
+            for task in futures.as_completed(download_tasks):
+                try:
+                    split_tasks[task.result()] = download_tasks[task]
+                except Exception as e:
+                    _log.error('{} 下载失败: {}'.format(download_tasks[task].savefile, e))
+                    failed.append(download_tasks[task])
+
+        for task in futures.as_completed(split_tasks):
+            try:
+                task.result()
+            except Exception as e:
+                _log.error('{} 拆分失败: {}'.format(split_tasks[task].savefile, e))
+                failed.append(split_tasks[task])
+    return failed
+
+
 def era5_psl_download_usepool(dt_start=None, dt_end=None, var_names=['hgt', 'u', 'v', 'vvel', 'rh', 'tmp', 'pv', 'div','spfh','vort'],
                               pressure_level=[200,225,250,300,350,400,450,500,550,600,650,700,
                               750,775,800,825,850,875,900,925,950,975,1000],
                               hour=np.arange(0,24,1).tolist(),
-                              extent=[50, 160, 0, 70], download_dir=None, max_pool=2, is_overwrite=True):
+                              extent=[50, 160, 0, 70], download_dir=None, max_pool=2, is_overwrite=True,
+                              max_split=1, resume=True):
     """采用多线程下载era5数据（注意：参数均为北京时，下载时按照世界时下载，然后按照世界时自动拆分到cache目录下）
+    按要素、自然月拆分为多个下载请求，下载与拆分流水线进行，已完成的请求记录在下载目录下的era5_requests_done.jsonl中，重复运行时跳过
 
     Args:
         dt_start (datetime, optional): 开始时间(北京时). Defaults to None.
@@ -282,23 +463,29 @@ def era5_psl_download_usepool(dt_start=None, dt_end=None, var_names=['hgt', 'u',
         hour (list, optional): 指定下载的时次(北京时). Defaults.
         extent (list, optional): 区域. Defaults.
         download_dir (str, optional): 下载目录. Defaults to None.
-        max_pool (int, optional): 最大线程数. Defaults to 2.
+        max_pool (int, optional): 最大下载线程数. Defaults to 2.
         is_overwrite (bool, optional): 是否重复下载，默认重复下载（该参数仅用于检查下载的数据，不检查拆分后的数据）. Defaults to True.
+        max_split (int, optional): 拆分线程数. Defaults to 1.
+        resume (bool, optional): 是否跳过已完成的请求. Defaults to True.
+
+    Returns:
+        list: 失败的请求
     """         
     _hour = sorted([(datetime.datetime(1980, 1, 1, h) - datetime.timedelta(hours=8)).hour for h in hour]) # 北京时转成世界时
 
-    with futures.ThreadPoolExecutor(max_workers=max_pool) as executor:
-        tasks = []
-        for var_name in var_names:
-            tasks.append(executor.submit(_era5_psl_download, dt_start - datetime.timedelta(days=1), dt_end + datetime.timedelta(days=1), # 多下一天
-                                                             [var_name], pressure_level, _hour, extent, download_dir, is_overwrite))
-
-        futures.wait(tasks, return_when=futures.ALL_COMPLETED)
+    requests = []
+    for var_name in var_names:
+        for chunk_start, chunk_end in _get_month_chunks(dt_start - datetime.timedelta(days=1), dt_end + datetime.timedelta(days=1)): # 多下一天
+            requests.append(_Era5Request('high', var_name, chunk_start, chunk_end, _hour, extent,
+                                         download_dir=download_dir, pressure_level=pressure_level))
+    return _download_pipeline(requests, max_pool=max_pool, max_split=max_split, is_overwrite=is_overwrite, resume=resume)
 
 def era5_sfc_download_usepool(dt_start=None, dt_end=None, var_names=['u10m','u100m', 'v10m','v100m', 'psfc', 'tcwv', 'prmsl','t2m','td2m','rain01','cape','cin','k_idx'],
                               hour=np.arange(0,24,1).tolist(),
-                              extent=[50, 160, 0, 70], download_dir=None, max_pool=2, is_overwrite = True):
+                              extent=[50, 160, 0, 70], download_dir=None, max_pool=2, is_overwrite = True,
+                              max_split=1, resume=True):
     """采用多线程下载era5数据（注意：参数均为北京时，下载时按照世界时下载，然后按照世界时自动拆分到cache目录下）
+    按要素、自然月拆分为多个下载请求，下载与拆分流水线进行，已完成的请求记录在下载目录下的era5_requests_done.jsonl中，重复运行时跳过
 
     Args:
         dt_start (datetime, optional): 开始时间(北京时). Defaults to None.
@@ -307,18 +494,21 @@ def era5_sfc_download_usepool(dt_start=None, dt_end=None, var_names=['u10m','u10
         hour (list, optional): 指定下载的时次(北京时). Defaults.
         extent (list, optional): 区域. Defaults.
         download_dir (str, optional): 下载目录. Defaults to None.
-        max_pool (int, optional): 最大线程数. Defaults to 2.
+        max_pool (int, optional): 最大下载线程数. Defaults to 2.
         is_overwrite (bool, optional): 是否重复下载，默认重复下载（该参数仅用于检查下载的数据，不检查拆分后的数据）. Defaults to True.
+        max_split (int, optional): 拆分线程数. Defaults to 1.
+        resume (bool, optional): 是否跳过已完成的请求. Defaults to True.
+
+    Returns:
+        list: 失败的请求
     """    
     _hour = sorted([(datetime.datetime(1980, 1, 1, h) - datetime.timedelta(hours=8)).hour for h in hour]) # 北京时转成世界时
 
-    with futures.ThreadPoolExecutor(max_workers=max_pool) as executor:
-        tasks = []
-        for var_name in var_names:
-            tasks.append(executor.submit(_era5_sfc_download, dt_start - datetime.timedelta(days=1), dt_end + datetime.timedelta(days=1), # 多下一天
-                                                             [var_name], _hour, extent, download_dir, is_overwrite))
-
-        futures.wait(tasks, return_when=futures.ALL_COMPLETED)
+    requests = []
+    for var_name in var_names:
+        for chunk_start, chunk_end in _get_month_chunks(dt_start - datetime.timedelta(days=1), dt_end + datetime.timedelta(days=1)): # 多下一天
+            requests.append(_Era5Request('surface', var_name, chunk_start, chunk_end, _hour, extent, download_dir=download_dir))
+    return _download_pipeline(requests, max_pool=max_pool, max_split=max_split, is_overwrite=is_overwrite, resume=resume)
 
 def era5_psl_sameperiod_download_usepool(years=np.arange(1980,2022).tolist(), month=7, day=10, beforeday=3, afterday=3,
                                          var_names=['hgt', 'u', 'v', 'vvel', 'rh', 'tmp', 'pv', 'div','spfh','vort'],
@@ -430,6 +620,19 @@ def era5_sfc_sameperiod_download_usepool(years=np.arange(1980,2022).tolist(), mo
     
 
 
+def era5_cache_to_zarr(var_names=None, remove_netcdf=False):
+    """将已有的按时次/层次拆分的era5 netcdf缓存导入zarr存储（导入后需在config.ini的[CACHE]中设置ERA5_CACHE_BACKEND = zarr）
+
+    Args:
+        var_names (list, optional): 需要导入的要素列表，默认全部. Defaults to None.
+        remove_netcdf (bool, optional): 导入后是否删除netcdf缓存文件. Defaults to False.
+
+    Returns:
+        int: 导入的netcdf文件数
+    """
+    return era5_store.import_netcdf_cache(var_names=var_names, remove_netcdf=remove_netcdf)
+
+
 def test():
 
     _log.info('mytest')
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+"""
+模式数据可用性索引：按(data_source, data_name, var_name, level, fhour)缓存可用的起报时间列表，
+超过ttl秒后重新列目录，查询最新起报时间无需逐时次试读数据。
+"""
+
+import time
+import threading
+
+import logging
+_log = logging.getLogger(__name__)
+
+
+class InitTimeIndex(object):
+    '''
+    可用起报时间索引（按ttl过期）
+    '''
+
+    def __init__(self, ttl=600):
+        """[初始化]
+
+        Args:
+            ttl (int, optional): [缓存有效期(秒)]. Defaults to 600.
+        """
+        self.ttl = ttl
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, list_func):
+        """[获取起报时间列表，缓存不存在或过期时调用list_func重新获取]
+
+        Args:
+            key ([tuple]): [缓存键]
+            list_func ([function]): [无参函数，返回按时间升序排列的起报时间列表]
+
+        Returns:
+            [list]: [起报时间列表]
+        """
+        now = time.time()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and now - item[0] < self.ttl:
+                return list(item[1])
+        # 缓存中保存为tuple，每次返回新的list，调用方修改返回值不影响缓存
+        init_times = tuple(list_func())
+        with self._lock:
+            self._items[key] = (now, init_times)
+        _log.debug('init time index {} updated, {} init times'.format(key, len(init_times)))
+        return list(init_times)
+
+    def clear(self):
+        """[清空索引]
+        """
+        with self._lock:
+            self._items.clear()
+
+
+# 进程内默认的索引实例
+init_time_index = InitTimeIndex()
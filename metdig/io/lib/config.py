@@ -12,8 +12,6 @@ import datetime
 import shutil
 import configparser
 from pathlib import Path
-import fnmatch
-import re
 
 import logging
 _log = logging.getLogger(__name__)
@@ -69,6 +67,33 @@ def get_cache_dir():
     return cache_dir
 
 
+def _get_cache_backend(option):
+    if CONFIG.has_option('CACHE', option):
+        backend = CONFIG['CACHE'][option].strip().lower()
+        if backend not in ('netcdf', 'zarr'):
+            raise Exception('{}={} error, must be netcdf or zarr!'.format(option, backend))
+        return backend
+    return 'netcdf'
+
+
+def get_era5cache_backend():
+    """[获取era5缓存后端，可在config.ini的[CACHE]中配置ERA5_CACHE_BACKEND]
+
+    Returns:
+        [str]: ['netcdf'(按时次/层次拆分的nc文件，默认)或'zarr'(按要素/层次/区域合并的zarr存储)]
+    """
+    return _get_cache_backend('ERA5_CACHE_BACKEND')
+
+
+def get_customcache_backend():
+    """[获取自定义数据缓存后端，可在config.ini的[CACHE]中配置CUSTOM_CACHE_BACKEND]
+
+    Returns:
+        [str]: ['netcdf'(按层次/时次/时效拆分的nc文件，默认)或'zarr'(按模式名/要素合并的zarr存储)]
+    """
+    return _get_cache_backend('CUSTOM_CACHE_BACKEND')
+
+
 def get_era5cache_file(init_time, var_name, extent, level=None, find_area=True):
     """[获取era5缓存数据文件路径]
 
@@ -106,18 +131,12 @@ def get_era5cache_file(init_time, var_name, extent, level=None, find_area=True):
     # search match area file
     cache_file = cache_dir / '{:%Y%m%d%H%M}_{}_{}_{}_{}.nc'.format(init_time, extent[0], extent[1], extent[2], extent[3])
 
-    if find_area and os.path.exists(cache_dir):
-        filefmt = '{:%Y%m%d%H%M}_*.nc'.format(init_time)
-        fnames = fnmatch.filter(os.listdir(cache_dir), filefmt)
-        if fnames:
-            for name in fnames:
-                # such as name = '202007250800_28_180_-7_77.nc', file_extent = ['202007250800', '28', '180', '-7', '77']
-                file_extent = re.findall(r"\-?\d+\.?\d*", os.path.splitext(name)[0])
-                if len(file_extent) == 5:
-                    file_extent = float(file_extent[1]), float(file_extent[2]), float(file_extent[3]), float(file_extent[4])
-                    if file_extent[0] <= extent[0] and file_extent[1] >= extent[1] and file_extent[2] <= extent[2] and file_extent[3] >= extent[3]:
-                        cache_file = cache_dir / name
-                        break
+    if find_area:
+        # 通过缓存文件清单查询覆盖该区域的缓存文件
+        from metdig.io.lib.era5_manifest import era5_manifest
+        match_file = era5_manifest.find(cache_dir, init_time, var_name, extent, level=level)
+        if match_file is not None:
+            cache_file = Path(match_file)
 
     return cache_file
 
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+
+"""
+自定义数据缓存的zarr存储后端（config.ini中[CACHE] CUSTOM_CACHE_BACKEND = zarr时启用）：
+每个(data_name, var_name, level_type)对应一个zarr存储，目录结构为
+    get_cache_dir()/CUSTOM_DATA_ZARR/{data_name}/{var_name}_{level_type}.zarr
+存储中每个(level, time, dtime)网格场为一条记录，沿record维追加写入，level/time/dtime为record维上的坐标，
+各记录的stda属性(json)及层次的数据类型同样按记录保存，
+读取时按坐标索引一次isel取出所需的全部网格场，无需逐个打开小文件。
+依赖zarr库，仅在使用该后端时导入。
+"""
+
+import os
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from metdig.io.lib import utility as utl
+
+import logging
+_log = logging.getLogger(__name__)
+
+_TIME_UNITS = 'minutes since 1900-01-01 00:00:00'
+
+
+def _json_default(value):
+    # stda属性中的numpy标量
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def _record_key(level, time, dtime, level_type):
+    # 地面层的层次值不参与索引，与原缓存目录结构一致
+    level = None if level_type == 'surface' else float(level)
+    return (level, pd.Timestamp(time), int(dtime))
+
+
+class CustomZarrStore(object):
+    '''
+    自定义数据缓存zarr存储
+    '''
+
+    def __init__(self, store_dir=None):
+        """[初始化]
+
+        Args:
+            store_dir ([str], optional): [存储目录，默认为get_cache_dir()/CUSTOM_DATA_ZARR]. Defaults to None.
+        """
+        self._store_dir = store_dir
+        self._stores = {}
+        self._lock = threading.RLock()
+
+    @property
+    def store_dir(self):
+        if self._store_dir is None:
+            from metdig.io.lib import config as CONFIG
+            return os.path.join(CONFIG.get_cache_dir(), 'CUSTOM_DATA_ZARR')
+        return self._store_dir
+
+    def store_path(self, data_name, var_name, level_type):
+        """[获取(data_name, var_name, level_type)对应的zarr存储路径]
+
+        Args:
+            data_name ([str]): [模式名]
+            var_name ([str]): [要素名]
+            level_type ([str]): ['high'或'surface']
+
+        Returns:
+            [str]: [zarr存储路径]
+        """
+        return os.path.join(self.store_dir, data_name, '{}_{}.zarr'.format(var_name, level_type))
+
+    def _open(self, path, level_type, reload=False):
+        # 返回(dataset, {(level, time, dtime): record序号})，进程内缓存已打开的存储
+        item = self._stores.get(path)
+        if item is None or reload:
+            ds = xr.open_zarr(path)
+            keys = zip(ds['record_level'].values, ds['record_time'].values, ds['record_dtime'].values)
+            index = {_record_key(*_k, level_type): _i for _i, _k in enumerate(keys)}
+            item = (ds, index)
+            self._stores[path] = item
+        return item
+
+    def write(self, fields, data_name, var_name, level_type, is_overwrite=True):
+        """[写入网格场]
+
+        Args:
+            fields ([list]): [stda列表，每个stda的level、time、dtime维长度均为1，member及经纬度网格需与存储中已有数据一致]
+            data_name ([str]): [模式名]
+            var_name ([str]): [要素名]
+            level_type ([str]): ['high'或'surface']
+            is_overwrite (bool, optional): [已存在时是否覆盖]. Defaults to True.
+        """
+        if len(fields) == 0:
+            return
+        path = self.store_path(data_name, var_name, level_type)
+        with self._lock:
+            exists = os.path.exists(path)
+            index = {}
+            legacy = False
+            if exists:
+                store_ds, index = self._open(path, level_type, reload=True)
+                # 早期版本的存储只在data变量上保存一份stda属性，只能写入属性一致的数据
+                legacy = 'record_attrs' not in store_ds
+                for data in fields:
+                    if not (np.array_equal(data['lat'].values, store_ds['lat'].values) and
+                            np.array_equal(data['lon'].values, store_ds['lon'].values) and
+                            np.array_equal(data['member'].values, store_ds['member'].values)):
+                        raise Exception(f'{path} 中已有数据的member/经纬度网格与写入数据不一致，请更换data_name！')
+                    if legacy and self._attrs_json(data.attrs) != store_ds['data'].attrs.get('stda_attrs'):
+                        raise Exception(f'{path} 中已有数据的属性(如var_units)与写入数据不一致，请更换data_name！')
+
+            new_fields = {}
+            for data in fields:
+                key = _record_key(data['level'].values[0], data['time'].values[0], data['dtime'].values[0], level_type)
+                if key in new_fields:
+                    new_fields[key] = data
+                elif key in index:
+                    if not is_overwrite:
+                        _log.info(f'{path} {key} 存在，不覆盖！')
+                        continue
+                    # 覆盖已有记录
+                    self._to_dataset(data, legacy=legacy).drop_vars(['member', 'lat', 'lon']).to_zarr(
+                        path, region={'record': slice(index[key], index[key] + 1)})
+                else:
+                    new_fields[key] = data
+
+            if new_fields:
+                ds = xr.concat([self._to_dataset(_d, legacy=legacy) for _d in new_fields.values()], dim='record')
+                if exists:
+                    ds.to_zarr(path, mode='a', append_dim='record')
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    encoding = {'data': {'chunks': (1,) + ds['data'].shape[1:]},
+                                'record_time': {'units': _TIME_UNITS, 'dtype': 'int64'}}
+                    ds.to_zarr(path, mode='w', encoding=encoding)
+            self._stores.pop(path, None)
+        _log.info(f'save {len(fields)} fields to {path}')
+
+    @staticmethod
+    def _attrs_json(attrs):
+        return json.dumps(attrs, ensure_ascii=False, default=_json_default)
+
+    @classmethod
+    def _to_dataset(cls, data, legacy=False):
+        # stda(member, level=1, time=1, dtime=1, lat, lon)转换为单条记录
+        record = data.isel(level=0, time=0, dtime=0).drop_vars(['level', 'time', 'dtime'])
+        ds = xr.Dataset({
+            'data': record.expand_dims('record').variable,
+            'record_level': ('record', [float(data['level'].values[0])]),
+            'record_time': ('record', data['time'].values.astype('datetime64[ns]')),
+            'record_dtime': ('record', data['dtime'].values.astype(np.int64)),
+        }, coords={'member': data['member'].values, 'lat': data['lat'].values, 'lon': data['lon'].values})
+        if legacy:
+            ds['data'].attrs['stda_attrs'] = cls._attrs_json(data.attrs)
+        else:
+            ds['record_attrs'] = ('record', np.array([cls._attrs_json(data.attrs)], dtype=object))
+            ds['record_level_dtype'] = ('record', np.array([data['level'].dtype.str], dtype=object))
+        return ds
+
+    def read(self, keys, data_name, var_name, level_type, extent=None, x_percent=0, y_percent=0):
+        """[读取多个网格场]
+
+        Args:
+            keys ([list]): [(level, time, dtime)列表，地面层level可为None]
+            data_name ([str]): [模式名]
+            var_name ([str]): [要素名]
+            level_type ([str]): ['high'或'surface']
+            extent ([tuple], optional): [裁剪区域，如(50, 150, 0, 65)]. Defaults to None.
+            x_percent (number, optional): [根据裁剪区域经度方向扩充百分比]. Defaults to 0.
+            y_percent (number, optional): [根据裁剪区域纬度方向扩充百分比]. Defaults to 0.
+
+        Returns:
+            [list]: [与keys对应的stda列表，不存在的为None]
+        """
+        path = self.store_path(data_name, var_name, level_type)
+        if not os.path.exists(path):
+            return [None] * len(keys)
+        keys = [_record_key(_l if _l is not None else np.nan, _t, _d, level_type) for _l, _t, _d in keys]
+        with self._lock:
+            ds, index = self._open(path, level_type)
+            if not all(_k in index for _k in keys):
+                # 可能已被其它进程写入
+                ds, index = self._open(path, level_type, reload=True)
+
+        records = [index[_k] for _k in keys if _k in index]
+        if len(records) == 0:
+            return [None] * len(keys)
+        # 先按索引选取记录及裁剪区域，再读取数据
+        sub = utl.area_cut(ds.isel(record=records), extent, x_percent, y_percent).load()
+        legacy = 'record_attrs' not in sub
+        if legacy:
+            attrs = json.loads(ds['data'].attrs.get('stda_attrs', '{}'))
+
+        result = []
+        i = 0
+        for key in keys:
+            if key not in index:
+                result.append(None)
+                continue
+            field = sub.isel(record=i)
+            level = field['record_level'].values
+            if not legacy:
+                # 层次按写入时的数据类型返回(如int的500而不是500.0)，与netcdf缓存一致
+                level = level.astype(np.dtype(str(field['record_level_dtype'].values)))
+                attrs = json.loads(str(field['record_attrs'].values))
+            data = field['data'].expand_dims(level=level.reshape(1),
+                                             time=[field['record_time'].values],
+                                             dtime=[int(field['record_dtime'].values)])
+            data = data.drop_vars([_c for _c in data.coords if _c.startswith('record')])
+            data = data.transpose('member', 'level', 'time', 'dtime', 'lat', 'lon')
+            data.name = var_name
+            data.attrs = dict(attrs)
+            result.append(data)
+            i += 1
+        return result
+
+    def clear(self):
+        """[清空进程内已打开的存储]
+        """
+        with self._lock:
+            self._stores.clear()
+
+
+# 进程内默认的存储实例
+custom_store = CustomZarrStore()
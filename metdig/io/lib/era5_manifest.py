@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+"""
+ERA5本地缓存文件清单(SQLite，get_cache_dir()/ERA5_DATA/manifest.sqlite)：
+记录每个缓存文件的时间(世界时)、要素、层次及区域，拆分写入缓存时登记，
+查询覆盖指定区域的缓存文件时直接按索引查询，无需逐目录listdir及正则解析文件名。
+清单建立前已存在的、或未经登记直接放入的缓存文件，在查询时按目录修改时间判断是否需要重新扫描并登记。
+"""
+
+import os
+import re
+import sqlite3
+import threading
+
+import logging
+_log = logging.getLogger(__name__)
+
+_SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS files (
+        path TEXT PRIMARY KEY,
+        time TEXT NOT NULL,
+        var_name TEXT NOT NULL,
+        level TEXT NOT NULL,
+        lon0 REAL NOT NULL,
+        lon1 REAL NOT NULL,
+        lat0 REAL NOT NULL,
+        lat1 REAL NOT NULL)''',
+    'CREATE INDEX IF NOT EXISTS files_key ON files (var_name, level, time)',
+    # 记录目录扫描时的修改时间(纳秒)，目录内文件增删后修改时间变化，下次查询时重新扫描
+    'CREATE TABLE IF NOT EXISTS scanned_dir_mtimes (path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL)',
+    # 旧版本清单只记录了目录是否扫描过
+    'DROP TABLE IF EXISTS scanned_dirs',
+)
+
+
+def _time_str(init_time):
+    return '{:%Y%m%d%H%M}'.format(init_time)
+
+
+def _level_str(level):
+    # 与get_era5cache_file一致，level为None或0时为地面层
+    return str(level) if level else ''
+
+
+def _parse_extent(name, time_str):
+    # 如name = '202007250800_28_180_-7_77.nc'，返回(28., 180., -7., 77.)
+    stem = os.path.splitext(name)[0]
+    if not stem.startswith(time_str + '_'):
+        return None
+    file_extent = re.findall(r"\-?\d+\.?\d*", stem)
+    if len(file_extent) != 5:
+        return None
+    return tuple(float(_v) for _v in file_extent[1:])
+
+
+class Era5CacheManifest(object):
+    '''
+    ERA5本地缓存文件清单
+    '''
+
+    def __init__(self, manifest_file=None):
+        """[初始化]
+
+        Args:
+            manifest_file ([str], optional): [清单文件路径，默认为get_cache_dir()/ERA5_DATA/manifest.sqlite]. Defaults to None.
+        """
+        self._manifest_file = manifest_file
+        self._conns = {}
+        self._lock = threading.Lock()
+
+    @property
+    def manifest_file(self):
+        if self._manifest_file is None:
+            from metdig.io.lib import config as CONFIG
+            return os.path.join(CONFIG.get_cache_dir(), 'ERA5_DATA', 'manifest.sqlite')
+        return self._manifest_file
+
+    def _connect(self):
+        # 缓存目录可通过config_init修改，按清单文件路径分别保存连接；
+        # sqlite连接不能跨fork使用(如常驻绘图进程池的子进程)，同时按进程号区分
+        manifest_file = str(self.manifest_file)
+        conn_key = (os.getpid(), manifest_file)
+        conn = self._conns.get(conn_key)
+        if conn is None:
+            os.makedirs(os.path.dirname(manifest_file), exist_ok=True)
+            conn = sqlite3.connect(manifest_file, timeout=30, check_same_thread=False)
+            try:
+                conn.execute('PRAGMA journal_mode=WAL')
+            except sqlite3.DatabaseError:
+                pass
+            with conn:
+                for sql in _SCHEMA:
+                    conn.execute(sql)
+            self._conns[conn_key] = conn
+        return conn
+
+    def add(self, cache_file, init_time, var_name, extent, level=None):
+        """[登记缓存文件]
+
+        Args:
+            cache_file ([str]): [缓存文件路径]
+            init_time ([datetime]): [世界时时间]
+            var_name ([str]): [stda要素名]
+            extent ([tuple]): [文件数据区域]
+            level ([int], optional): [层次]. Defaults to None.
+        """
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                 (str(cache_file), _time_str(init_time), var_name, _level_str(level),
+                                  float(extent[0]), float(extent[1]), float(extent[2]), float(extent[3])))
+        except Exception as e:
+            _log.info('era5 manifest add {} failed: {}'.format(cache_file, e))
+
+    def _scan_dir(self, conn, cache_dir, init_time, var_name, level):
+        # 登记未经add登记的缓存文件，目录修改时间与上次扫描时一致则跳过
+        cache_dir = str(cache_dir)
+        if not os.path.isdir(cache_dir):
+            return
+        try:
+            mtime_ns = os.stat(cache_dir).st_mtime_ns
+        except OSError:
+            return
+        row = conn.execute('SELECT mtime_ns FROM scanned_dir_mtimes WHERE path = ?', (cache_dir,)).fetchone()
+        if row is not None and row[0] == mtime_ns:
+            return
+        time_str = _time_str(init_time)
+        rows = []
+        for name in os.listdir(cache_dir):
+            if not name.endswith('.nc'):
+                continue
+            file_extent = _parse_extent(name, time_str)
+            if file_extent is None:
+                continue
+            rows.append((os.path.join(cache_dir, name), time_str, var_name, _level_str(level)) + file_extent)
+        with conn:
+            conn.executemany('INSERT OR IGNORE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            conn.execute('INSERT OR REPLACE INTO scanned_dir_mtimes VALUES (?, ?)', (cache_dir, mtime_ns))
+
+    def find(self, cache_dir, init_time, var_name, extent, level=None):
+        """[查询覆盖指定区域的缓存文件，存在多个时返回区域最小的文件]
+
+        Args:
+            cache_dir ([str]): [该时次、要素、层次对应的缓存目录]
+            init_time ([datetime]): [世界时时间]
+            var_name ([str]): [stda要素名]
+            extent ([tuple]): [数据区域]
+            level ([int], optional): [层次]. Defaults to None.
+
+        Returns:
+            [str]: [缓存文件路径，不存在返回None]
+        """
+        try:
+            with self._lock:
+                conn = self._connect()
+                self._scan_dir(conn, cache_dir, init_time, var_name, level)
+                rows = conn.execute(
+                    '''SELECT path FROM files
+                       WHERE var_name = ? AND level = ? AND time = ?
+                       AND lon0 <= ? AND lon1 >= ? AND lat0 <= ? AND lat1 >= ?
+                       ORDER BY (lon1 - lon0) * (lat1 - lat0)''',
+                    (var_name, _level_str(level), _time_str(init_time),
+                     float(extent[0]), float(extent[1]), float(extent[2]), float(extent[3]))).fetchall()
+                for (path,) in rows:
+                    if os.path.exists(path):
+                        return path
+                    # 文件已被手动清理
+                    with conn:
+                        conn.execute('DELETE FROM files WHERE path = ?', (path,))
+        except Exception as e:
+            _log.info('era5 manifest query failed: {}'.format(e))
+        return None
+
+    def clear(self):
+        """[清空清单，下次查询时重新扫描缓存目录]
+        """
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute('DELETE FROM files')
+                conn.execute('DELETE FROM scanned_dir_mtimes')
+
+
+# 进程内默认的清单实例
+era5_manifest = Era5CacheManifest()
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+
+"""
+ERA5本地缓存的zarr存储后端（config.ini中[CACHE] ERA5_CACHE_BACKEND = zarr时启用）：
+每个(要素, 层次, 区域)对应一个zarr存储，time为追加维，目录结构为
+    get_cache_dir()/ERA5_DATA/ZARR/{var_name}/{level或sfc}/{lon0}_{lon1}_{lat0}_{lat1}.zarr
+拆分下载数据时按时间追加写入，多年逐时数据的读取为少量连续chunk读取，无需逐个打开小文件。
+依赖zarr库，仅在使用该后端时导入。
+"""
+
+import os
+import re
+import datetime
+import threading
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+import logging
+_log = logging.getLogger(__name__)
+
+_TIME_UNITS = 'minutes since 1900-01-01 00:00:00'
+
+
+def _level_dir(level):
+    # 与get_era5cache_file一致，level为None或0时为地面层
+    return str(level) if level else 'sfc'
+
+
+def _extent_from_name(name):
+    # 如name = '28_180_-7_77.zarr'，返回(28., 180., -7., 77.)
+    file_extent = re.findall(r"\-?\d+\.?\d*", os.path.splitext(name)[0])
+    if len(file_extent) != 4:
+        return None
+    return tuple(float(_v) for _v in file_extent)
+
+
+def _covers(file_extent, extent):
+    return (file_extent[0] <= extent[0] and file_extent[1] >= extent[1] and
+            file_extent[2] <= extent[2] and file_extent[3] >= extent[3])
+
+
+def _store_stamp(path):
+    # 存储目录及其consolidated元数据(zarr v2为.zmetadata，v3为zarr.json)的修改时间，追加写入后会变化
+    stamp = [os.stat(path).st_mtime_ns]
+    for name in ('.zmetadata', 'zarr.json'):
+        try:
+            stamp.append(os.stat(os.path.join(path, name)).st_mtime_ns)
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def _to_datetime64(times):
+    return pd.DatetimeIndex(pd.to_datetime(list(times))).values.astype('datetime64[ns]')
+
+
+class Era5ZarrStore(object):
+    '''
+    ERA5本地缓存zarr存储
+    '''
+
+    def __init__(self, store_dir=None, chunk_time=24):
+        """[初始化]
+
+        Args:
+            store_dir ([str], optional): [存储目录，默认为get_cache_dir()/ERA5_DATA/ZARR]. Defaults to None.
+            chunk_time (int, optional): [新建存储时time维的chunk大小]. Defaults to 24.
+        """
+        self._store_dir = store_dir
+        self.chunk_time = chunk_time
+        self._stores = {}
+        self._lock = threading.RLock()
+
+    @property
+    def store_dir(self):
+        if self._store_dir is None:
+            from metdig.io.lib import config as CONFIG
+            return os.path.join(CONFIG.get_cache_dir(), 'ERA5_DATA', 'ZARR')
+        return self._store_dir
+
+    def store_path(self, var_name, extent, level=None):
+        """[获取(要素, 层次, 区域)对应的zarr存储路径]
+
+        Args:
+            var_name ([str]): [stda要素名]
+            extent ([tuple]): [数据区域]
+            level ([int], optional): [层次]. Defaults to None.
+
+        Returns:
+            [str]: [zarr存储路径]
+        """
+        return os.path.join(self.store_dir, var_name, _level_dir(level),
+                            '{}_{}_{}_{}.zarr'.format(extent[0], extent[1], extent[2], extent[3]))
+
+    def _open(self, path, reload=False):
+        # 返回(dataset, time索引)，进程内缓存已打开的存储；
+        # reload为True时仅在存储修改时间与打开时不一致(如被其它进程追加写入)时重新打开
+        item = self._stores.get(path)
+        if item is not None and reload:
+            if _store_stamp(path) == item[2]:
+                return item[:2]
+            item = None
+        if item is None:
+            stamp = _store_stamp(path)
+            ds = xr.open_zarr(path)
+            item = (ds, pd.DatetimeIndex(ds['time'].values), stamp)
+            self._stores[path] = item
+        return item[:2]
+
+    def _candidates(self, var_name, extent, level):
+        # 覆盖该区域的存储，按区域从小到大排列
+        level_dir = os.path.join(self.store_dir, var_name, _level_dir(level))
+        if not os.path.isdir(level_dir):
+            return []
+        paths = []
+        for name in os.listdir(level_dir):
+            file_extent = _extent_from_name(name)
+            if name.endswith('.zarr') and file_extent is not None and _covers(file_extent, extent):
+                paths.append(((file_extent[1] - file_extent[0]) * (file_extent[3] - file_extent[2]), os.path.join(level_dir, name)))
+        return [_p for _, _p in sorted(paths)]
+
+    def _locate(self, times, var_name, extent, level):
+        # 返回包含times中最多时次的存储(path, dataset, 存在的时次)
+        times = pd.DatetimeIndex(_to_datetime64(times))
+        best = (None, None, times[:0])
+        with self._lock:
+            for path in self._candidates(var_name, extent, level):
+                try:
+                    ds, index = self._open(path)
+                    if not times.isin(index).all():
+                        # 可能已被其它进程追加写入
+                        ds, index = self._open(path, reload=True)
+                except Exception as e:
+                    _log.info('era5 zarr store {} broken: {}'.format(path, e))
+                    continue
+                found = times[times.isin(index)]
+                if len(found) > len(best[2]):
+                    best = (path, ds, found)
+                if len(found) == len(times):
+                    break
+        return best
+
+    def contains(self, init_time, var_name, extent, level=None):
+        """[判断存储中是否存在覆盖该区域的某时次数据]
+
+        Args:
+            init_time ([datetime]): [世界时时间]
+            var_name ([str]): [stda要素名]
+            extent ([tuple]): [数据区域]
+            level ([int], optional): [层次]. Defaults to None.
+
+        Returns:
+            [bool]: [True/False]
+        """
+        return len(self._locate([init_time], var_name, extent, level)[2]) > 0
+
+    def read(self, init_time, var_name, extent, level=None):
+        """[读取单时次数据]
+
+        Args:
+            init_time ([datetime]): [世界时时间]
+            var_name ([str]): [stda要素名]
+            extent ([tuple]): [数据区域]
+            level ([int], optional): [层次]. Defaults to None.
+
+        Returns:
+            [xr.DataArray]: [维度为(latitude, longitude)，不存在返回None]
+        """
+        data = self.read_times([init_time], var_name, extent, level=level)
+        if data is None:
+            return None
+        return data.isel(time=0)
+
+    def read_times(self, init_times, var_name, extent, level=None):
+        """[读取多时次数据，仅返回存在的时次]
+
+        Args:
+            init_times ([list]): [世界时时间列表]
+            var_name ([str]): [stda要素名]
+            extent ([tuple]): [数据区域]
+            level ([int], optional): [层次]. Defaults to None.
+
+        Returns:
+            [xr.DataArray]: [维度为(time, latitude, longitude)，均不存在返回None]
+        """
+        path, ds, found = self._locate(init_times, var_name, extent, level)
+        if path is None:
+            return None
+        return ds['data'].sel(time=found.values).load()
+
+    def append(self, data, var_name, extent, level=None):
+        """[追加写入数据，已存在的时次不重复写入]
+
+        Args:
+            data ([xr.DataArray]): [维度包含time(可为标量坐标), latitude, longitude]
+            var_name ([str]): [stda要素名]
+            extent ([tuple]): [数据区域]
+            level ([int], optional): [层次]. Defaults to None.
+
+        Returns:
+            [int]: [写入的时次数]
+        """
+        if 'time' not in data.dims:
+            data = data.expand_dims('time')
+        data = data.transpose('time', 'latitude', 'longitude').reset_coords(drop=True)
+        path = self.store_path(var_name, extent, level=level)
+        with self._lock:
+            exists = os.path.exists(path)
+            if exists:
+                _, index = self._open(path, reload=True)
+                data = data.isel(time=np.flatnonzero(~pd.DatetimeIndex(data['time'].values).isin(index)))
+            if data.sizes['time'] == 0:
+                return 0
+            # 不沿用原始netcdf的压缩编码(scale_factor等)，各次下载的编码可能不同
+            data = data.astype(np.float32)
+            data.encoding = {}
+            ds = data.to_dataset(name='data')
+            ds['time'].encoding = {}
+            if exists:
+                ds.to_zarr(path, mode='a', append_dim='time')
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                encoding = {'data': {'chunks': (self.chunk_time, ds.sizes['latitude'], ds.sizes['longitude'])},
+                            'time': {'units': _TIME_UNITS, 'dtype': 'int64'}}
+                ds.to_zarr(path, mode='w', encoding=encoding)
+            self._stores.pop(path, None)
+        _log.debug('era5 zarr store {} append {} times'.format(path, ds.sizes['time']))
+        return ds.sizes['time']
+
+    def import_netcdf_cache(self, cache_dir=None, var_names=None, remove_netcdf=False, batch_size=240):
+        """[将按时次/层次拆分的netcdf缓存文件导入zarr存储]
+
+        Args:
+            cache_dir ([str], optional): [netcdf缓存目录，默认为get_cache_dir()/ERA5_DATA]. Defaults to None.
+            var_names ([list], optional): [需要导入的stda要素名，默认全部]. Defaults to None.
+            remove_netcdf (bool, optional): [导入后是否删除netcdf缓存文件]. Defaults to False.
+            batch_size (int, optional): [每次追加写入的时次数]. Defaults to 240.
+
+        Returns:
+            [int]: [导入的netcdf文件数]
+        """
+        if cache_dir is None:
+            from metdig.io.lib import config as CONFIG
+            cache_dir = os.path.join(CONFIG.get_cache_dir(), 'ERA5_DATA')
+
+        # 按(要素, 层次, 区域)归类，缓存目录结构为{time}/hourly/{var_name}/[{level}/]{time}_{extent}.nc
+        groups = {}
+        for time_name in sorted(os.listdir(cache_dir)):
+            hourly_dir = os.path.join(cache_dir, time_name, 'hourly')
+            if not re.fullmatch(r'\d{12}', time_name) or not os.path.isdir(hourly_dir):
+                continue
+            init_time = datetime.datetime.strptime(time_name, '%Y%m%d%H%M')
+            for var_name in os.listdir(hourly_dir):
+                if var_names is not None and var_name not in var_names:
+                    continue
+                var_dir = os.path.join(hourly_dir, var_name)
+                for name in os.listdir(var_dir):
+                    sub = os.path.join(var_dir, name)
+                    if os.path.isdir(sub):
+                        files = [(int(name) if name.isdigit() else name, os.path.join(sub, _f)) for _f in os.listdir(sub)]
+                    else:
+                        files = [(None, sub)]
+                    for level, f in files:
+                        if not f.endswith('.nc'):
+                            continue
+                        file_extent = _extent_from_name(os.path.basename(f)[len(time_name) + 1:])
+                        if file_extent is None:
+                            continue
+                        file_extent = tuple(int(_v) if _v.is_integer() else _v for _v in file_extent)
+                        groups.setdefault((var_name, level, file_extent), []).append((init_time, f))
+
+        count = 0
+        for (var_name, level, file_extent), items in groups.items():
+            items.sort()
+            for i in range(0, len(items), batch_size):
+                batch = items[i:i + batch_size]
+                datas = []
+                for init_time, f in batch:
+                    with xr.open_dataarray(f) as data:
+                        data = data.load()
+                    if 'time' not in data.dims:
+                        data = data.expand_dims('time')
+                    datas.append(data.assign_coords(time=[np.datetime64(init_time, 'ns')]).reset_coords(drop=True))
+                self.append(xr.concat(datas, dim='time'), var_name, file_extent, level=level)
+                count += len(batch)
+                if remove_netcdf:
+                    for _, f in batch:
+                        os.remove(f)
+                _log.info('era5 zarr store import {} {} {}: {}/{}'.format(var_name, level, file_extent, i + len(batch), len(items)))
+        return count
+
+    def clear(self):
+        """[清空进程内已打开的存储]
+        """
+        with self._lock:
+            self._stores.clear()
+
+
+# 进程内默认的存储实例
+era5_store = Era5ZarrStore()
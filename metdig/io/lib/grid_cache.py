@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+
+"""
+已解码网格stda数据的缓存：
+1. GridMemoryCache: 进程内按字节预算的LRU缓存，默认返回可写副本，可选返回共享的只读视图
+2. GridDiskCache: 本地磁盘缓存
+
+缓存键由(data_source, 读取参数)计算md5得到，每个缓存项为一个目录：
+    values.npy  -- stda数值，读取时以mmap方式映射
+    coords.npz  -- (member, level, time, dtime, lat, lon)维度数据
+    attrs.json  -- stda属性
+磁盘缓存总大小超过上限时，按最近使用时间(目录mtime)淘汰最久未使用的缓存项。
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import datetime
+import threading
+import collections
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from metdig.io.lib import config as CONFIG
+
+import logging
+_log = logging.getLogger(__name__)
+
+_STDA_DIMS = ('member', 'level', 'time', 'dtime', 'lat', 'lon')
+
+
+def _get_default_max_bytes():
+    # 可在config.ini的[CACHE]中配置GRID_CACHE_SIZE（单位MB），默认2048MB
+    if CONFIG.CONFIG.has_option('CACHE', 'GRID_CACHE_SIZE'):
+        return int(float(CONFIG.CONFIG['CACHE']['GRID_CACHE_SIZE']) * 1024 * 1024)
+    return 2048 * 1024 * 1024
+
+
+def _get_default_memory_max_bytes():
+    # 可在config.ini的[CACHE]中配置MEMORY_CACHE_SIZE（单位MB），默认1024MB
+    if CONFIG.CONFIG.has_option('CACHE', 'MEMORY_CACHE_SIZE'):
+        return int(float(CONFIG.CONFIG['CACHE']['MEMORY_CACHE_SIZE']) * 1024 * 1024)
+    return 1024 * 1024 * 1024
+
+
+def _key_value_tostr(value):
+    if isinstance(value, datetime.datetime):
+        return '{:%Y%m%d%H%M%S}'.format(value)
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return '[' + ','.join([_key_value_tostr(v) for v in value]) + ']'
+    if isinstance(value, dict):
+        return '{' + ','.join(['{}:{}'.format(k, _key_value_tostr(value[k])) for k in sorted(value.keys())]) + '}'
+    if isinstance(value, (float, np.floating)):
+        return repr(float(value))
+    if isinstance(value, np.integer):
+        return str(int(value))
+    return str(value)
+
+
+def make_key(data_source, **kwargs):
+    """[根据数据源及读取参数生成缓存键]
+
+    Args:
+        data_source ([str]): [数据源]
+        **kwargs {[type]} -- [读取函数的kwargs，如init_time, fhour, data_name, var_name, level, extent, x_percent, y_percent]
+
+    Returns:
+        [str]: [md5缓存键]
+    """
+    kwargs = dict(kwargs)
+    kwargs['data_source'] = data_source
+    return hashlib.md5(_key_value_tostr(kwargs).encode('utf-8')).hexdigest()
+
+
+def _readonly_view(data):
+    # 网格stda返回共享内存的只读视图，站点stda(pd.DataFrame)体积小且其方法会原地修改，返回深拷贝
+    if isinstance(data, xr.DataArray):
+        values = data.values.view()
+        values.flags.writeable = False
+        return data.copy(deep=False, data=values)
+    return data.copy(deep=True)
+
+
+def _private_copy(data):
+    # 缓存及默认返回值使用独立副本，调用方原地修改不会影响缓存
+    return data.copy(deep=True)
+
+
+def _nbytes(data):
+    if isinstance(data, pd.DataFrame):
+        return int(data.memory_usage(deep=True).sum())
+    return int(data.nbytes)
+
+
+class GridMemoryCache(object):
+    '''
+    进程内stda数据缓存（按字节预算的LRU淘汰），命中时默认返回可写副本，readonly=True时返回只读视图
+    '''
+
+    def __init__(self, max_bytes=None):
+        """[初始化]
+
+        Args:
+            max_bytes ([int], optional): [缓存总大小上限(字节)，默认读取config.ini中[CACHE] MEMORY_CACHE_SIZE，未配置则为1024MB]. Defaults to None.
+        """
+        self.max_bytes = max_bytes if max_bytes is not None else _get_default_memory_max_bytes()
+        self.enabled = True
+        self._items = collections.OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, readonly=False):
+        """[读取缓存，不存在返回None]
+
+        Args:
+            key ([str]): [缓存键]
+            readonly (bool, optional): [是否返回与缓存共享内存的只读视图(不复制)，为False时返回可写副本]. Defaults to False.
+
+        Returns:
+            [stda]: [stda数据]
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            self._items.move_to_end(key)
+        if readonly:
+            return _readonly_view(item[0])
+        return _private_copy(item[0])
+
+    def put(self, key, data, readonly=False):
+        """[写入缓存，缓存中保存数据的副本]
+
+        Args:
+            key ([str]): [缓存键]
+            data ([stda]): [stda数据]
+            readonly (bool, optional): [是否返回与缓存共享内存的只读视图，为False时返回data本身]. Defaults to False.
+
+        Returns:
+            [stda]: [stda数据]
+        """
+        if not self.enabled or data is None:
+            return data
+        nbytes = _nbytes(data)
+        if nbytes > self.max_bytes:
+            return data
+        stored = _private_copy(data)
+        if isinstance(stored, xr.DataArray):
+            stored = _readonly_view(stored)
+        with self._lock:
+            if key in self._items:
+                self._nbytes -= self._items.pop(key)[1]
+            self._items[key] = (stored, nbytes)
+            self._nbytes += nbytes
+            while self._nbytes > self.max_bytes and self._items:
+                _, (_, _nb) = self._items.popitem(last=False)
+                self._nbytes -= _nb
+        if readonly:
+            return _readonly_view(stored)
+        return data
+
+    def clear(self):
+        """[清空缓存]
+        """
+        with self._lock:
+            self._items.clear()
+            self._nbytes = 0
+
+
+class GridDiskCache(object):
+    '''
+    已解码网格stda数据的本地磁盘缓存（按大小限制的LRU淘汰）
+    '''
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        """[初始化]
+
+        Args:
+            cache_dir ([str], optional): [缓存目录，默认为get_cache_dir()/GRID_DATA]. Defaults to None.
+            max_bytes ([int], optional): [缓存总大小上限(字节)，默认读取config.ini中[CACHE] GRID_CACHE_SIZE，未配置则为2048MB]. Defaults to None.
+        """
+        self._cache_dir = cache_dir
+        self.max_bytes = max_bytes if max_bytes is not None else _get_default_max_bytes()
+        self.enabled = True
+        self._lock = threading.Lock()
+        # 缓存总大小，首次写入时扫描一次缓存目录得到，之后随写入累加，超过上限时重新扫描并淘汰
+        self._total = None
+        self._total_dir = None
+
+    @property
+    def cache_dir(self):
+        if self._cache_dir is None:
+            return os.path.join(CONFIG.get_cache_dir(), 'GRID_DATA')
+        return self._cache_dir
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    @staticmethod
+    def _dir_size(path):
+        try:
+            return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        except OSError:
+            return 0
+
+    def _scan(self, cache_dir):
+        # 返回[(最近使用时间, 大小, 缓存项目录)]及总大小
+        entries = []
+        total = 0
+        if not os.path.exists(cache_dir):
+            return entries, total
+        for sub in os.listdir(cache_dir):
+            sub_dir = os.path.join(cache_dir, sub)
+            if not os.path.isdir(sub_dir):
+                continue
+            for name in os.listdir(sub_dir):
+                if name.endswith('.tmp'):
+                    continue
+                entry_dir = os.path.join(sub_dir, name)
+                try:
+                    size = sum(os.path.getsize(os.path.join(entry_dir, f)) for f in os.listdir(entry_dir))
+                    mtime = os.path.getmtime(entry_dir)
+                except OSError:
+                    continue
+                entries.append((mtime, size, entry_dir))
+                total += size
+        return entries, total
+
+    def get(self, key):
+        """[读取缓存，不存在或读取失败返回None]
+
+        Args:
+            key ([str]): [缓存键]
+
+        Returns:
+            [stda]: [stda格式数据，数据以copy-on-write方式映射，修改不会写回缓存文件]
+        """
+        if not self.enabled:
+            return None
+        entry_dir = self._entry_dir(key)
+        if not os.path.exists(entry_dir):
+            return None
+        try:
+            values = np.load(os.path.join(entry_dir, 'values.npy'), mmap_mode='c')
+            with np.load(os.path.join(entry_dir, 'coords.npz'), allow_pickle=False) as f:
+                coords = [(_d, f[_d]) for _d in _STDA_DIMS]
+            with open(os.path.join(entry_dir, 'attrs.json'), 'r', encoding='utf-8') as f:
+                attrs = json.load(f)
+        except Exception as e:
+            _log.info('grid cache {} broken, removed: {}'.format(entry_dir, e))
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+
+        # 更新最近使用时间
+        try:
+            os.utime(entry_dir, None)
+        except OSError:
+            pass
+
+        stda_data = xr.DataArray(values, coords=coords)
+        stda_data.attrs = attrs
+        return stda_data
+
+    def put(self, key, stda_data):
+        """[写入缓存，写入失败仅记录日志]
+
+        Args:
+            key ([str]): [缓存键]
+            stda_data ([stda]): [stda网格数据]
+        """
+        if not self.enabled or stda_data is None:
+            return
+        if tuple(stda_data.dims) != _STDA_DIMS:
+            return
+        if stda_data.nbytes > self.max_bytes:
+            return
+
+        entry_dir = self._entry_dir(key)
+        tmp_dir = '{}.{}.{}.tmp'.format(entry_dir, os.getpid(), threading.get_ident())
+        try:
+            os.makedirs(tmp_dir, exist_ok=True)
+            np.save(os.path.join(tmp_dir, 'values.npy'), np.ascontiguousarray(stda_data.values))
+            coords = {_d: np.asarray(stda_data[_d].values) for _d in _STDA_DIMS}
+            if coords['member'].dtype == object:
+                coords['member'] = coords['member'].astype(str)
+            np.savez(os.path.join(tmp_dir, 'coords.npz'), **coords)
+            with open(os.path.join(tmp_dir, 'attrs.json'), 'w', encoding='utf-8') as f:
+                json.dump(stda_data.attrs, f, ensure_ascii=False, default=str)
+            size = self._dir_size(tmp_dir)
+            old_size = 0
+            if os.path.exists(entry_dir):
+                old_size = self._dir_size(entry_dir)
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+        except Exception as e:
+            _log.info('grid cache write {} failed: {}'.format(entry_dir, e))
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+
+        with self._lock:
+            cache_dir = self.cache_dir
+            if self._total is None or self._total_dir != cache_dir:
+                # 首次写入(或缓存目录已修改)时扫描一次，已包含本次写入
+                self._total = self._scan(cache_dir)[1]
+                self._total_dir = cache_dir
+            else:
+                self._total += size - old_size
+            if self._total <= self.max_bytes:
+                return
+        self.evict()
+
+    def evict(self):
+        """[缓存总大小超过max_bytes时，淘汰最久未使用的缓存项至max_bytes的90%，同时校正记录的缓存总大小]
+        """
+        with self._lock:
+            cache_dir = self.cache_dir
+            entries, total = self._scan(cache_dir)
+            if total > self.max_bytes:
+                # 淘汰到上限的90%，避免缓存写满后每次写入都重新扫描
+                low_water = self.max_bytes * 0.9
+                entries.sort()
+                for mtime, size, entry_dir in entries:
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                    _log.debug('grid cache evict {}'.format(entry_dir))
+                    total -= size
+                    if total <= low_water:
+                        break
+            self._total = total
+            self._total_dir = cache_dir
+
+    def clear(self):
+        """[清空缓存目录]
+        """
+        with self._lock:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self._total = None
+
+
+# 进程内默认的缓存实例
+memory_cache = GridMemoryCache()
+disk_cache = GridDiskCache()
@@ -9,6 +9,14 @@ import threading
 from metpy.units import units
 
 
+def build_cfg_index(cfg, keys):
+    # 按keys列建立配置表索引{(keys列的值): [行字典]}，行字典与DataFrame.to_dict一致，同一键的多行保持表中顺序
+    index = {}
+    for row in cfg.to_dict('records'):
+        index.setdefault(tuple(row[_k] for _k in keys), []).append(row)
+    return index
+
+
 def check_units(var_units):
     try:
         units(var_units)
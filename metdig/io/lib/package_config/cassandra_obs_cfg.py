@@ -5,7 +5,7 @@ import pandas as pd
 
 import numpy as np
 
-from metdig.io.lib.package_config.base import check_units, SingletonMetaClass
+from metdig.io.lib.package_config.base import check_units, build_cfg_index, SingletonMetaClass
 
 
 class cassandra_obs_cfg(metaclass=SingletonMetaClass):
@@ -14,22 +14,21 @@ class cassandra_obs_cfg(metaclass=SingletonMetaClass):
         self.obs_cfg = pd.read_csv(self.obs_cfg_csv, encoding='gbk', comment='#')
         self.obs_cfg = self.obs_cfg.fillna('')
         self.obs_cfg.apply(lambda row: check_units(row['var_units']), axis=1)  # 检查是否满足units格式
+        self.obs_cfg_index = build_cfg_index(self.obs_cfg, ['data_name', 'var_name'])
 
     def obs_cassandra_dir(self, data_name=None, var_name=None):
-        _obs_cfg = self.obs_cfg[(self.obs_cfg['data_name'] == data_name) &
-                                (self.obs_cfg['var_name'] == var_name)].copy(deep=True)
+        _obs_cfg = self.obs_cfg_index.get((data_name, var_name), [])
 
         if len(_obs_cfg) == 0:
             raise Exception('can not get data_name = {} var_name={} in {}!'.format(data_name, var_name, self.obs_cfg_csv))
 
-        return _obs_cfg['cassandra_path'].values[0]
+        return _obs_cfg[0]['cassandra_path']
 
     def obs_cassandra_units(self, data_name=None, var_name=None):
-        _obs_cfg = self.obs_cfg[(self.obs_cfg['data_name'] == data_name) &
-                                (self.obs_cfg['var_name'] == var_name)].copy(deep=True)
+        _obs_cfg = self.obs_cfg_index.get((data_name, var_name), [])
         if len(_obs_cfg) == 0:
             return ''
-        return _obs_cfg['var_units'].values[0]
+        return _obs_cfg[0]['var_units']
 
 
 if __name__ == '__main__':
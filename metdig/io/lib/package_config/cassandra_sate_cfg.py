@@ -5,7 +5,7 @@ import pandas as pd
 
 import numpy as np
 
-from metdig.io.lib.package_config.base import check_units, SingletonMetaClass
+from metdig.io.lib.package_config.base import check_units, build_cfg_index, SingletonMetaClass
 
 
 class cassandra_sate_cfg(metaclass=SingletonMetaClass):
@@ -15,14 +15,14 @@ class cassandra_sate_cfg(metaclass=SingletonMetaClass):
         self.sate_cfg = self.sate_cfg.fillna('')
         self.sate_cfg.apply(lambda row: check_units(row['var_units']), axis=1)  # 检查是否满足units格式
         self.sate_cfg['channel'] = self.sate_cfg.apply(lambda row: row['channel'].strip('/').split('/'), axis=1)
+        self.sate_cfg_index = build_cfg_index(self.sate_cfg, ['data_name', 'var_name'])
 
     def get_sate_cfg(self, data_name=None, var_name=None, channel=None):
-        this_cfg = self.sate_cfg[(self.sate_cfg['data_name'] == data_name) &
-                                 (self.sate_cfg['var_name'] == var_name)].copy(deep=True).reset_index(drop=True)
+        this_cfg = self.sate_cfg_index.get((data_name, var_name), [])
 
         # channel 是list
         index = -1
-        for idx, row in this_cfg.iterrows():
+        for idx, row in enumerate(this_cfg):
             if 'any' in row['channel'] or str(channel) in row['channel']:
                 index = idx
                 break
@@ -30,7 +30,7 @@ class cassandra_sate_cfg(metaclass=SingletonMetaClass):
         if index < 0:
             raise Exception('can not get data_name={} var_name={} channel={} in {}!'.format(data_name, var_name, channel, self.sate_cfg_csv))
 
-        return this_cfg.to_dict('index')[index]
+        return dict(this_cfg[index])
 
     def sate_cassandra_dir(self, data_name=None, var_name=None, channel=None):
         return self.get_sate_cfg(data_name=data_name, var_name=var_name, channel=channel)['cassandra_path']
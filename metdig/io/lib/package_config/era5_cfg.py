@@ -5,7 +5,7 @@ import pandas as pd
 
 import numpy as np
 
-from metdig.io.lib.package_config.base import check_units, SingletonMetaClass
+from metdig.io.lib.package_config.base import check_units, build_cfg_index, SingletonMetaClass
 
 
 class era5_cfg(metaclass=SingletonMetaClass):
@@ -14,15 +14,15 @@ class era5_cfg(metaclass=SingletonMetaClass):
         self.model_cfg = pd.read_csv(self.model_cfg_csv, encoding='gbk', comment='#')
         self.model_cfg = self.model_cfg.fillna('')
         self.model_cfg.apply(lambda row: check_units(row['var_units']), axis=1)  # 检查是否满足units格式
+        self.model_cfg_index = build_cfg_index(self.model_cfg, ['var_name', 'level_type'])
 
     def get_model_cfg(self, var_name=None, level_type=None):
-        this_cfg = self.model_cfg[(self.model_cfg['var_name'] == var_name) &
-                                  (self.model_cfg['level_type'] == level_type)].copy(deep=True).reset_index(drop=True)
+        this_cfg = self.model_cfg_index.get((var_name, level_type), [])
 
         if len(this_cfg) == 0:
             raise Exception('can not get level_type = {} var_name = {} in {}!'.format(level_type, var_name, self.model_cfg_csv))
 
-        return this_cfg.to_dict('index')[0]
+        return dict(this_cfg[0])
 
     def era5_variable(self, var_name=None, level_type=None):
         '''
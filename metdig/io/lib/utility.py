@@ -10,6 +10,7 @@ import numpy as np
 import pandas as pd
 
 import inspect
+from concurrent import futures
 
 import logging
 _log = logging.getLogger(__name__)
@@ -38,6 +39,34 @@ def parm_tolist(parm):
         return [parm] # 单项转
 
 
+def mult_thread_run(func, kwargs_all, max_workers=8):
+    '''
+
+    [多线程执行func，结果顺序与kwargs_all一致]
+
+    Arguments:
+        func {[function]} -- [执行函数]
+        kwargs_all {[list]} -- [每个任务的参数字典]
+
+    Keyword Arguments:
+        max_workers {number} -- [最大并发数，小于等于1时串行执行] (default: {8})
+
+    Returns:
+        [list] -- [(返回值, 异常)列表，成功时异常为None，失败时返回值为None]
+    '''
+    def _run(kwargs):
+        try:
+            return func(**kwargs), None
+        except Exception as e:
+            return None, e
+
+    if max_workers is None or max_workers <= 1 or len(kwargs_all) <= 1:
+        return [_run(kwargs) for kwargs in kwargs_all]
+
+    with futures.ThreadPoolExecutor(max_workers=min(max_workers, len(kwargs_all))) as executor:
+        return list(executor.map(_run, kwargs_all))
+
+
 def model_filename(initTime, fhour, UTC=False):
     """
         Construct model file name.
@@ -98,6 +127,46 @@ def reset_id_back(sta):
         sta["id"] = int_id
 
 
+def _is_monotonic_dim(data, dim):
+    # 判断dim是否为单调的一维维度坐标
+    if dim not in data.dims or dim not in data.coords or data[dim].ndim != 1:
+        return False
+    values = data[dim].values
+    if values.size < 2:
+        return True
+    diff = np.diff(values)
+    return bool(np.all(diff > 0) or np.all(diff < 0))
+
+
+def _coord_slice(values, vmin, vmax):
+    # 单调（升序或降序）坐标上[vmin, vmax]闭区间对应的slice
+    if values.size > 1 and values[0] > values[-1]:
+        n = values.size
+        reverse = values[::-1]
+        return slice(n - np.searchsorted(reverse, vmax, side='right'), n - np.searchsorted(reverse, vmin, side='left'))
+    return slice(np.searchsorted(values, vmin, side='left'), np.searchsorted(values, vmax, side='right'))
+
+
+def _lon_cut(data, lon_min, lon_max):
+    # 经度裁剪，区域超出数据经度范围且数据为全球时，按360度循环取数（如0~360的数据裁剪-30~30的区域）
+    lon = data['lon'].values
+    lon_lo, lon_hi = lon.min(), lon.max()
+    if lon_min >= lon_lo and lon_max <= lon_hi:
+        return data.isel(lon=_coord_slice(lon, lon_min, lon_max))
+
+    res = np.abs(lon[1] - lon[0]) if lon.size > 1 else 0
+    if lon.size < 2 or lon_hi - lon_lo + res * 1.5 < 360 or lon_max - lon_min >= 360:
+        return data.isel(lon=_coord_slice(lon, lon_min, lon_max))
+
+    lon_wrap = (lon - lon_min) % 360 + lon_min  # 转换到[lon_min, lon_min+360)
+    idx = np.nonzero(lon_wrap <= lon_max)[0]
+    idx = idx[np.argsort(lon_wrap[idx], kind='stable')]
+    _, uniq = np.unique(lon_wrap[idx], return_index=True)  # 去掉0与360这类重复经度
+    idx = idx[np.sort(uniq)]
+    data = data.isel(lon=idx)
+    return data.assign_coords(lon=lon_wrap[idx])
+
+
 def area_cut(data, extent, x_percent=0, y_percent=0):
     '''
     区域裁剪 
@@ -110,6 +179,10 @@ def area_cut(data, extent, x_percent=0, y_percent=0):
     cut_extent = (extent[0] - delt_x, extent[1] + delt_x, extent[2] - delt_y, extent[3] + delt_y)
 
     if isinstance(data, xr.DataArray) or isinstance(data, xr.Dataset):
+        if _is_monotonic_dim(data, 'lon') and _is_monotonic_dim(data, 'lat'):
+            # 经纬度为单调的一维坐标，直接按索引切片，避免生成全场的mask及其拷贝
+            data = data.isel(lat=_coord_slice(data['lat'].values, cut_extent[2], cut_extent[3]))
+            return _lon_cut(data, cut_extent[0], cut_extent[1])
         return data.where((data['lon'] >= cut_extent[0]) &
                           (data['lon'] <= cut_extent[1]) &
                           (data['lat'] >= cut_extent[2]) &
@@ -122,6 +195,34 @@ def area_cut(data, extent, x_percent=0, y_percent=0):
                     (data['lat'] < cut_extent[3])]
 
 
+def _neighbour_index(values, points_values):
+    # 单调坐标上每个站点坐标两侧相邻格点的序号（升序、去重），站点恰好位于格点上时也保留两侧格点
+    n = values.size
+    descending = n > 1 and values[0] > values[-1]
+    coord = values[::-1] if descending else values
+    idx = np.searchsorted(coord, np.asarray(points_values, dtype=float).ravel())
+    idx = np.unique(np.concatenate([idx - 1, idx, idx + 1]))
+    idx = idx[(idx >= 0) & (idx < n)]
+    if descending:
+        idx = np.sort(n - 1 - idx)
+    return idx
+
+
+def points_cut(data, points):
+    '''
+    站点裁剪，仅保留站点线性插值所需的相邻经纬度行列，插值到站点的结果与全场插值一致
+    '''
+    if points is None:
+        return data
+    if not (_is_monotonic_dim(data, 'lon') and _is_monotonic_dim(data, 'lat')):
+        return data
+    lat_idx = _neighbour_index(data['lat'].values, points['lat'])
+    lon_idx = _neighbour_index(data['lon'].values, points['lon'])
+    if lat_idx.size == 0 or lon_idx.size == 0:
+        return data
+    return data.isel(lat=lat_idx, lon=lon_idx)
+
+
 def sta_select_id(df, id_selected):
     '''
     从df.index中筛选id_selected
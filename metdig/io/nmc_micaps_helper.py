@@ -6,7 +6,10 @@ nmc_met_io.retrieve_micaps_server的拓展方法，后续若nmc_met_io有相同
 
 import json
 import time
+import bisect
 import datetime
+import threading
+import collections
 import numpy as np
 import xarray as xr
 import pandas as pd
@@ -18,6 +21,114 @@ import nmc_met_io.config as CONFIG
 from nmc_met_io import DataBlock_pb2
 from nmc_met_io.retrieve_micaps_server import GDSDataService
 
+import logging
+_log = logging.getLogger(__name__)
+
+
+class ObsFileIndex(object):
+    '''
+    实况目录文件列表缓存：目录下的文件名按日期解析后升序保存，ttl秒内同一目录不重复获取文件列表，
+    最近时次及时间范围的查询为有序日期上的二分查找，超过max_size个目录时淘汰最久未使用的目录
+    '''
+
+    def __init__(self, max_size=64, ttl=60):
+        """[初始化]
+
+        Args:
+            max_size (int, optional): [最多保留的目录个数]. Defaults to 64.
+            ttl (int, optional): [文件列表有效期(秒)]. Defaults to 60.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, directory, filename_format):
+        """[获取目录下按日期升序排列的文件日期及文件名]
+
+        Args:
+            directory ([str]): [cassandra中的目录，如：RADARMOSAIC/CREF/]
+            filename_format ([str]): [cassandra中的文件名，必须带日期格式化的字符串，如：ACHN_CREF_%Y%m%d_%H%M%S.BIN]
+
+        Returns:
+            [tuple]: [(日期列表, 文件名列表)]
+        """
+        key = (directory, filename_format)
+        now = time.time()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and now - item[0] < self.ttl:
+                self._items.move_to_end(key)
+                return item[1], item[2]
+
+        fnames = nmc_micaps_io.get_file_list(directory)  # 目录下所有文件名
+        if fnames is None or len(fnames) == 0:
+            raise Exception('Can not retrieve data from ' + directory)
+        items = []
+        for fname in fnames:
+            try:
+                items.append((datetime.datetime.strptime(fname, filename_format), fname))
+            except ValueError:
+                _log.debug('{}{} does not match {}'.format(directory, fname, filename_format))
+        if len(items) == 0:
+            raise Exception('Can not retrieve data from ' + directory)
+        items.sort()
+        times = [_t for _t, _ in items]
+        fnames = [_f for _, _f in items]
+
+        with self._lock:
+            self._items[key] = (now, times, fnames)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+        return times, fnames
+
+    def nearest(self, directory, filename_format, obs_time):
+        """[获取离obs_time最近的文件日期，距离相同时取较晚的日期]
+
+        Args:
+            directory ([str]): [cassandra中的目录]
+            filename_format ([str]): [cassandra中的文件名格式]
+            obs_time ([datetime]): [实况时间]
+
+        Returns:
+            [datetime]: [离obs_time最近的文件日期]
+        """
+        times, _ = self.get(directory, filename_format)
+        idx = bisect.bisect_left(times, obs_time)
+        if idx == len(times):
+            return times[-1]
+        if idx > 0 and obs_time - times[idx - 1] < times[idx] - obs_time:
+            return times[idx - 1]
+        return times[idx]
+
+    def between(self, directory, filename_format, obs_st_time, obs_ed_time):
+        """[获取日期范围之内的文件名以及日期，按日期从大到小排列]
+
+        Args:
+            directory ([str]): [cassandra中的目录]
+            filename_format ([str]): [cassandra中的文件名格式]
+            obs_st_time ([datetime]): [起始时间]
+            obs_ed_time ([datetime]): [结束时间]
+
+        Returns:
+            [tuple]: [(文件名列表, 日期列表)]
+        """
+        times, fnames = self.get(directory, filename_format)
+        st = bisect.bisect_left(times, obs_st_time)
+        ed = bisect.bisect_right(times, obs_ed_time)
+        return fnames[st:ed][::-1], times[st:ed][::-1]
+
+    def clear(self):
+        """[清空文件列表缓存]
+        """
+        with self._lock:
+            self._items.clear()
+
+
+# 进程内默认的文件列表缓存实例
+obs_file_index = ObsFileIndex()
+
 
 def get_obs_filename(directory, filename_format, obs_time=None, isnearesttime=False):
     """[获取实况数据文件名以及日期]
@@ -35,14 +146,7 @@ def get_obs_filename(directory, filename_format, obs_time=None, isnearesttime=Fa
         filename = fnames[0]  # obs_time为空，获取第一个就是最新的
     else:
         if isnearesttime:
-            fnames = nmc_micaps_io.get_file_list(directory)  # 目录下所有文件名， 此方法如果遇到文件量多的情况会有点慢，后续看是否能优化
-            if len(fnames) == 0:
-                raise Exception('Can not retrieve data from ' + directory)
-            fnames.sort(reverse=True)  # 按照日期从大到小排序
-            times = list(map(lambda x: datetime.datetime.strptime(x, filename_format), fnames))  # 目录下所有文件名的日期
-            timestamps = list(map(lambda x: time.mktime(x.timetuple()), times))  # 目录下所有文件名的日期时间戳
-            idx = idx = np.argmin(np.abs(np.array(timestamps) - time.mktime(obs_time.timetuple())))  # 离obs_time最近的一个idx
-            nearesttime = times[idx]  # 离obs_time最近的一个日期
+            nearesttime = obs_file_index.nearest(directory, filename_format, obs_time)  # 离obs_time最近的一个日期
             filename = datetime.datetime.strftime(nearesttime, filename_format)
         else:
             filename = datetime.datetime.strftime(obs_time, filename_format)
@@ -59,14 +163,7 @@ def get_obs_filenames(directory, filename_format, obs_st_time=None, obs_ed_time=
         obs_st_time ([dateime], optional): [description]. Defaults to None.
         obs_ed_time ([dateime], optional): [description]. Defaults to None.
     """
-    fnames = nmc_micaps_io.get_file_list(directory)  # 目录下所有文件名， 此方法如果遇到文件量多的情况会有点慢，后续看是否能优化
-    if len(fnames) == 0:
-        raise Exception('Can not retrieve data from ' + directory)
-    fnames.sort(reverse=True)  # 按照日期从大到小排序
-    fnames = np.array(fnames)
-    times = np.vectorize(lambda x: datetime.datetime.strptime(x, filename_format))(fnames)  # 目录下所有文件名的日期
-    fnames = fnames[(times >= obs_st_time) & (times <= obs_ed_time)]  # 日期范围内的文件名
-    ftimes = list(map(lambda x: datetime.datetime.strptime(x, filename_format), fnames))  # 日期范围内的时间
+    fnames, ftimes = obs_file_index.between(directory, filename_format, obs_st_time, obs_ed_time)  # 日期范围内的文件名及时间
     return list(fnames), ftimes
 
 
@@ -1,7 +1,8 @@
-import requests
-
 import os
 import sys
+import time
+import threading
+import collections
 
 import datetime
 import xarray as xr
@@ -19,6 +20,62 @@ import logging
 _log = logging.getLogger(__name__)
 
 
+class ThreddsDatasetPool(object):
+    '''
+    thredds(OPeNDAP)数据集句柄池：同一数据集(同一起报时间)只打开一次，各要素、层次复用已打开的句柄，
+    超过ttl秒重新打开（服务端数据可能更新），超过max_size个时淘汰最久未使用的句柄
+    '''
+
+    def __init__(self, max_size=16, ttl=600):
+        """[初始化]
+
+        Args:
+            max_size (int, optional): [最多保留的数据集个数]. Defaults to 16.
+            ttl (int, optional): [句柄有效期(秒)]. Defaults to 600.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        """[获取数据集句柄，仅读取元数据及坐标，数据在load时按所选子集从服务端读取]
+
+        Args:
+            url ([str]): [OPeNDAP数据集地址]
+
+        Returns:
+            [xr.Dataset]: [数据集]
+        """
+        now = time.time()
+        with self._lock:
+            item = self._items.get(url)
+            if item is not None and now - item[0] < self.ttl:
+                self._items.move_to_end(url)
+                return item[1]
+        try:
+            ds = xr.open_dataset(url)
+        except Exception as e:
+            raise Exception('Can not get data from thredds! {} {}'.format(url, e))
+        with self._lock:
+            # 淘汰的句柄可能仍在其它线程中使用，不主动关闭，由垃圾回收关闭
+            self._items[url] = (now, ds)
+            self._items.move_to_end(url)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+        return ds
+
+    def clear(self):
+        """[清空句柄池]
+        """
+        with self._lock:
+            self._items.clear()
+
+
+# 进程内默认的句柄池实例
+dataset_pool = ThreddsDatasetPool()
+
+
 def get_model_grid(init_time=None, data_name=None,  var_name=None, level=None, extent=None, x_percent=0, y_percent=0, **kwargs):
     '''
 
@@ -58,11 +115,7 @@ def get_model_grid(init_time=None, data_name=None,  var_name=None, level=None, e
     thredds_path = utl.cfgpath_format_todatestr(thredds_path, thredds_var_name=thredds_var_name, ip=ip, port=port)
     thredds_path = datetime.datetime.strftime(init_time_utc, thredds_path)
 
-    result = requests.get(thredds_path + '.html')
-    if result.status_code == 200:
-        data = xr.open_dataset(thredds_path)
-    else:
-        raise Exception('Can not get data from thredds! {}'.format(thredds_path))
+    data = dataset_pool.get(thredds_path)
 
     data = data[thredds_var_name]
     data = data.sel(time=init_time_utc)
@@ -70,13 +123,13 @@ def get_model_grid(init_time=None, data_name=None,  var_name=None, level=None, e
     if level:
         data = data.sel(lev=level)
 
-    data = data.load()
-
     data = data.squeeze().transpose('lat', 'lon')
 
-    # 数据裁剪
+    # 数据裁剪，在load前按索引切片，仅从服务端读取裁剪后的区域
     data = utl.area_cut(data, extent, x_percent, y_percent)
 
+    data = data.load()
+
     # 经纬度从小到大排序好
     data = data.sortby('lat')
     data = data.sortby('lon')
@@ -84,7 +137,7 @@ def get_model_grid(init_time=None, data_name=None,  var_name=None, level=None, e
     stda_data = mdgstda.xrda_to_gridstda(data,
                                          lat_dim='lat', lon_dim='lon',
                                          member=[data_name], level=[thredds_level], time=[init_time],
-                                         var_name=var_name, np_input_units=thredds_units,
+                                         var_name=var_name, np_input_units=thredds_units, copy=False,
                                          data_source='thredds', level_type=level_type)
     return stda_data
 
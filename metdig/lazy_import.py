@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+"""
+子包延迟导入（PEP 562 模块级__getattr__）：
+1. lazy_submodules: 对应 from . import xxx，首次访问属性时才导入子模块
+2. lazy_star_modules: 对应 from .xxx import *，首次访问任一未定义属性时按原顺序导入全部子模块并展开其公开名称
+import metdig 时不再导入matplotlib/cartopy/metpy/nmc_met_io等依赖，仅在实际使用时导入。
+"""
+
+import sys
+import importlib
+import threading
+
+
+def lazy_submodules(package_name, submodules):
+    """[生成按需导入子模块的__getattr__及__dir__]
+
+    Args:
+        package_name ([str]): [包名，即__name__]
+        submodules ([list]): [子模块名列表]
+
+    Returns:
+        [tuple]: [(__getattr__, __dir__)]
+    """
+    submodules = tuple(submodules)
+
+    def __getattr__(name):
+        if name in submodules:
+            # import_module会将子模块绑定为包的属性，后续访问不再经过__getattr__
+            return importlib.import_module('.' + name, package_name)
+        raise AttributeError('module {!r} has no attribute {!r}'.format(package_name, name))
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package_name])) | set(submodules))
+
+    return __getattr__, __dir__
+
+
+def lazy_star_modules(package_name, submodules):
+    """[生成按需执行 from .xxx import * 的__getattr__及__dir__]
+
+    Args:
+        package_name ([str]): [包名，即__name__]
+        submodules ([list]): [子模块名列表，顺序与原from .xxx import *一致，同名对象以后导入的为准]
+
+    Returns:
+        [tuple]: [(__getattr__, __dir__)]
+    """
+    submodules = tuple(submodules)
+    state = {'loaded': False, 'loading': False, 'names': []}
+    lock = threading.RLock()
+
+    def _load_all():
+        with lock:
+            # 子模块导入过程中再次访问本包属性时不重复导入，与原先顺序导入时的行为一致
+            if state['loaded'] or state['loading']:
+                return
+            state['loading'] = True
+            try:
+                package_globals = vars(sys.modules[package_name])
+                names = []
+                for submodule in submodules:
+                    module = importlib.import_module('.' + submodule, package_name)
+                    public = getattr(module, '__all__', None)
+                    if public is None:
+                        public = [_n for _n in vars(module) if not _n.startswith('_')]
+                    for _n in public:
+                        package_globals[_n] = getattr(module, _n)
+                    names.extend(public)
+                state['names'] = list(dict.fromkeys(names))
+                state['loaded'] = True
+            finally:
+                state['loading'] = False
+
+    def __getattr__(name):
+        if name == '__all__':
+            _load_all()
+            return list(state['names'])
+        if not name.startswith('__'):
+            _load_all()
+            package_globals = vars(sys.modules[package_name])
+            if name in package_globals:
+                return package_globals[name]
+            if name in submodules:
+                return importlib.import_module('.' + name, package_name)
+        raise AttributeError('module {!r} has no attribute {!r}'.format(package_name, name))
+
+    def __dir__():
+        _load_all()
+        return sorted(set(vars(sys.modules[package_name])))
+
+    return __getattr__, __dir__
@@ -1,15 +1,20 @@
-from .diag_crossection import *
-from .diag_dynamic import *
-from .diag_elements import *
-from .diag_moisture import *
-from .diag_qpf import *
-from .diag_station import *
-from .diag_synoptic import *
-from .diag_thermal import *
-from .observation_radar import *
-from .observation_satellite import *
-from .observation_station import *
-from .observation_unusual import *
-from .veri_synop import *
-from .diag_ensemble import *
-from .lib import *
+from metdig.lazy_import import lazy_star_modules
+
+# 子模块在首次访问时按如下顺序执行 from .xxx import *
+__getattr__, __dir__ = lazy_star_modules(__name__, [
+    'diag_crossection',
+    'diag_dynamic',
+    'diag_elements',
+    'diag_moisture',
+    'diag_qpf',
+    'diag_station',
+    'diag_synoptic',
+    'diag_thermal',
+    'observation_radar',
+    'observation_satellite',
+    'observation_station',
+    'observation_unusual',
+    'veri_synop',
+    'diag_ensemble',
+    'lib',
+])
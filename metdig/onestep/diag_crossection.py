@@ -5,6 +5,7 @@ import xarray as xr
 import datetime
 
 from metdig.io import get_model_grid
+from metdig.io import get_model_bundle
 from metdig.io import get_model_3D_grid
 from metdig.io import get_model_3D_grids
 
@@ -66,20 +67,13 @@ def wind_theta_wvfldiv(data_source='cassandra', data_name='ecmwf', init_time=Non
     # get area
     map_extent = get_map_area(area)
 
-    rh = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                           var_name='rh', levels=levels, extent=map_extent)
-    u = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='u', levels=levels, extent=map_extent)
-    v = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='v', levels=levels, extent=map_extent)
-    tmp = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                            var_name='tmp', levels=levels, extent=map_extent)
+    data = get_model_bundle(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name, extent=map_extent,
+                            items=[dict(var_name='rh', levels=levels), dict(var_name='u', levels=levels),
+                                   dict(var_name='v', levels=levels), dict(var_name='tmp', levels=levels),
+                                   dict(var_name='hgt', level=500), dict(var_name='psfc')])
+    rh, u, v, tmp, hgt, psfc = data['rh'], data['u'], data['v'], data['tmp'], data['hgt'], data['psfc']
     spfh = read_spfh_3D(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
                             levels=levels, extent=map_extent)
-    hgt = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                         var_name='hgt', level=500, extent=map_extent)
-    psfc = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='psfc', extent=map_extent)
     wvfldiv=mdgcal.water_wapor_flux_divergence(u,v,spfh)
 
 
@@ -147,20 +141,13 @@ def wind_theta_wvfl(data_source='cassandra', data_name='ecmwf', init_time=None,
     # get area
     map_extent = get_map_area(area)
 
-    rh = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                           var_name='rh', levels=levels, extent=map_extent)
-    u = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='u', levels=levels, extent=map_extent)
-    v = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='v', levels=levels, extent=map_extent)
-    tmp = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                            var_name='tmp', levels=levels, extent=map_extent)
+    data = get_model_bundle(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name, extent=map_extent,
+                            items=[dict(var_name='rh', levels=levels), dict(var_name='u', levels=levels),
+                                   dict(var_name='v', levels=levels), dict(var_name='tmp', levels=levels),
+                                   dict(var_name='hgt', level=500), dict(var_name='psfc')])
+    rh, u, v, tmp, hgt, psfc = data['rh'], data['u'], data['v'], data['tmp'], data['hgt'], data['psfc']
     spfh = read_spfh_3D(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
                             levels=levels, extent=map_extent)
-    hgt = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                         var_name='hgt', level=500, extent=map_extent)
-    psfc = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='psfc', extent=map_extent)
     wsp=mdgcal.wind_speed(u,v)
     wvfl=mdgcal.cal_ivt_singlelevel(wsp,spfh)
 
@@ -234,18 +221,11 @@ def wind_theta_wsp(data_source='cassandra', data_name='ecmwf', init_time=None, f
     # get area
     map_extent = get_map_area(area)
 
-    rh = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                           var_name='rh', levels=levels, extent=map_extent)
-    u = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='u', levels=levels, extent=map_extent)
-    v = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='v', levels=levels, extent=map_extent)
-    tmp = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                            var_name='tmp', levels=levels, extent=map_extent)
-    hgt = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                         var_name='hgt', level=500, extent=map_extent)
-    psfc = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='psfc', extent=map_extent)
+    data = get_model_bundle(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name, extent=map_extent,
+                            items=[dict(var_name='rh', levels=levels), dict(var_name='u', levels=levels),
+                                   dict(var_name='v', levels=levels), dict(var_name='tmp', levels=levels),
+                                   dict(var_name='hgt', level=500), dict(var_name='psfc')])
+    rh, u, v, tmp, hgt, psfc = data['rh'], data['u'], data['v'], data['tmp'], data['hgt'], data['psfc']
 
     res=rh.stda.horizontal_resolution
     if(lon_mean is not None):
@@ -313,18 +293,11 @@ def wind_theta_vort(data_source='cassandra', data_name='ecmwf', init_time=None,
     # get area
     map_extent = get_map_area(area)
 
-    rh = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                           var_name='rh', levels=levels, extent=map_extent)
-    u = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='u', levels=levels, extent=map_extent)
-    v = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='v', levels=levels, extent=map_extent)
-    tmp = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                            var_name='tmp', levels=levels, extent=map_extent)
-    hgt = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                         var_name='hgt', level=500, extent=map_extent)
-    psfc = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='psfc', extent=map_extent)
+    data = get_model_bundle(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name, extent=map_extent,
+                            items=[dict(var_name='rh', levels=levels), dict(var_name='u', levels=levels),
+                                   dict(var_name='v', levels=levels), dict(var_name='tmp', levels=levels),
+                                   dict(var_name='hgt', level=500), dict(var_name='psfc')])
+    rh, u, v, tmp, hgt, psfc = data['rh'], data['u'], data['v'], data['tmp'], data['hgt'], data['psfc']
 
     res=rh.stda.horizontal_resolution
     if(lon_mean is not None):
@@ -389,18 +362,11 @@ def wind_theta_fg(data_source='cassandra', data_name='ecmwf', init_time=None, fh
     # get area
     map_extent = get_map_area(area)
 
-    rh = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                           var_name='rh', levels=levels, extent=map_extent)
-    u = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='u', levels=levels, extent=map_extent)
-    v = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='v', levels=levels, extent=map_extent)
-    tmp = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                            var_name='tmp', levels=levels, extent=map_extent)
-    hgt = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                         var_name='hgt', level=500, extent=map_extent)
-    psfc = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='psfc', extent=map_extent)
+    data = get_model_bundle(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name, extent=map_extent,
+                            items=[dict(var_name='rh', levels=levels), dict(var_name='u', levels=levels),
+                                   dict(var_name='v', levels=levels), dict(var_name='tmp', levels=levels),
+                                   dict(var_name='hgt', level=500), dict(var_name='psfc')])
+    rh, u, v, tmp, hgt, psfc = data['rh'], data['u'], data['v'], data['tmp'], data['hgt'], data['psfc']
 
     pressure_3d = mdgstda.gridstda_full_like_by_levels(tmp, tmp['level'].values)
     thta=mdgcal.thermal.potential_temperature(pressure_3d,tmp)
@@ -1261,18 +1227,11 @@ def wind_theta_absv(data_source='cassandra', data_name='ecmwf', init_time=None,
     # get area
     map_extent = get_map_area(area)
 
-    rh = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                           var_name='rh', levels=levels, extent=map_extent)
-    u = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='u', levels=levels, extent=map_extent)
-    v = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='v', levels=levels, extent=map_extent)
-    tmp = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                            var_name='tmp', levels=levels, extent=map_extent)
-    hgt = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                         var_name='hgt', level=500, extent=map_extent)
-    psfc = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='psfc', extent=map_extent)
+    data = get_model_bundle(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name, extent=map_extent,
+                            items=[dict(var_name='rh', levels=levels), dict(var_name='u', levels=levels),
+                                   dict(var_name='v', levels=levels), dict(var_name='tmp', levels=levels),
+                                   dict(var_name='hgt', level=500), dict(var_name='psfc')])
+    rh, u, v, tmp, hgt, psfc = data['rh'], data['u'], data['v'], data['tmp'], data['hgt'], data['psfc']
 
     res=rh.stda.horizontal_resolution
     if(lon_mean is not None):
@@ -1338,18 +1297,11 @@ def wind_theta_rh(data_source='cassandra', data_name='ecmwf', init_time=None, fh
     # get area
     map_extent = get_map_area(area)
 
-    rh = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                           var_name='rh', levels=levels, extent=map_extent)
-    u = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='u', levels=levels, extent=map_extent)
-    v = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='v', levels=levels, extent=map_extent)
-    tmp = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                            var_name='tmp', levels=levels, extent=map_extent)
-    hgt = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                         var_name='hgt', level=500, extent=map_extent)
-    psfc = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='psfc', extent=map_extent)
+    data = get_model_bundle(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name, extent=map_extent,
+                            items=[dict(var_name='rh', levels=levels), dict(var_name='u', levels=levels),
+                                   dict(var_name='v', levels=levels), dict(var_name='tmp', levels=levels),
+                                   dict(var_name='hgt', level=500), dict(var_name='psfc')])
+    rh, u, v, tmp, hgt, psfc = data['rh'], data['u'], data['v'], data['tmp'], data['hgt'], data['psfc']
 
     res=rh.stda.horizontal_resolution
     if(lon_mean is not None):
@@ -1419,18 +1371,11 @@ def wind_theta_spfh(data_source='cassandra', data_name='ecmwf', init_time=None,
     # get area
     map_extent = get_map_area(area)
 
-    rh = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                           var_name='rh', levels=levels, extent=map_extent)
-    u = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='u', levels=levels, extent=map_extent)
-    v = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='v', levels=levels, extent=map_extent)
-    tmp = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                            var_name='tmp', levels=levels, extent=map_extent)
-    hgt = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                         var_name='hgt', level=500, extent=map_extent)
-    psfc = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='psfc', extent=map_extent)
+    data = get_model_bundle(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name, extent=map_extent,
+                            items=[dict(var_name='rh', levels=levels), dict(var_name='u', levels=levels),
+                                   dict(var_name='v', levels=levels), dict(var_name='tmp', levels=levels),
+                                   dict(var_name='hgt', level=500), dict(var_name='psfc')])
+    rh, u, v, tmp, hgt, psfc = data['rh'], data['u'], data['v'], data['tmp'], data['hgt'], data['psfc']
 
     res=rh.stda.horizontal_resolution
     if(lon_mean is not None):
@@ -1494,20 +1439,13 @@ def wind_tmp_rh_vvel(data_source='cassandra', data_name='ecmwf', init_time=None,
     # get area
     map_extent = get_map_area(area)
 
-    rh = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                           var_name='rh', levels=levels, extent=map_extent)
-    u = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='u', levels=levels, extent=map_extent)
-    v = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='v', levels=levels, extent=map_extent)
-    tmp = get_model_3D_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                            var_name='tmp', levels=levels, extent=map_extent)
+    data = get_model_bundle(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name, extent=map_extent,
+                            items=[dict(var_name='rh', levels=levels), dict(var_name='u', levels=levels),
+                                   dict(var_name='v', levels=levels), dict(var_name='tmp', levels=levels),
+                                   dict(var_name='hgt', level=500), dict(var_name='psfc')])
+    rh, u, v, tmp, hgt, psfc = data['rh'], data['u'], data['v'], data['tmp'], data['hgt'], data['psfc']
     vvel = read_vvel3d(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
                             levels=levels, extent=map_extent)
-    hgt = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                         var_name='hgt', level=500, extent=map_extent)
-    psfc = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name,
-                          var_name='psfc', extent=map_extent)
 
     res=rh.stda.horizontal_resolution
     if(lon_mean is not None):
@@ -3,6 +3,7 @@
 import numpy as np
 
 from metdig.io import get_model_grid
+from metdig.io import get_model_bundle
 
 from metdig.onestep.lib.utility import get_map_area
 from metdig.onestep.lib.utility import mask_terrian
@@ -179,11 +180,12 @@ def hgt_uv_prmsl(data_source='cassandra', data_name='ecmwf', init_time=None, fho
     map_extent = get_map_area(area)
 
     # get data
-    hgt = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour,
-                         data_name=data_name, var_name='hgt', level=hgt_lev, extent=map_extent)
-    u = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name, var_name='u', level=uv_lev, extent=map_extent)
-    v = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name, var_name='v', level=uv_lev, extent=map_extent)
-    prmsl = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name, var_name='prmsl', extent=map_extent)
+    items = [dict(var_name='hgt', level=hgt_lev), dict(var_name='u', level=uv_lev),
+             dict(var_name='v', level=uv_lev), dict(var_name='prmsl')]
+    if is_mask_terrain:
+        items.append(dict(var_name='psfc'))
+    data = get_model_bundle(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name, items=items, extent=map_extent)
+    hgt, u, v, prmsl = data['hgt'], data['u'], data['v'], data['prmsl']
 
     if is_return_data:
         dataret = {'hgt': hgt, 'u': u, 'v': v, 'prmsl': prmsl}
@@ -191,7 +193,7 @@ def hgt_uv_prmsl(data_source='cassandra', data_name='ecmwf', init_time=None, fho
 
     # 隐藏被地形遮挡地区
     if is_mask_terrain:
-        psfc = get_model_grid(data_source=data_source, init_time=init_time, fhour=fhour, data_name=data_name, var_name='psfc', extent=map_extent)
+        psfc = data['psfc']
         hgt = mask_terrian(psfc, hgt)
         u = mask_terrian(psfc, u)
         v = mask_terrian(psfc, v)
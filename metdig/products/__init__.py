@@ -1,13 +1,18 @@
-from . import diag_crossection
-from . import diag_dynamic
-from . import diag_elements
-from . import diag_moisture
-from . import diag_qpf
-from . import diag_synoptic
-from . import diag_thermal
-from . import diag_station
-from . import observation_radar
-from . import observation_satellite
-from . import observation_station
-from . import observation_unusual
-from . import veri_synop
\ No newline at end of file
+from metdig.lazy_import import lazy_submodules
+
+# 子模块在首次访问时导入
+__getattr__, __dir__ = lazy_submodules(__name__, [
+    'diag_crossection',
+    'diag_dynamic',
+    'diag_elements',
+    'diag_moisture',
+    'diag_qpf',
+    'diag_synoptic',
+    'diag_thermal',
+    'diag_station',
+    'observation_radar',
+    'observation_satellite',
+    'observation_station',
+    'observation_unusual',
+    'veri_synop',
+])
@@ -1,4 +1,9 @@
-from .utl_stda_attrs import *
-from .utl_stda_grid import *
-from .utl_stda_station import *
-from .utl_units import *
\ No newline at end of file
+from metdig.lazy_import import lazy_star_modules
+
+# 子模块在首次访问时按如下顺序执行 from .xxx import *
+__getattr__, __dir__ = lazy_star_modules(__name__, [
+    'utl_stda_attrs',
+    'utl_stda_grid',
+    'utl_stda_station',
+    'utl_units',
+])
@@ -5,7 +5,6 @@ import datetime
 import xarray as xr
 import numpy as np
 import pandas as pd
-from copy import deepcopy
 from metpy.units import units
 
 import metdig.utl as mdgstda
@@ -18,11 +17,13 @@ __all__ = [
     'gridstda_full_like_by_levels',
 ]
 
+_STDA_DIMS = ('member', 'level', 'time', 'dtime', 'lat', 'lon')
+
 
 def xrda_to_gridstda(xrda,
                      member_dim='member', level_dim='level', time_dim='time', dtime_dim='dtime', lat_dim='lat', lon_dim='lon',
                      member=None, level=None, time=None, dtime=None, lat=None, lon=None,
-                     np_input_units='', var_name='',
+                     np_input_units='', var_name='', copy=True,
                      **attrs_kwargs):
     """[将一个xarray数据，转换成网格stda标准格式数据
 
@@ -58,6 +59,7 @@ def xrda_to_gridstda(xrda,
         lon ([list], optional): [使用该参数替换xrda的lon数据]. Defaults to None.
         np_input_units (str, optional): [输入数据对应的单位，自动转换为能查询到的stda单位]. Defaults to ''.
         var_name (str, optional): [要素名]. Defaults to ''.
+        copy (bool, optional): [是否拷贝xrda的数据。设置为False时，返回的stda与xrda共享内存（单位转换也在原数据上进行），适用于xrda为临时数据的情况]. Defaults to True.
         **attrs_kwargs {[type]} -- [其它相关属性，如：data_source='cassandra', level_type='high']
 
     Returns:
@@ -70,6 +72,13 @@ def xrda_to_gridstda(xrda,
             return True
         return False
 
+    # xrda的维度均能对应到stda维度时，直接在numpy数据上转置补维，构造stda
+    dims_map = dict(zip((member_dim, level_dim, time_dim, dtime_dim, lat_dim, lon_dim), _STDA_DIMS))
+    if len(dims_map) == len(_STDA_DIMS) and all(_d in dims_map for _d in xrda.dims):
+        replace = dict(member=member, level=level, time=time, dtime=dtime, lat=lat, lon=lon)
+        replace = {_d: None if _easy_check_None(_v) else _v for _d, _v in replace.items()}
+        return _xrda_to_gridstda_fast(xrda, dims_map, replace, np_input_units, var_name, copy, **attrs_kwargs)
+
     stda_data = xrda.copy(deep=True)
 
     # 已知维度替换成stda维度名称，同时补齐缺失维度
@@ -127,6 +136,39 @@ def xrda_to_gridstda(xrda,
     return stda_data
 
 
+def _xrda_to_gridstda_fast(xrda, dims_map, replace, np_input_units, var_name, copy, **attrs_kwargs):
+    '''
+    xrda_to_gridstda的快速路径：不经过rename/expand_dims/assign_coords/transpose/drop，
+    在xrda的numpy数据上直接转置并补齐长度为1的维度得到6维视图，copy=False时不拷贝数据
+    '''
+    src_dims = [dims_map[_d] for _d in xrda.dims]
+    src_names = {dims_map[_d]: _d for _d in xrda.dims}
+
+    values = np.transpose(xrda.values, [src_dims.index(_d) for _d in _STDA_DIMS if _d in src_dims])
+    if copy:
+        values = np.array(values, order='C', copy=True)
+    values = np.expand_dims(values, tuple(i for i, _d in enumerate(_STDA_DIMS) if _d not in src_dims))
+
+    coords = {}
+    for _d in _STDA_DIMS:
+        if replace[_d] is not None:
+            coords[_d] = replace[_d]
+        elif _d not in src_dims:
+            coords[_d] = [0]
+        elif src_names[_d] in xrda.coords:
+            coords[_d] = xrda[src_names[_d]].values
+
+    # attrs
+    stda_attrs = mdgstda.get_stda_attrs(var_name=var_name, **attrs_kwargs)
+    # 单位转换
+    values, data_units = mdgstda.numpy_units_to_stda_inplace(values, np_input_units, stda_attrs['var_units'])
+    stda_attrs['var_units'] = data_units
+
+    stda_data = xr.DataArray(values, dims=_STDA_DIMS, coords=coords, name=xrda.name)
+    stda_data.attrs = stda_attrs
+    return stda_data
+
+
 def npda_to_gridstda(npda,
                      dims=('lat', 'lon'),
                      member=None, level=None, time=None, dtime=None, lat=None, lon=None,
@@ -599,38 +641,13 @@ class __STDADataArrayAccessor(object):
         if id is None:
             id = np.arange(1, lon.size + 1)
 
-        # 其它坐标信息名称
-        points_keys = list(set(other.keys()).difference(set(['lon', 'lat', 'id'])))
-        points = {k: _to_list(other[k]) for k in points_keys}
-
-        # get points data
-        points_xr = self._xr.interp(lon=('points', lon), lat=('points', lat), method=method)
-        # print(points_xr)
-        # print(points_xr.values.shape)
-
-        # get attrs
-        attrs = deepcopy(self._xr.attrs)
-        attrs['data_start_columns'] = 6 + len(points_keys)
-
-        # points data to pd.DataFrame
-        columns = ['level', 'time', 'dtime', 'id', 'lon', 'lat'] + points_keys + list(self._xr['member'].values)
-        lines = []
-        for i_lv, _lv in enumerate(points_xr['level'].values):
-            for i_t, _t in enumerate(points_xr['time'].values):
-                for i_d, _d in enumerate(points_xr['dtime'].values):
-                    _d = int(_d)
-                    for i_id, _id in enumerate(id):
-                        _other = [points[_o][i_id] for _o in points_keys]  # 除去lon lat id之外的其它坐标信息名称对应的数据
-                        _lon = lon[i_id]
-                        _lat = lat[i_id]
-                        _data = points_xr.values[:, i_lv, i_t, i_d, i_id]
-                        line = [_lv, _t, _d, _id, _lon, _lat] + _other + list(_data)
-                        lines.append(line)
-
-        df = pd.DataFrame(lines, columns=columns)
-        df.attrs = attrs
-
-        return df
+        # 其它坐标信息
+        points = {k: _to_list(other[k]) for k in set(other.keys()).difference(set(['lon', 'lat', 'id']))}
+        points['lon'] = lon
+        points['lat'] = lat
+        points['id'] = id
+
+        return mdgstda.gridstda_to_stastda(self._xr, points, method=method)
 
 
 if __name__ == '__main__':
@@ -109,22 +109,28 @@ def gridstda_to_stastda(grid_stda_data, points={},method='linear'):
     attrs = deepcopy(grid_stda_data.attrs)
     attrs['data_start_columns'] = 6 + len(other)
 
-    # points data to pd.DataFrame
-    columns = ['level', 'time', 'dtime', 'id', 'lon', 'lat'] + other + list(grid_stda_data['member'].values)
-    lines = []
-    for i_lv, _lv in enumerate(points_xr['level'].values):
-        for i_t, _t in enumerate(points_xr['time'].values):
-            for i_d, _d in enumerate(points_xr['dtime'].values):
-                _d = int(_d)
-                for i_id, _id in enumerate(points['id']):
-                    _other = [points[_o][i_id] for _o in other]  # 除去lon lat id之外的其它坐标信息名称对应的数据
-                    _lon = points['lon'][i_id]
-                    _lat = points['lat'][i_id]
-                    _data = points_xr.values[:, i_lv, i_t, i_d, i_id]
-                    line = [_lv, _t, _d, _id, _lon, _lat] + _other + list(_data)
-                    lines.append(line)
-
-    df = pd.DataFrame(lines, columns=columns)
+    # points data to pd.DataFrame，行顺序为level, time, dtime, id逐层嵌套
+    levels = points_xr['level'].values
+    times = points_xr['time'].values
+    dtimes = points_xr['dtime'].values.astype(int)
+    n_lv, n_t, n_d, n_id = levels.size, times.size, dtimes.size, points['id'].size
+
+    columns = {}
+    columns['level'] = np.repeat(levels, n_t * n_d * n_id)
+    columns['time'] = np.tile(np.repeat(times, n_d * n_id), n_lv)
+    columns['dtime'] = np.tile(np.repeat(dtimes, n_id), n_lv * n_t)
+    columns['id'] = np.tile(points['id'], n_lv * n_t * n_d)
+    columns['lon'] = np.tile(points['lon'], n_lv * n_t * n_d)
+    columns['lat'] = np.tile(points['lat'], n_lv * n_t * n_d)
+    for _o in other:  # 除去lon lat id之外的其它坐标信息
+        columns[_o] = np.tile(np.asarray(points[_o]), n_lv * n_t * n_d)
+
+    members = list(grid_stda_data['member'].values)
+    values = points_xr.transpose('level', 'time', 'dtime', 'points', 'member').values.reshape(-1, len(members))
+    for i, _m in enumerate(members):
+        columns[_m] = values[:, i]
+
+    df = pd.DataFrame(columns, columns=['level', 'time', 'dtime', 'id', 'lon', 'lat'] + other + members)
     df.attrs = attrs
 
     return df
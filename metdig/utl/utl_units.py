@@ -42,6 +42,49 @@ def numpy_units_to_stda(np_input, np_input_units, stda_units):
     return data, stda_units
 
 
+def numpy_units_to_stda_inplace(np_input, np_input_units, stda_units):
+    '''
+    
+    [numpy数据原地转换成目标单位，仅对可写的浮点型数据原地转换，否则同numpy_units_to_stda返回新数据，注意，目标单位不能带倍数]
+    
+    Arguments:
+        np_input {[ndarray]} -- [输入numpy数据]
+        np_input_units {[str]} -- [输入numpy数据对应的单位]
+        stda_units {[str]} -- [stda目标单位, 必须为基本单位且不带倍数，]
+    
+    Returns:
+        [ndarray, units] -- [转换后的数据，转换后的单位]
+    
+    Raises:
+        Exception -- [description]
+    '''
+    if not isinstance(np_input_units, str):
+        raise Exception('error: np_input_units must be str!')
+    if not isinstance(stda_units, str):
+        raise Exception('error: stda_units must be str!')
+
+    if np_input_units == '' or stda_units == '' or np_input_units == 'undefined stda' or stda_units == 'undefined stda' :
+        return np_input, np_input_units # 为空或未定义，无法转换，则按原数据返回，同时返回的单位为空
+
+    if stda_units == np_input_units:
+        return np_input, np_input_units # 相同，不需要转换
+
+    if not np.issubdtype(np_input.dtype, np.floating) or not np_input.flags.writeable:
+        return numpy_units_to_stda(np_input, np_input_units, stda_units)
+
+    if np.array(units(stda_units)) != 1:
+        raise Exception('error: stda_units={} 单位不能带倍数, '.format(stda_units))
+
+    # 单位转换均为线性变换 y = factor * x + offset
+    offset = float(units.Quantity(0.0, np_input_units).to(stda_units).magnitude)
+    factor = float(units.Quantity(1.0, np_input_units).to(stda_units).magnitude) - offset
+    if factor != 1:
+        np.multiply(np_input, factor, out=np_input, casting='unsafe')
+    if offset != 0:
+        np.add(np_input, offset, out=np_input, casting='unsafe')
+    return np_input, stda_units
+
+
 # 弃用 以下单位转换函数错误，无法正常使用
 # def numpy_units_convert(np_input, np_input_units, stda_units):
 #     '''
@@ -32,7 +32,7 @@ setup(
       'Programming Language :: Python :: 3',
     ],
 
-    packages=find_packages(exclude=['metdig.egg-info']),
+    packages=find_packages(exclude=['metdig.egg-info', 'tests', 'tests.*', 'benchmarks', 'benchmarks.*']),
     include_package_data=True,
     exclude_package_data={'': ['.gitignore']},
 
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+"""
+era5_manual_download下载拆分流水线测试：以本地替身替换cdsapi.Client，检查请求拆分、拆分入缓存、断点续传及失败处理
+"""
+
+import os
+import datetime
+import itertools
+import threading
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+import pytest
+
+from metdig.io.lib import config as CONFIG
+from metdig.io import era5_manual_download as era5_dl
+
+
+EXTENT = [100, 102, 30, 32]
+
+
+class FakeClient(object):
+    '''
+    cdsapi.Client替身，按请求参数生成小网格netcdf文件，fail_months中的月份抛出异常
+    '''
+
+    lock = threading.Lock()
+    calls = []
+    fail_months = set()
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def retrieve(self, name, request, target):
+        month = (int(request['year'][0]), int(request['month'][0]))
+        with self.lock:
+            self.calls.append((request['variable'], month))
+        if month in self.fail_months:
+            raise Exception('fake cds error {}'.format(month))
+        times = []
+        for y, m, d, t in itertools.product(request['year'], request['month'], request['day'], request['time']):
+            try:
+                times.append(datetime.datetime(int(y), int(m), int(d), int(t[:2])))
+            except ValueError:
+                continue
+        north, west, south, east = request['area']
+        coords = {'time': pd.to_datetime(sorted(times)),
+                  'latitude': np.arange(north, south - 0.5, -1.0),
+                  'longitude': np.arange(west, east + 0.5, 1.0)}
+        dims = ['time', 'latitude', 'longitude']
+        if 'pressure_level' in request:
+            coords['level'] = [int(_l) for _l in request['pressure_level']]
+            dims = ['time', 'level', 'latitude', 'longitude']
+        shape = [len(coords[_d]) for _d in dims]
+        data = xr.DataArray(np.random.rand(*shape).astype('float32'), dims=dims, coords=coords, name='z')
+        # 与真实下载一致，先写入target(.tmp)
+        data.to_netcdf(target)
+
+
+@pytest.fixture
+def fake_cds(monkeypatch, tmp_path):
+    monkeypatch.setattr(era5_dl.cdsapi, 'Client', FakeClient)
+    monkeypatch.setattr(CONFIG, 'get_cache_dir', lambda: tmp_path / 'cache')
+    monkeypatch.setattr(CONFIG, 'get_era5cache_backend', lambda: 'netcdf')
+    FakeClient.calls = []
+    FakeClient.fail_months = set()
+    yield FakeClient
+
+
+def _psl_download(tmp_path, **kwargs):
+    # 北京时2020-01-31 08时至2020-02-01 08时，前后多下一天后跨越两个自然月
+    return era5_dl.era5_psl_download_usepool(
+        dt_start=datetime.datetime(2020, 1, 31, 8), dt_end=datetime.datetime(2020, 2, 1, 8),
+        var_names=['hgt'], pressure_level=[500, 850], hour=[8], extent=EXTENT,
+        download_dir=str(tmp_path / 'download'), max_pool=2, **kwargs)
+
+
+def _cache_file(tmp_path, dt_utc, var_name, level):
+    return os.path.join(str(tmp_path / 'cache'), 'ERA5_DATA/{0:%Y%m%d%H%M}/hourly/{1}/{6}/{0:%Y%m%d%H%M}_{2}_{3}_{4}_{5}.nc'.format(
+        dt_utc, var_name, EXTENT[0], EXTENT[1], EXTENT[2], EXTENT[3], level))
+
+
+def test_month_chunks():
+    chunks = era5_dl._get_month_chunks(datetime.datetime(2019, 12, 30), datetime.datetime(2020, 2, 2))
+    assert chunks == [(datetime.datetime(2019, 12, 30), datetime.datetime(2019, 12, 31)),
+                      (datetime.datetime(2020, 1, 1), datetime.datetime(2020, 1, 31)),
+                      (datetime.datetime(2020, 2, 1), datetime.datetime(2020, 2, 2))]
+
+
+def test_pipeline_downloads_and_splits(fake_cds, tmp_path):
+    failed = _psl_download(tmp_path)
+
+    assert failed == []
+    assert sorted(fake_cds.calls) == [('geopotential', (2020, 1)), ('geopotential', (2020, 2))]
+    for day in (30, 31):
+        for level in (500, 850):
+            assert os.path.exists(_cache_file(tmp_path, datetime.datetime(2020, 1, day, 0), 'hgt', level))
+    assert os.path.exists(_cache_file(tmp_path, datetime.datetime(2020, 2, 2, 0), 'hgt', 500))
+    # 下载目录中不残留未完成的.tmp文件
+    assert not [_f for _f in os.listdir(str(tmp_path / 'download')) if _f.endswith('.tmp')]
+
+
+def test_pipeline_resume_skips_done_requests(fake_cds, tmp_path):
+    assert _psl_download(tmp_path) == []
+    fake_cds.calls = []
+
+    assert _psl_download(tmp_path) == []
+    assert fake_cds.calls == []
+
+    # resume=False时重新下载全部请求
+    assert _psl_download(tmp_path, resume=False) == []
+    assert len(fake_cds.calls) == 2
+
+
+def test_pipeline_failed_download_is_retried(fake_cds, tmp_path):
+    fake_cds.fail_months = {(2020, 2)}
+    failed = _psl_download(tmp_path)
+
+    assert [(_r.var_name, _r.months) for _r in failed] == [('hgt', [2])]
+    assert not os.path.exists(failed[0].savefile)
+    assert os.path.exists(_cache_file(tmp_path, datetime.datetime(2020, 1, 31, 0), 'hgt', 500))
+    assert not os.path.exists(_cache_file(tmp_path, datetime.datetime(2020, 2, 1, 0), 'hgt', 500))
+
+    # 重新运行时只下载失败的请求
+    fake_cds.fail_months = set()
+    fake_cds.calls = []
+    assert _psl_download(tmp_path) == []
+    assert fake_cds.calls == [('geopotential', (2020, 2))]
+    assert os.path.exists(_cache_file(tmp_path, datetime.datetime(2020, 2, 1, 0), 'hgt', 500))
+
+
+def test_pipeline_failed_split_is_not_marked_done(fake_cds, tmp_path, monkeypatch):
+    split = era5_dl._Era5Request.split
+
+    def _split(request):
+        if request.months == [1]:
+            raise Exception('fake split error')
+        return split(request)
+
+    monkeypatch.setattr(era5_dl._Era5Request, 'split', _split)
+    failed = _psl_download(tmp_path)
+    assert [_r.months for _r in failed] == [[1]]
+
+    monkeypatch.setattr(era5_dl._Era5Request, 'split', split)
+    fake_cds.calls = []
+    assert _psl_download(tmp_path) == []
+    assert fake_cds.calls == [('geopotential', (2020, 1))]
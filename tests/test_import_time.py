@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+"""
+import metdig耗时测试：新进程中以python -X importtime导入metdig，子包延迟导入后不应导入matplotlib/cartopy等重量级依赖
+
+pytest -s 时打印导入耗时
+"""
+
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ['matplotlib', 'cartopy', 'IPython', 'metpy', 'nmc_met_io', 'cdsapi', 'numba', 'xarray', 'pandas']
+
+# import metdig累计耗时上限(秒)，子包全部立即导入时约数秒
+MAX_IMPORT_SECONDS = 1.0
+
+
+def _run(code):
+    # 新进程中执行code，返回(标准输出, -X importtime的耗时表{模块名: 累计耗时(秒)})
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cum, name = line[len('import time:'):].split('|')
+        if cum.strip().isdigit():
+            cumulative[name.strip()] = int(cum) / 1e6
+    return proc.stdout, cumulative
+
+
+def test_import_metdig_is_lazy():
+    code = 'import sys, json, metdig; print(json.dumps([_m for _m in {!r} if _m in sys.modules]))'.format(HEAVY_MODULES)
+    stdout, cumulative = _run(code)
+
+    assert json.loads(stdout) == []
+    print('\nimport metdig: {:.3f} s'.format(cumulative['metdig']))
+    assert cumulative['metdig'] < MAX_IMPORT_SECONDS
+
+
+def test_submodule_imported_on_first_access():
+    code = 'import sys, metdig; assert "metdig.utl" not in sys.modules; metdig.utl.numpy_to_gridstda; print("metdig.utl" in sys.modules)'
+    stdout, _ = _run(code)
+    assert stdout.strip() == 'True'
+
+    with pytest.raises(subprocess.CalledProcessError):
+        _run('import metdig; metdig.not_a_subpackage')
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+"""
+package_config配置表索引测试：对配置表(csv)的每一行，索引查询结果与原按列布尔筛选DataFrame的结果一致
+"""
+
+import pytest
+
+from metdig.io.lib.package_config.cassandra_model_cfg import cassandra_model_cfg
+from metdig.io.lib.package_config.cassandra_obs_cfg import cassandra_obs_cfg
+from metdig.io.lib.package_config.cassandra_radar_cfg import cassandra_radar_cfg
+from metdig.io.lib.package_config.cassandra_sate_cfg import cassandra_sate_cfg
+from metdig.io.lib.package_config.cmadaas_datacode_cfg import cmadaas_datacode_cfg
+from metdig.io.lib.package_config.cmadaas_model_cfg import cmadaas_model_cfg
+from metdig.io.lib.package_config.cmadaas_obs_cfg import cmadaas_obs_cfg
+from metdig.io.lib.package_config.era5_cfg import era5_cfg
+from metdig.io.lib.package_config.thredds_model_cfg import thredds_model_cfg
+
+
+def _mask_rows(cfg, **key):
+    # 原实现：按列布尔筛选，返回行字典列表(表中顺序)
+    mask = None
+    for col, value in key.items():
+        _mask = cfg[col] == value
+        mask = _mask if mask is None else mask & _mask
+    return cfg[mask].copy(deep=True).reset_index(drop=True).to_dict('records')
+
+
+def _keys(cfg, cols):
+    return list(dict.fromkeys(tuple(row[_c] for _c in cols) for row in cfg.to_dict('records')))
+
+
+# (配置实例, 配置表属性名, 索引列, 查询函数)
+_MODEL_CFGS = [
+    (cassandra_model_cfg(), 'model_cfg', ['data_name', 'var_name', 'level_type'],
+     lambda c, data_name, var_name, level_type: c.get_model_cfg(level_type=level_type, data_name=data_name, var_name=var_name)),
+    (thredds_model_cfg(), 'model_cfg', ['data_name', 'var_name', 'level_type'],
+     lambda c, data_name, var_name, level_type: c.get_model_cfg(level_type=level_type, data_name=data_name, var_name=var_name)),
+    (cmadaas_model_cfg(), 'model_cfg', ['data_name', 'var_name', 'level_type'],
+     lambda c, data_name, var_name, level_type: c.get_model_cfg(data_name=data_name, var_name=var_name, level_type=level_type, data_code='any')),
+    (era5_cfg(), 'model_cfg', ['var_name', 'level_type'],
+     lambda c, var_name, level_type: c.get_model_cfg(var_name=var_name, level_type=level_type)),
+    (cassandra_radar_cfg(), 'radar_cfg', ['data_name', 'var_name'],
+     lambda c, data_name, var_name: c.get_radar_cfg(data_name=data_name, var_name=var_name)),
+    (cmadaas_obs_cfg(), 'obs_cfg', ['data_name', 'var_name'],
+     lambda c, data_name, var_name: c.get_obs_cfg(data_name=data_name, var_name=var_name)),
+]
+
+
+@pytest.mark.parametrize('cfg_obj, attr, cols, lookup', _MODEL_CFGS, ids=[type(_c[0]).__name__ for _c in _MODEL_CFGS])
+def test_index_matches_mask_lookup(cfg_obj, attr, cols, lookup):
+    cfg = getattr(cfg_obj, attr)
+    for key in _keys(cfg, cols):
+        kwargs = dict(zip(cols, key))
+        expected = _mask_rows(cfg, **kwargs)
+        if isinstance(cfg_obj, cmadaas_model_cfg) and len(expected) > 1:
+            with pytest.raises(Exception, match='greater than 1 recode'):
+                lookup(cfg_obj, **kwargs)
+            continue
+        assert lookup(cfg_obj, **kwargs) == expected[0]
+
+
+def test_index_missing_key_raises():
+    with pytest.raises(Exception, match='can not get data_name=nope'):
+        cassandra_model_cfg().get_model_cfg(level_type='high', data_name='nope', var_name='tmp')
+    with pytest.raises(Exception, match='can not get level_type = high var_name = nope'):
+        era5_cfg().get_model_cfg(var_name='nope', level_type='high')
+
+
+def test_index_returns_copies():
+    row = cassandra_model_cfg().get_model_cfg(level_type='high', data_name='ecmwf', var_name='tmp')
+    row['cassandra_path'] = 'changed'
+    assert cassandra_model_cfg().get_model_cfg(level_type='high', data_name='ecmwf', var_name='tmp')['cassandra_path'] != 'changed'
+
+
+def test_obs_index_matches_mask_lookup():
+    cfg_obj = cassandra_obs_cfg()
+    for data_name, var_name in _keys(cfg_obj.obs_cfg, ['data_name', 'var_name']):
+        expected = _mask_rows(cfg_obj.obs_cfg, data_name=data_name, var_name=var_name)[0]
+        assert cfg_obj.obs_cassandra_dir(data_name=data_name, var_name=var_name) == expected['cassandra_path']
+        assert cfg_obj.obs_cassandra_units(data_name=data_name, var_name=var_name) == expected['var_units']
+
+
+def test_sate_index_matches_mask_lookup():
+    cfg_obj = cassandra_sate_cfg()
+    for data_name, var_name in _keys(cfg_obj.sate_cfg, ['data_name', 'var_name']):
+        rows = _mask_rows(cfg_obj.sate_cfg, data_name=data_name, var_name=var_name)
+        channels = set(_c for _row in rows for _c in _row['channel'])
+        for channel in channels:
+            expected = [_row for _row in rows if 'any' in _row['channel'] or str(channel) in _row['channel']]
+            assert cfg_obj.get_sate_cfg(data_name=data_name, var_name=var_name, channel=channel) == expected[0]
+
+
+def test_datacode_index_matches_mask_lookup():
+    cfg_obj = cmadaas_datacode_cfg()
+    for data_name, fhour_flag in _keys(cfg_obj.datacode_cfg, ['data_name', 'fhour_flag']):
+        expected = _mask_rows(cfg_obj.datacode_cfg, data_name=data_name, fhour_flag=fhour_flag)
+        fhour = 0 if fhour_flag == 0 else 3
+        if len(expected) > 1:
+            with pytest.raises(Exception, match='greater than 1 recode'):
+                cfg_obj.get_datacode_cfg(data_name=data_name, fhour=fhour)
+            continue
+        assert cfg_obj.get_datacode_cfg(data_name=data_name, fhour=fhour) == expected[0]['data_code']